@@ -0,0 +1,116 @@
+import hashlib
+import os
+import shutil
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from common.class_bulkDownloader import BulkDownloader, DownloadResult
+from common.class_diskCache import DiskCache
+from common.class_imageFetcher import extension_for
+
+
+class BlobStore:
+    """
+    Almacén de imágenes direccionado por contenido.
+
+    Cada imagen descargada se guarda una única vez en root/<hash[:2]>/<hash>.<ext>, donde
+    hash es el SHA-256 de sus bytes, y un índice SQLite recuerda qué blob corresponde a cada
+    URL. Las carpetas de cada imagen procesada sólo contienen referencias (enlaces duros, o
+    una copia si el sistema de archivos no los admite) a esos blobs, de modo que el espacio
+    en disco y las descargas crecen con el número de imágenes distintas y no con el número
+    de veces que aparecen en los resultados.
+
+    download() tiene la misma firma que BulkDownloader.download, así que puede usarse en su
+    lugar en process_image y process_folder.
+    """
+    def __init__(self, root: str, downloader: Optional[BulkDownloader] = None):
+        """
+        Args:
+            root: Carpeta raíz de los blobs.
+            downloader: Motor de descargas. Por defecto, un BulkDownloader con el cliente compartido.
+        """
+        self.root = root
+        self.downloader = downloader or BulkDownloader()
+        self.tmp_dir = os.path.join(root, "tmp")
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        self.url_index = DiskCache(os.path.join(root, "_index.sqlite"), max_entries=None)
+
+    @staticmethod
+    def _file_hash(path: str, chunk_size: int = 1024 * 1024) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def blob_path(self, digest: str, extension: str) -> str:
+        """Ruta del blob con el hash y la extensión indicados."""
+        return os.path.join(self.root, digest[:2], f"{digest}.{extension}")
+
+    def lookup(self, url: str) -> Optional[Dict[str, Any]]:
+        """Devuelve la entrada {'path', 'content_type', 'size'} de una URL ya descargada, si existe."""
+        entry = self.url_index.get(url)
+        if entry is None or not os.path.exists(entry["path"]):
+            return None
+        return entry
+
+    def add_file(self, tmp_path: str, content_type: str = "", url: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Mueve un archivo descargado al almacén. Si ya existe un blob con el mismo contenido,
+        el archivo se descarta y se reutiliza el existente.
+        """
+        path = self.blob_path(self._file_hash(tmp_path), extension_for(content_type))
+        if os.path.exists(path):
+            os.remove(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+        entry = {"path": path, "content_type": content_type, "size": os.path.getsize(path)}
+        if url:
+            self.url_index.set(url, entry)
+        return entry
+
+    @staticmethod
+    def link(blob_path: str, dest_path: str):
+        """Crea en dest_path una referencia al blob (enlace duro o, si no es posible, una copia)."""
+        directory = os.path.dirname(dest_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.lexists(dest_path):
+            os.remove(dest_path)
+        try:
+            os.link(blob_path, dest_path)
+        except OSError:
+            shutil.copyfile(blob_path, dest_path)
+
+    def download(self, jobs: Iterable[Tuple[str, str]], show_progress: bool = False) -> List[DownloadResult]:
+        """
+        Resuelve los trabajos (url, dest_path): cada URL distinta se descarga como mucho una
+        vez (las ya indexadas no se vuelven a pedir) y dest_path pasa a ser una referencia al blob.
+
+        Returns:
+            Un DownloadResult por trabajo, en el mismo orden que jobs.
+        """
+        jobs = list(jobs)
+        entries: Dict[str, Any] = {}
+        misses = []
+        for url in dict.fromkeys(url for url, _ in jobs):
+            entry = self.lookup(url)
+            if entry is None:
+                misses.append((url, os.path.join(self.tmp_dir, uuid.uuid4().hex)))
+            else:
+                entries[url] = entry
+
+        for result in self.downloader.download(misses, show_progress=show_progress):
+            entries[result.url] = (self.add_file(result.dest_path, result.content_type, result.url)
+                                   if result.success else result)
+
+        results = []
+        for url, dest_path in jobs:
+            entry = entries[url]
+            if isinstance(entry, DownloadResult):
+                results.append(DownloadResult(url, dest_path, False, error=entry.error))
+            else:
+                self.link(entry["path"], dest_path)
+                results.append(DownloadResult(url, dest_path, True, entry["size"], entry["content_type"]))
+        return results
@@ -0,0 +1,176 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from tqdm import tqdm
+
+from common.class_httpClient import get_shared_client
+
+logger = logging.getLogger(__name__)
+
+
+class DownloadResult:
+    """Resultado de un trabajo de descarga (url -> dest_path)."""
+    def __init__(self, url: str, dest_path: str, success: bool, bytes_written: int = 0,
+                 content_type: str = "", error: Optional[str] = None):
+        self.url = url
+        self.dest_path = dest_path
+        self.success = success
+        self.bytes_written = bytes_written
+        self.content_type = content_type
+        self.error = error
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "dest_path": self.dest_path,
+            "success": self.success,
+            "bytes_written": self.bytes_written,
+            "content_type": self.content_type,
+            "error": self.error,
+        }
+
+
+class BulkDownloader:
+    """
+    Motor de descargas masivas en paralelo.
+
+    Recibe trabajos (url, dest_path) y los reparte en un pool de max_concurrency hilos que
+    comparten el cliente HTTP con pool de conexiones. Cada host admite como máximo
+    per_host_concurrency descargas simultáneas, para no saturar un mismo servidor mientras
+    se aprovecha el ancho de banda con el resto: download() tiene una cola por host y sólo
+    entrega al pool trabajos de hosts con hueco libre, así que ningún hilo queda bloqueado
+    esperando a un host saturado mientras hay descargas de otros hosts pendientes. Las
+    respuestas cuyo Content-Length supera max_bytes se descartan sin leer el cuerpo. Los
+    cuerpos se escriben en disco por bloques en un archivo temporal '.part' que se renombra
+    al terminar, de modo que nunca queda una imagen a medias con el nombre definitivo.
+    """
+    def __init__(
+        self,
+        http_client: Optional[Any] = None,
+        max_concurrency: int = 16,
+        per_host_concurrency: int = 4,
+        chunk_size: int = 64 * 1024,
+        max_bytes: Optional[int] = 20 * 1024 * 1024,
+        require_image: bool = True
+    ):
+        """
+        Args:
+            http_client: Cliente HTTP (HttpClient o compatible). Por defecto, el compartido.
+            max_concurrency: Descargas simultáneas en total.
+            per_host_concurrency: Descargas simultáneas como máximo por host.
+            chunk_size: Tamaño de los bloques leídos y escritos.
+            max_bytes: Tamaño máximo de un archivo (None para no limitar).
+            require_image: Si es True, se descartan las respuestas cuyo Content-Type no es de imagen.
+        """
+        self.http_client = http_client or get_shared_client()
+        self.max_concurrency = max_concurrency
+        self.per_host_concurrency = per_host_concurrency
+        self.chunk_size = chunk_size
+        self.max_bytes = max_bytes
+        self.require_image = require_image
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = defaultdict(
+            lambda: threading.BoundedSemaphore(self.per_host_concurrency)
+        )
+        self._host_lock = threading.Lock()
+
+    @staticmethod
+    def _host(url: str) -> str:
+        return urlsplit(url).netloc.lower()
+
+    def _host_slot(self, host: str) -> threading.BoundedSemaphore:
+        with self._host_lock:
+            return self._host_slots[host]
+
+    def download_one(self, url: str, dest_path: str) -> DownloadResult:
+        """Descarga una URL en streaming y la escribe en dest_path (esperando hueco en su host)."""
+        with self._host_slot(self._host(url)):
+            return self._fetch(url, dest_path)
+
+    def _fetch(self, url: str, dest_path: str) -> DownloadResult:
+        """Descarga una URL sin controlar la concurrencia por host (la gestiona quien llama)."""
+        tmp_path = dest_path + ".part"
+        try:
+            response = self.http_client.get(url, stream=True)
+            try:
+                if response.status_code != 200:
+                    return DownloadResult(url, dest_path, False, error=f"status {response.status_code}")
+                content_type = response.headers.get("Content-Type", "").lower()
+                if self.require_image and "image" not in content_type:
+                    return DownloadResult(url, dest_path, False, content_type=content_type,
+                                          error=f"Content-Type no es de imagen: '{content_type}'")
+                content_length = response.headers.get("Content-Length")
+                if (self.max_bytes is not None and content_length and content_length.isdigit()
+                        and int(content_length) > self.max_bytes):
+                    return DownloadResult(url, dest_path, False, content_type=content_type,
+                                          error=f"Content-Length {content_length} supera {self.max_bytes} bytes")
+
+                directory = os.path.dirname(dest_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                bytes_written = 0
+                with open(tmp_path, "wb") as f:
+                    for chunk in response.iter_content(self.chunk_size):
+                        bytes_written += len(chunk)
+                        if self.max_bytes is not None and bytes_written > self.max_bytes:
+                            raise ValueError(f"supera {self.max_bytes} bytes")
+                        f.write(chunk)
+            finally:
+                response.close()
+            os.replace(tmp_path, dest_path)
+            return DownloadResult(url, dest_path, True, bytes_written, content_type)
+        except Exception as e:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            logger.debug(f"Error descargando {url}: {e}")
+            return DownloadResult(url, dest_path, False, error=str(e))
+
+    def download(self, jobs: Iterable[Tuple[str, str]], show_progress: bool = False) -> List[DownloadResult]:
+        """
+        Descarga todos los trabajos (url, dest_path) en paralelo.
+
+        Returns:
+            Un DownloadResult por trabajo, en el mismo orden que jobs.
+        """
+        jobs = list(jobs)
+        if not jobs:
+            return []
+        results: List[Optional[DownloadResult]] = [None] * len(jobs)
+        pending: "OrderedDict[str, deque]" = OrderedDict()  # Cola de índices de trabajo por host
+        for idx, (url, _) in enumerate(jobs):
+            pending.setdefault(self._host(url), deque()).append(idx)
+        progress = tqdm(total=len(jobs), desc="Descargando imágenes") if show_progress else None
+
+        running = {}
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(jobs))) as executor:
+            while pending or running:
+                # Sólo se lanzan trabajos de hosts con hueco libre: un host saturado no ocupa hilos del pool
+                for host in list(pending):
+                    queue, slot = pending[host], self._host_slot(host)
+                    while queue and len(running) < self.max_concurrency and slot.acquire(blocking=False):
+                        idx = queue.popleft()
+                        running[executor.submit(self._fetch, *jobs[idx])] = (idx, slot)
+                    if not queue:
+                        del pending[host]
+                if not running:
+                    time.sleep(0.01)  # Los huecos libres los tienen otras llamadas a download_one
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    idx, slot = running.pop(future)
+                    slot.release()
+                    results[idx] = future.result()
+                    if progress is not None:
+                        progress.update(1)
+        if progress is not None:
+            progress.close()
+
+        failed = sum(not result.success for result in results)
+        if failed:
+            logger.info(f"Descargas completadas: {len(results) - failed}/{len(results)} ({failed} fallidas)")
+        return results
@@ -0,0 +1,105 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Optional
+
+
+class DiskCache:
+    """
+    Caché clave-valor persistente en SQLite con caducidad (TTL) y tamaño acotado.
+
+    Los valores se guardan serializados como JSON. Cada lectura actualiza la fecha de último
+    acceso y, cuando se supera max_entries, se eliminan las entradas usadas hace más tiempo
+    (LRU). Las entradas caducadas se ignoran al leer y se purgan al escribir.
+    """
+    def __init__(
+        self,
+        path: str,
+        ttl: Optional[float] = None,
+        max_entries: Optional[int] = 10000,
+        clock: Callable[[], float] = time.time
+    ):
+        """
+        Args:
+            path: Ruta del archivo SQLite (por ejemplo 'OutputFiles/_llm_cache.sqlite').
+            ttl: Segundos de validez de cada entrada (None para que no caduquen).
+            max_entries: Número máximo de entradas (None para no limitar).
+            clock: Reloj en segundos (inyectable en pruebas).
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache(accessed)")
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Hash SHA-256 estable de las partes indicadas (cualquier valor serializable en JSON)."""
+        payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _is_expired(self, created: float, now: float) -> bool:
+        return self.ttl is not None and now - created > self.ttl
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Devuelve el valor asociado a la clave, o default si no existe o ha caducado."""
+        now = self._clock()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None or self._is_expired(row[1], now):
+                return default
+            with self._conn:
+                self._conn.execute("UPDATE cache SET accessed = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any):
+        """Guarda un valor y aplica la caducidad y el límite de tamaño."""
+        now = self._clock()
+        payload = json.dumps(value, ensure_ascii=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, payload, now, now)
+            )
+            if self.ttl is not None:
+                self._conn.execute("DELETE FROM cache WHERE created < ?", (now - self.ttl,))
+            if self.max_entries is not None:
+                self._conn.execute(
+                    "DELETE FROM cache WHERE key IN ("
+                    "SELECT key FROM cache ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def clear(self):
+        """Elimina todas las entradas."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM cache")
+
+    def close(self):
+        """Cierra la conexión con la base de datos."""
+        with self._lock:
+            self._conn.close()
+
+
+_MISSING = object()
@@ -0,0 +1,98 @@
+import math
+import os
+import threading
+from typing import Any, Optional
+
+import numpy as np
+
+
+class EmbeddingStore:
+    """
+    Almacén de embeddings en un archivo binario plano (una fila de `dim` valores por imagen)
+    que se lee con np.memmap.
+
+    El CSV de metadatos sólo guarda el número de fila (columna 'embedding_row'), de modo que
+    abrir la colección no obliga a parsear ni copiar los vectores: la matriz completa se
+    proyecta en memoria y cada acceso lee únicamente las filas necesarias.
+
+    El archivo sólo crece: put() escribe el vector antes de que el registro que guarda su fila
+    llegue al almacén de metadatos, así que una ejecución interrumpida entre ambos pasos deja
+    filas huérfanas (ocupan espacio, pero ningún registro apunta a ellas).
+    """
+    def __init__(self, path: str, dim: int = 512, dtype=np.float32):
+        """
+        Args:
+            path: Ruta del archivo binario (por ejemplo 'output_folder/_img_embeddings.f32').
+            dim: Dimensión de los embeddings.
+            dtype: Tipo de los valores almacenados.
+        """
+        self.path = path
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self._row_bytes = self.dim * self.dtype.itemsize
+        self._lock = threading.Lock()
+        output_dir = os.path.dirname(path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+    @staticmethod
+    def parse_row(value: Any) -> Optional[int]:
+        """
+        Interpreta el valor de la columna 'embedding_row' ("3", "3.0", 3.0, 3...) como número de
+        fila. Devuelve None si está vacío, es NaN o no es un número de fila válido.
+        """
+        if value is None or value == '':
+            return None
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            return None
+        if math.isnan(number) or number < 0 or not number.is_integer():
+            return None
+        return int(number)
+
+    def __len__(self) -> int:
+        if not os.path.exists(self.path):
+            return 0
+        return os.path.getsize(self.path) // self._row_bytes
+
+    def _as_row(self, vector) -> bytes:
+        if hasattr(vector, "detach"):
+            vector = vector.detach().float().cpu().numpy()
+        return np.asarray(vector, dtype=self.dtype).reshape(self.dim).tobytes()
+
+    def append(self, vector) -> int:
+        """Añade un embedding al final del archivo y devuelve su número de fila."""
+        with self._lock:
+            row = len(self)
+            with open(self.path, "ab") as f:
+                f.truncate(row * self._row_bytes)  # Descarta una fila incompleta de una escritura interrumpida
+                f.write(self._as_row(vector))
+            return row
+
+    def write(self, row: int, vector):
+        """Sobrescribe el embedding de una fila existente."""
+        with self._lock:
+            if not 0 <= row < len(self):
+                raise IndexError(f"La fila {row} no existe en {self.path}")
+            with open(self.path, "r+b") as f:
+                f.seek(row * self._row_bytes)
+                f.write(self._as_row(vector))
+
+    def put(self, vector, row=None) -> int:
+        """Sobrescribe la fila indicada si existe; si no, añade el embedding al final."""
+        if row is not None and 0 <= row < len(self):
+            self.write(row, vector)
+            return row
+        return self.append(vector)
+
+    def open_matrix(self) -> np.ndarray:
+        """Devuelve la matriz (N, dim) de solo lectura proyectada en memoria (sin copiar)."""
+        num_rows = len(self)
+        if num_rows == 0:
+            return np.empty((0, self.dim), dtype=self.dtype)
+        return np.memmap(self.path, dtype=self.dtype, mode="r", shape=(num_rows, self.dim))
+
+    def get(self, row: int) -> np.ndarray:
+        """Devuelve el embedding de una fila."""
+        return np.array(self.open_matrix()[row])
@@ -0,0 +1,84 @@
+import threading
+from typing import Iterable, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class HttpClient:
+    """
+    Cliente HTTP con pool de conexiones compartido por todas las descargas.
+
+    Envuelve una requests.Session con un HTTPAdapter que mantiene un pool de conexiones
+    keep-alive por host (pool_connections hosts distintos, hasta pool_maxsize conexiones
+    por host), de modo que las descargas repetidas al mismo CDN reutilizan la conexión
+    TCP/TLS. Los errores de conexión y las respuestas 429/5xx de GET y HEAD se reintentan
+    con espera exponencial (respetando Retry-After).
+    """
+    def __init__(
+        self,
+        pool_connections: int = 16,
+        pool_maxsize: int = 32,
+        connect_timeout: float = 5,
+        read_timeout: float = 15,
+        max_retries: int = 3,
+        backoff_factor: float = 0.5,
+        status_forcelist: Iterable[int] = (429, 500, 502, 503, 504),
+        user_agent: Optional[str] = None
+    ):
+        """
+        Args:
+            pool_connections: Número de hosts con pool propio que se mantienen abiertos.
+            pool_maxsize: Conexiones simultáneas como máximo por host.
+            connect_timeout: Tiempo máximo de conexión por defecto (segundos).
+            read_timeout: Tiempo máximo de lectura por defecto (segundos).
+            max_retries: Reintentos ante errores de conexión o códigos de status_forcelist.
+            backoff_factor: Factor de la espera exponencial entre reintentos.
+            status_forcelist: Códigos HTTP que se reintentan.
+            user_agent: Cabecera User-Agent opcional.
+        """
+        self.timeout: Tuple[float, float] = (connect_timeout, read_timeout)
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=tuple(status_forcelist),
+            allowed_methods=frozenset(["GET", "HEAD"]),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if user_agent:
+            self.session.headers["User-Agent"] = user_agent
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Realiza una petición usando el timeout por defecto si no se indica otro."""
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def head(self, url: str, **kwargs) -> requests.Response:
+        return self.request("HEAD", url, **kwargs)
+
+    def close(self):
+        """Cierra todas las conexiones del pool."""
+        self.session.close()
+
+
+_shared_client: Optional[HttpClient] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_client() -> HttpClient:
+    """Devuelve el cliente HTTP compartido por todo el proceso, creándolo la primera vez."""
+    global _shared_client
+    if _shared_client is None:
+        with _shared_lock:
+            if _shared_client is None:
+                _shared_client = HttpClient()
+    return _shared_client
@@ -0,0 +1,116 @@
+import logging
+import os
+from io import BytesIO
+from typing import Any, Optional
+
+from PIL import Image
+
+from common.class_httpClient import get_shared_client
+
+logger = logging.getLogger(__name__)
+
+
+def extension_for(content_type: str) -> str:
+    """Extensión de archivo según el Content-Type (jpg por defecto)."""
+    for subtype, extension in (("png", "png"), ("gif", "gif"), ("svg", "svg"), ("webp", "webp"), ("bmp", "bmp")):
+        if subtype in content_type:
+            return extension
+    return "jpg"
+
+
+class FetchedImage:
+    """Imagen descargada en memoria: los mismos bytes sirven para analizarla y para guardarla."""
+    def __init__(self, url: str, content: bytes, content_type: str):
+        self.url = url
+        self.content = content
+        self.content_type = content_type
+
+    @property
+    def extension(self) -> str:
+        """Extensión de archivo según el Content-Type (jpg por defecto)."""
+        return extension_for(self.content_type)
+
+    def to_pil(self) -> Image.Image:
+        """Decodifica la imagen a RGB."""
+        return Image.open(BytesIO(self.content)).convert("RGB")
+
+    def save(self, dest_path: str) -> str:
+        """Guarda los bytes descargados en dest_path y devuelve la ruta."""
+        directory = os.path.dirname(dest_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(dest_path, "wb") as f:
+            f.write(self.content)
+        return dest_path
+
+
+class ImageFetcher:
+    """
+    Descarga imágenes con una única petición GET en streaming.
+
+    Antes de leer el cuerpo se comprueban el código de estado y el Content-Type de la
+    respuesta, y la descarga se aborta en cuanto se sabe que no es una imagen o que supera
+    max_bytes (por Content-Length o por los bytes recibidos). Así una misma descarga valida
+    la URL, alimenta el cálculo de similitud y se guarda en disco sin volver a pedirla.
+    """
+    def __init__(
+        self,
+        session: Optional[Any] = None,
+        timeout: Optional[float] = None,
+        max_bytes: int = 20 * 1024 * 1024,
+        chunk_size: int = 64 * 1024
+    ):
+        """
+        Args:
+            session: Sesión HTTP (HttpClient, requests.Session o compatible). Por defecto, el
+                cliente compartido con pool de conexiones.
+            timeout: Tiempo máximo de conexión y de lectura en segundos (None para usar el
+                del cliente HTTP).
+            max_bytes: Tamaño máximo aceptado del cuerpo.
+            chunk_size: Tamaño de los bloques leídos del stream.
+        """
+        self.session = session or get_shared_client()
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+
+    def fetch(self, url: str) -> Optional[FetchedImage]:
+        """
+        Descarga la imagen de url.
+
+        Returns:
+            FetchedImage con los bytes y el Content-Type, o None si la URL no es una imagen
+            accesible o es demasiado grande.
+        """
+        try:
+            kwargs = {"timeout": self.timeout} if self.timeout is not None else {}
+            response = self.session.get(url, stream=True, **kwargs)
+        except Exception as e:
+            logger.debug(f"Error descargando {url}: {e}")
+            return None
+
+        try:
+            if response.status_code != 200:
+                logger.debug(f"Descarga rechazada {url}: status {response.status_code}")
+                return None
+            content_type = response.headers.get("Content-Type", "").lower()
+            if "image" not in content_type:
+                logger.debug(f"Descarga rechazada {url}: Content-Type '{content_type}'")
+                return None
+            content_length = response.headers.get("Content-Length")
+            if content_length and content_length.isdigit() and int(content_length) > self.max_bytes:
+                logger.debug(f"Descarga rechazada {url}: {content_length} bytes")
+                return None
+
+            buffer = bytearray()
+            for chunk in response.iter_content(self.chunk_size):
+                buffer.extend(chunk)
+                if len(buffer) > self.max_bytes:
+                    logger.debug(f"Descarga abortada {url}: supera {self.max_bytes} bytes")
+                    return None
+            return FetchedImage(url, bytes(buffer), content_type)
+        except Exception as e:
+            logger.debug(f"Error descargando {url}: {e}")
+            return None
+        finally:
+            response.close()
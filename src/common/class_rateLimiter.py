@@ -0,0 +1,71 @@
+import threading
+import time
+from typing import Callable, Optional
+
+
+class RateLimiter:
+    """
+    Limitador de peticiones por minuto (RPM) y tokens por minuto (TPM) compartido entre hilos.
+
+    Usa dos cubos de fichas que se rellenan de forma continua a razón de límite/60 por segundo.
+    Cada llamada a acquire() consume una petición y los tokens estimados de la llamada, y espera
+    (fuera del lock) el tiempo necesario si alguno de los cubos no tiene saldo suficiente.
+    """
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        """
+        Args:
+            requests_per_minute: Límite de peticiones por minuto (None para no limitar).
+            tokens_per_minute: Límite de tokens por minuto (None para no limitar).
+            clock: Reloj monotónico (inyectable en pruebas).
+            sleep: Función de espera (inyectable en pruebas).
+        """
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._request_budget = requests_per_minute or 0.0
+        self._token_budget = tokens_per_minute or 0.0
+        self._last_refill = clock()
+
+    def _refill(self):
+        now = self._clock()
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        if self.requests_per_minute:
+            self._request_budget = min(self.requests_per_minute,
+                                       self._request_budget + elapsed * self.requests_per_minute / 60.0)
+        if self.tokens_per_minute:
+            self._token_budget = min(self.tokens_per_minute,
+                                     self._token_budget + elapsed * self.tokens_per_minute / 60.0)
+
+    def acquire(self, tokens: int = 0):
+        """
+        Bloquea hasta que haya saldo para una petición de `tokens` tokens y lo consume.
+
+        Args:
+            tokens: Tokens estimados de la petición (prompt + respuesta).
+        """
+        if self.tokens_per_minute:
+            tokens = min(tokens, self.tokens_per_minute)  # Una petición mayor que el límite nunca cabría
+        while True:
+            with self._lock:
+                self._refill()
+                wait = 0.0
+                if self.requests_per_minute and self._request_budget < 1:
+                    wait = max(wait, (1 - self._request_budget) * 60.0 / self.requests_per_minute)
+                if self.tokens_per_minute and self._token_budget < tokens:
+                    wait = max(wait, (tokens - self._token_budget) * 60.0 / self.tokens_per_minute)
+                if wait == 0.0:
+                    if self.requests_per_minute:
+                        self._request_budget -= 1
+                    if self.tokens_per_minute:
+                        self._token_budget -= tokens
+                    return
+            self._sleep(wait)
@@ -7,10 +7,21 @@ import numpy as np
 import numpy as np
 from PIL import Image
 import matplotlib.pyplot as plt
+import random
+import time
+
+from common.class_blobStore import BlobStore
+from common.class_bulkDownloader import BulkDownloader, DownloadResult
+from common.class_httpClient import get_shared_client
+from common.class_imageFetcher import extension_for
 
 from PIL import Image
 import numpy as np
 
+# Carpeta de blobs compartida por todas las llamadas a descargar_imagenes, de modo que una misma
+# imagen descargada para dos consultas (dos directorios) se guarda una sola vez
+BLOB_STORE_DIR = os.environ.get("BLOB_STORE_DIR", "_blobs")
+
 def guardar_resultados(imagenes, nombre_archivo="resultados_imagenes.json"):
     """
     Guarda los resultados de la búsqueda en un archivo JSON.
@@ -19,42 +30,50 @@ def guardar_resultados(imagenes, nombre_archivo="resultados_imagenes.json"):
         json.dump(imagenes, f, ensure_ascii=False, indent=4)
     print(f"Resultados guardados en {nombre_archivo}")
 
-def descargar_imagenes(imagenes, directorio="imagenes_descargadas"):
+def descargar_imagenes(imagenes, directorio="imagenes_descargadas", http_client=None, blob_store=None,
+                       require_image=True):
     """
     Descarga las imágenes encontradas en un directorio especificado.
+    Las descargas reutilizan las conexiones del cliente HTTP compartido y cada imagen
+    distinta se guarda una sola vez en el BlobStore (por defecto, el compartido en
+    BLOB_STORE_DIR para todos los directorios); los archivos imagen_{i}.ext del directorio
+    son referencias a los blobs.
+
+    :param require_image: Si es True (por defecto), se descartan las respuestas cuyo
+        Content-Type no es de imagen (por ejemplo, páginas de error HTML).
+    :return: Un DownloadResult por imagen, en el mismo orden. Las entradas sin 'enlace' se
+        registran como fallidas sin interrumpir el resto.
     """
     # Crea el directorio si no existe
     if not os.path.exists(directorio):
         os.makedirs(directorio)
-    
+    if blob_store is None:
+        blob_store = BlobStore(BLOB_STORE_DIR,
+                               BulkDownloader(http_client or get_shared_client(), require_image=require_image))
+
+    resultados = [None] * len(imagenes)
+    trabajos, posiciones = [], []
     for i, imagen in enumerate(imagenes):
-        try:
-            # Determina la extensión del archivo basado en el tipo MIME
-            extension = "jpg"  # Por defecto
-            mime = imagen.get('tipo_contenido', '')
-            if 'png' in mime:
-                extension = "png"
-            elif 'gif' in mime:
-                extension = "gif"
-            elif 'svg' in mime:
-                extension = "svg"
-            elif 'webp' in mime:
-                extension = "webp"
-            
-            # Construye el nombre del archivo
-            nombre_archivo = f"{directorio}/imagen_{i+1}.{extension}"
-            
-            # Descarga la imagen
-            respuesta = requests.get(imagen['enlace'], stream=True, timeout=10)
-            if respuesta.status_code == 200:
-                with open(nombre_archivo, 'wb') as f:
-                    for chunk in respuesta.iter_content(1024):
-                        f.write(chunk)
-                print(f"Imagen {i+1} descargada como {nombre_archivo}")
-            else:
-                print(f"Error al descargar imagen {i+1}: Código {respuesta.status_code}")
-        except Exception as e:
-            print(f"Error al procesar imagen {i+1}: {str(e)}")
+        # Determina la extensión del archivo basado en el tipo MIME
+        extension = extension_for(imagen.get('tipo_contenido') or '')
+        # Construye el nombre del archivo
+        nombre_archivo = f"{directorio}/imagen_{i+1}.{extension}"
+        enlace = imagen.get('enlace')
+        if not enlace:
+            resultados[i] = DownloadResult(enlace, nombre_archivo, False, error="la imagen no tiene 'enlace'")
+            continue
+        trabajos.append((enlace, nombre_archivo))
+        posiciones.append(i)
+
+    for i, resultado in zip(posiciones, blob_store.download(trabajos)):
+        resultados[i] = resultado
+
+    for i, resultado in enumerate(resultados):
+        if resultado.success:
+            print(f"Imagen {i+1} descargada como {resultado.dest_path}")
+        else:
+            print(f"Error al descargar imagen {i+1}: {resultado.error}")
+    return resultados
 
 
 def load_image(image_path: str) -> Image.Image:
@@ -84,3 +103,27 @@ def show_image(image: Image.Image, window_name="Imagen"):
     # plt.title(window_name)
     # plt.axis('off')  # Ocultar los ejes
     plt.show()
+
+
+def retry_with_backoff(func, *args, max_retries=3, base_delay=1.0, max_delay=30.0,
+                       retry_on=(Exception,), sleep=time.sleep, **kwargs):
+    """
+    Ejecuta func(*args, **kwargs) y, si lanza una de las excepciones de retry_on, lo reintenta
+    con espera exponencial (base_delay * 2^intento, con jitter y como máximo max_delay).
+    
+    :param func: Función a ejecutar.
+    :param max_retries: Número máximo de reintentos tras el primer intento.
+    :param base_delay: Espera inicial en segundos.
+    :param max_delay: Espera máxima en segundos.
+    :param retry_on: Tupla de excepciones que se consideran transitorias.
+    :param sleep: Función de espera (inyectable en pruebas).
+    :return: El valor devuelto por func. Si se agotan los reintentos se relanza la última excepción.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return func(*args, **kwargs)
+        except retry_on:
+            if attempt == max_retries:
+                raise
+            delay = min(max_delay, base_delay * (2 ** attempt))
+            sleep(delay * random.uniform(0.5, 1.0))
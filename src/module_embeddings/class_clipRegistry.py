@@ -0,0 +1,58 @@
+import copy
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import clip
+import torch
+from torch.ao.quantization import quantize_dynamic
+
+
+class ClipModelRegistry:
+    """
+    Registro de modelos CLIP compartido por todo el proceso.
+
+    Cada variante (modelo + dispositivo + cuantización) se carga una sola vez, la primera vez
+    que se pide, y todos los componentes (Embeddings, ProductIconRetriever...) reciben el mismo
+    par (modelo, preprocesado). El acceso está protegido con un lock para que dos hilos que
+    piden a la vez el mismo modelo no lo carguen dos veces.
+    """
+    _models: Dict[Tuple[str, str, bool], Tuple[Any, Callable]] = {}
+    _lock = threading.RLock()
+
+    @classmethod
+    def get(cls, model_name: str = "ViT-B/32", device: Optional[str] = None,
+            quantized: bool = False) -> Tuple[Any, Callable]:
+        """
+        Devuelve el modelo CLIP y su función de preprocesado, cargándolos si es necesario.
+
+        Args:
+            model_name: Variante de CLIP (por ejemplo 'ViT-B/32').
+            device: Dispositivo ('cuda' o 'cpu'). Por defecto, GPU si está disponible.
+            quantized: Si es True, devuelve una copia del modelo con las capas lineales
+                cuantizadas dinámicamente a int8 (sólo CPU).
+
+        Returns:
+            Tupla (modelo, preprocesado).
+        """
+        device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+        if quantized and device != "cpu":
+            raise ValueError("La cuantización dinámica int8 sólo está disponible en CPU")
+
+        key = (model_name, device, quantized)
+        if key not in cls._models:
+            with cls._lock:
+                if key not in cls._models:
+                    if quantized:
+                        # Se cuantiza una copia para no alterar el modelo float32 compartido
+                        model, preprocess = cls.get(model_name, device)
+                        model = quantize_dynamic(copy.deepcopy(model), {torch.nn.Linear}, dtype=torch.qint8)
+                        cls._models[key] = (model, preprocess)
+                    else:
+                        cls._models[key] = clip.load(model_name, device=device)
+        return cls._models[key]
+
+    @classmethod
+    def clear(cls):
+        """Libera todos los modelos cargados."""
+        with cls._lock:
+            cls._models.clear()
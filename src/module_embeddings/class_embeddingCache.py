@@ -0,0 +1,141 @@
+import os
+import hashlib
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """
+    Caché persistente de embeddings direccionada por contenido.
+
+    Cada embedding se identifica por el hash SHA-256 del contenido del archivo de imagen,
+    dentro de una carpeta por modelo (por ejemplo 'ViT-B-32'), de modo que la clave
+    efectiva es (modelo, hash). Los vectores se guardan en un archivo binario plano
+    (float16 o float32, una fila por embedding) que se abre con np.memmap, y las claves en
+    un archivo de texto con una línea por fila. Ambos archivos sólo crecen por el final.
+
+    Las filas añadidas en la sesión se sirven desde memoria hasta que pasan de flush_every;
+    entonces se vuelve a abrir el memmap con todas las filas y se liberan.
+    """
+    def __init__(self, cache_dir: str, model_name: str = "ViT-B/32", dim: int = 512, dtype=np.float16,
+                 flush_every: int = 4096):
+        """
+        Args:
+            cache_dir: Carpeta raíz de la caché.
+            model_name: Nombre del modelo CLIP que generó los embeddings.
+            dim: Dimensión de los embeddings.
+            dtype: np.float16 (la mitad de espacio) o np.float32.
+            flush_every: Máximo de filas nuevas que se mantienen en memoria antes de pasarlas al memmap.
+        """
+        self.model_name = model_name
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self.flush_every = flush_every
+        self.folder = os.path.join(cache_dir, model_name.replace("/", "-"))
+        os.makedirs(self.folder, exist_ok=True)
+
+        suffix = "f16" if self.dtype == np.float16 else "f32"
+        self.keys_path = os.path.join(self.folder, "keys.txt")
+        self.vectors_path = os.path.join(self.folder, f"vectors.{suffix}")
+
+        self._lock = threading.Lock()
+        self._index: Dict[str, int] = {}
+        self._vectors = None        # memmap con las filas ya volcadas
+        self._new_vectors: Dict[int, np.ndarray] = {}  # filas añadidas desde el último volcado
+        self._load()
+
+    @staticmethod
+    def file_hash(file_path: str, chunk_size: int = 1 << 20) -> str:
+        """Calcula el hash SHA-256 del contenido de un archivo."""
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _load(self):
+        """
+        Carga el índice de claves y abre los vectores con memmap. Si una ejecución anterior se
+        interrumpió a mitad de una escritura, se recortan ambos archivos a la última fila completa.
+        """
+        keys = []
+        if os.path.exists(self.keys_path):
+            with open(self.keys_path, "r", encoding="utf-8") as f:
+                keys = [line.rstrip("\n") for line in f if line.endswith("\n")]
+
+        row_bytes = self.dim * self.dtype.itemsize
+        num_vectors = os.path.getsize(self.vectors_path) // row_bytes if os.path.exists(self.vectors_path) else 0
+        num_rows = min(len(keys), num_vectors)
+
+        if num_rows != len(keys) or num_rows != num_vectors:
+            keys = keys[:num_rows]
+            with open(self.keys_path, "w", encoding="utf-8") as f:
+                f.writelines(f"{key}\n" for key in keys)
+            with open(self.vectors_path, "ab") as f:
+                f.truncate(num_rows * row_bytes)
+
+        self._index = {key: row for row, key in enumerate(keys)}
+        if num_rows:
+            self._vectors = self._open_vectors(num_rows)
+
+    def _open_vectors(self, num_rows: int) -> np.memmap:
+        """Abre en sólo lectura las primeras num_rows filas del archivo de vectores."""
+        return np.memmap(self.vectors_path, dtype=self.dtype, mode="r", shape=(num_rows, self.dim))
+
+    def flush(self):
+        """Vuelve a abrir el memmap con todas las filas escritas y libera las filas en memoria."""
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if not self._new_vectors:
+            return
+        # Primero el memmap nuevo y después se vacía el diccionario, para que get() sin bloqueo
+        # encuentre siempre la fila en uno de los dos
+        self._vectors = self._open_vectors(len(self._index))
+        self._new_vectors = {}
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Devuelve el embedding (float32) asociado a la clave o None si no está en caché."""
+        row = self._index.get(key)
+        if row is None:
+            return None
+        vector = self._new_vectors.get(row)
+        if vector is not None:
+            return vector
+        return np.asarray(self._vectors[row], dtype=np.float32)
+
+    def put_many(self, keys: List[str], vectors: np.ndarray):
+        """Añade varios embeddings al final de la caché. Las claves ya existentes se ignoran."""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(keys), self.dim)
+        with self._lock:
+            fresh = {}
+            for key, vector in zip(keys, vectors):
+                if key not in self._index and key not in fresh:
+                    fresh[key] = vector
+            fresh = list(fresh.items())
+            if not fresh:
+                return
+            # Primero los vectores y después las claves: una clave sólo existe si su fila está completa
+            with open(self.vectors_path, "ab") as f:
+                f.write(np.stack([vector for _, vector in fresh]).astype(self.dtype).tobytes())
+            with open(self.keys_path, "a", encoding="utf-8") as f:
+                f.writelines(f"{key}\n" for key, _ in fresh)
+            for key, vector in fresh:
+                row = len(self._index)
+                self._index[key] = row
+                self._new_vectors[row] = vector.astype(self.dtype).astype(np.float32)
+            if len(self._new_vectors) >= self.flush_every:
+                self._flush()
+
+    def put(self, key: str, vector: np.ndarray):
+        """Añade un embedding a la caché."""
+        self.put_many([key], np.asarray(vector).reshape(1, self.dim))
@@ -1,12 +1,52 @@
 import torch
-from typing import Optional, Dict, Any, List
+import openai
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Tuple
 from openai import OpenAI
 
+from common.class_diskCache import DiskCache
+from common.class_rateLimiter import RateLimiter
+from common.utils import retry_with_backoff
+
+# Errores de la API que se consideran transitorios y se reintentan
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.InternalServerError,
+)
+
 class EmbeddingDescriber:
-    def __init__(self, api_key: Optional[str] = None, model: str = "gpt-4o", max_tokens: int = 100):
+    def __init__(self, api_key: Optional[str] = None, model: str = "gpt-4o", max_tokens: int = 100,
+                 max_concurrency: int = 4, requests_per_minute: Optional[float] = None,
+                 tokens_per_minute: Optional[float] = None, max_retries: int = 3,
+                 retry_on: Tuple[type, ...] = RETRYABLE_ERRORS, client: Optional[Any] = None,
+                 cache_path: Optional[str] = None, cache_ttl: Optional[float] = None,
+                 cache_max_entries: Optional[int] = 10000):
+        """
+        :param api_key: Clave de API de OpenAI.
+        :param model: Modelo de chat a utilizar.
+        :param max_tokens: Tokens esperados de la respuesta, para estimar el TPM. No se envían como
+                           límite (max_completion_tokens): con un límite bajo, un modelo de
+                           razonamiento puede agotarlo antes de escribir la respuesta.
+        :param max_concurrency: Peticiones simultáneas como máximo en batch_process.
+        :param requests_per_minute: Límite de peticiones por minuto (None para no limitar).
+        :param tokens_per_minute: Límite de tokens por minuto (None para no limitar).
+        :param max_retries: Reintentos con espera exponencial ante errores transitorios.
+        :param retry_on: Excepciones que se consideran transitorias.
+        :param client: Cliente compatible con OpenAI (por ejemplo, un sustituto local en pruebas).
+        :param cache_path: Archivo SQLite donde se guardan las respuestas (None para no usar caché).
+        :param cache_ttl: Segundos de validez de cada respuesta guardada (None para que no caduquen).
+        :param cache_max_entries: Número máximo de respuestas guardadas.
+        """
         self.model = model
         self.max_tokens = max_tokens
-        self.client = OpenAI(api_key=api_key)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.retry_on = retry_on
+        self.rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        self.client = client or OpenAI(api_key=api_key)
+        self.cache = DiskCache(cache_path, ttl=cache_ttl, max_entries=cache_max_entries) if cache_path else None
         
         self.prompt_templates = {
             "general": (
@@ -75,14 +115,15 @@ class EmbeddingDescriber:
             "detailed_description": detailed_description
         }
 
-    def extractDescription(
-        self, 
-        image_embedding: torch.Tensor, 
-        image_type: str = "producto",
-        additional_context: Optional[str] = None, 
-        search_engine: str = "google_images",
-        theme: Optional[str] = None
-    ) -> Dict[str, Any]:
+    def _build_prompt(
+        self,
+        image_embedding: torch.Tensor,
+        image_type: str,
+        additional_context: Optional[str],
+        search_engine: str,
+        theme: Optional[str]
+    ) -> str:
+        """Construye el prompt de usuario para una imagen."""
         embedding_str = self._embedding2str(image_embedding)
         template = self.prompt_templates.get(image_type, self.prompt_templates)
         
@@ -102,32 +143,66 @@ class EmbeddingDescriber:
             "[Descripción detallada, máximo 30 palabras]"
         )
         
-        prompt = (
+        return (
             f"Representación vectorial de una imagen:\n[{embedding_str}]\n"
             f"{context_info}{theme_info}\n\n"
             f"{template}\n\n"
             f"{search_specific_tips}\n\n"
             f"{output_format}"
         )
-        prompt = (
-            f"Representación vectorial de una imagen:\n[{embedding_str}]\n"
-            f"{context_info}{theme_info}\n\n"
-            f"{template}\n\n"
-            f"{search_specific_tips}\n\n"
-            f"{output_format}"
-        )
-        
-        try:
-            response = self.client.chat.completions.create(
+
+    def _complete(self, messages: List[Dict[str, str]]) -> str:
+        """
+        Devuelve el texto de la respuesta del modelo. Si hay caché, la clave es el hash del
+        modelo y de los mensajes completos, de modo que repetir una ejecución no llama a la API.
+        """
+        key = DiskCache.make_key(self.model, messages) if self.cache is not None else None
+        if key:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        response = self._create_completion(messages)
+        description_text = response.choices[0].message.content.strip()
+        if key:
+            self.cache.set(key, description_text)
+        return description_text
+
+    def _create_completion(self, messages: List[Dict[str, str]]):
+        """
+        Llama al endpoint de chat respetando los límites RPM/TPM y reintentando con espera
+        exponencial los errores transitorios. Cada intento (también los reintentos) pasa por el
+        limitador. La longitud de la respuesta no se limita; max_tokens sólo interviene en la
+        estimación de tokens.
+        """
+        # Estimación aproximada: ~4 caracteres por token en el prompt más la respuesta máxima
+        estimated_tokens = sum(len(message["content"]) for message in messages) // 4 + self.max_tokens
+
+        def call():
+            self.rate_limiter.acquire(estimated_tokens)
+            return self.client.chat.completions.create(
                 model=self.model,
-                messages=[
-                    {"role": "system", "content": "Eres un experto en análisis visual de imágenes."},
-                    {"role": "user", "content": prompt}
-                ],
+                messages=messages
                 # max_completion_tokens = self.max_tokens,
             )
-            
-            description_text = response.choices[0].message.content.strip()
+
+        return retry_with_backoff(call, max_retries=self.max_retries, retry_on=self.retry_on)
+
+    def extractDescription(
+        self, 
+        image_embedding: torch.Tensor, 
+        image_type: str = "producto",
+        additional_context: Optional[str] = None, 
+        search_engine: str = "google_images",
+        theme: Optional[str] = None
+    ) -> Dict[str, Any]:
+        prompt = self._build_prompt(image_embedding, image_type, additional_context, search_engine, theme)
+        
+        try:
+            description_text = self._complete([
+                {"role": "system", "content": "Eres un experto en análisis visual de imágenes."},
+                {"role": "user", "content": prompt}
+            ])
             parsed_response = self._parse_response(description_text)
 
             result = {
@@ -149,9 +224,16 @@ class EmbeddingDescriber:
 
         return result
     
-    def batch_process(self, embeddings: List[torch.Tensor], **kwargs) -> List[Dict[str, Any]]:
-        results = []
-        for embedding in embeddings:
-            result = self.extractDescription(embedding, **kwargs)
-            results.append(result)
-        return results
+    def batch_process(self, embeddings: List[torch.Tensor], max_concurrency: Optional[int] = None,
+                      **kwargs) -> List[Dict[str, Any]]:
+        """
+        Genera las descripciones de varios embeddings con hasta max_concurrency peticiones en
+        paralelo (respetando los límites RPM/TPM). Los resultados se devuelven en el mismo orden
+        que los embeddings de entrada.
+        """
+        max_concurrency = max_concurrency or self.max_concurrency
+        if max_concurrency <= 1:
+            return [self.extractDescription(embedding, **kwargs) for embedding in embeddings]
+
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            return list(executor.map(lambda embedding: self.extractDescription(embedding, **kwargs), embeddings))
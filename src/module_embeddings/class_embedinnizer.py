@@ -1,26 +1,155 @@
-
+import logging
 import torch
 import clip
 import torch.nn.functional as F
 import torch
 import clip
 import numpy as np
+from typing import Iterator, List, Optional, Tuple
 from PIL import Image
 from common.utils import load_image, show_image  # Importamos la función desde common.py
+from module_embeddings.class_imagePrefetcher import ImagePrefetcher
+from module_embeddings.class_embeddingCache import EmbeddingCache
+from module_embeddings.class_clipRegistry import ClipModelRegistry
+
+logger = logging.getLogger(__name__)
+
 class Embeddings:
-    def __init__(self):
-        # Detecta si se dispone de GPU y carga el modelo CLIP
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        self.model, self.preprocess_clip = clip.load("ViT-B/32", device=self.device)
+    def __init__(self, model_name: str = "ViT-B/32", cache_dir: Optional[str] = None,
+                 num_threads: Optional[int] = None, quantize: bool = False, device: Optional[str] = None):
+        """
+        :param model_name: Variante de CLIP a cargar.
+        :param cache_dir: Carpeta de la caché persistente de embeddings. Si se indica, los embeddings
+                          se buscan primero por el hash del contenido de la imagen y sólo se calculan
+                          los que no estén en caché.
+        :param num_threads: Hilos intra-op de PyTorch en CPU (torch.set_num_threads, afecta a todo el proceso).
+        :param quantize: Si es True, usa en CPU una copia del modelo con las capas lineales cuantizadas
+                         dinámicamente a int8 (más rápida, con una pequeña desviación de los embeddings).
+        :param device: Dispositivo a usar ('cuda' o 'cpu'). Por defecto, GPU si está disponible.
+        """
+        # Detecta si se dispone de GPU y carga el modelo CLIP (el modo int8 sólo existe en CPU)
+        self.device = device or ("cuda" if torch.cuda.is_available() and not quantize else "cpu")
+        self.model_name = model_name
+        self.quantize = quantize
+        if num_threads and num_threads != torch.get_num_threads():
+            # Cambia el valor de todo el proceso, no sólo el de esta instancia
+            logger.info("torch.set_num_threads: %d -> %d hilos intra-op para todo el proceso",
+                        torch.get_num_threads(), num_threads)
+            torch.set_num_threads(num_threads)
+        # El modelo se comparte con el resto de componentes a través del registro
+        self.model, self.preprocess_clip = ClipModelRegistry.get(model_name, self.device, quantized=quantize)
+        # Los embeddings int8 se guardan aparte para no mezclarlos con los float32
+        cache_name = f"{model_name}-int8" if quantize else model_name
+        self.cache = EmbeddingCache(cache_dir, cache_name, dim=self.model.visual.output_dim) if cache_dir else None
 
     def getImgEmbedding(self,  image_path: str) -> torch.Tensor:
         """
         Procesa la imagen con CLIP y devuelve el embedding normalizado.
         :param image: Objeto PIL.Image.
-        :return: Tensor normalizado con el embedding.
+        :return: Tensor (1, 512) float32 normalizado con el embedding, venga o no de la caché.
         """
+        if self.cache is not None:
+            key = EmbeddingCache.file_hash(image_path)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return torch.from_numpy(cached).unsqueeze(0).to(self.device)
+
         image = load_image(image_path)  # Carga la imagen desde common.py
         # show_image(image)  # Abre una ventana emergente con la imagen. Probado en: /app/src/module_embeddings/verify_img_preprocessing.ipynb
         image_tensor = self.preprocess_clip(image).unsqueeze(0).to(self.device)
-        image_embedding = self.model.encode_image(image_tensor)
-        return image_embedding / image_embedding.norm(dim=-1, keepdim=True)
+        with torch.inference_mode():
+            image_embedding = self.model.encode_image(image_tensor)
+            image_embedding = (image_embedding / image_embedding.norm(dim=-1, keepdim=True)).float()
+
+        if self.cache is not None:
+            self.cache.put(key, image_embedding.detach().cpu().numpy())
+        return image_embedding
+
+    def getImgEmbeddings(self, image_paths: List[str], batch_size: int = 32,
+                         num_workers: int = 4, max_prefetch: int = 2) -> np.ndarray:
+        """
+        Procesa varias imágenes con CLIP por lotes y devuelve sus embeddings normalizados.
+        Cada lote se apila en un único tensor y pasa por el modelo en una sola llamada
+        a encode_image, evitando el coste fijo de una pasada por imagen. La decodificación
+        y el preprocesado de los lotes siguientes se hacen en paralelo (ImagePrefetcher).
+        Si hay caché, sólo pasan por el modelo las imágenes cuyo contenido no esté en ella.
+        :param image_paths: Lista de rutas de las imágenes.
+        :param batch_size: Número de imágenes por pasada del modelo.
+        :param num_workers: Hilos de carga de imágenes (0 para cargar en el hilo principal).
+        :param max_prefetch: Lotes preparados como máximo por delante del modelo.
+        :return: Array (N, 512) float32 con un embedding normalizado por fila, en el mismo orden que image_paths.
+        """
+        embeddings = np.empty((len(image_paths), self.model.visual.output_dim), dtype=np.float32)
+        for start, batch in self.iterImgEmbeddings(image_paths, batch_size=batch_size,
+                                                   num_workers=num_workers, max_prefetch=max_prefetch):
+            embeddings[start:start + len(batch)] = batch
+        return embeddings
+
+    def iterImgEmbeddings(self, image_paths: List[str], batch_size: int = 32, num_workers: int = 4,
+                          max_prefetch: int = 2) -> Iterator[Tuple[int, np.ndarray]]:
+        """
+        Versión incremental de getImgEmbeddings: recorre image_paths con un único ImagePrefetcher
+        y devuelve los embeddings en cuanto se calcula cada lote, de modo que quien los consume
+        (por ejemplo, el pipeline de FolderDataExporter.update_data_range) trabaja mientras se
+        cargan y codifican los lotes siguientes.
+        :param image_paths: Lista de rutas de las imágenes.
+        :param batch_size: Número de imágenes por pasada del modelo.
+        :param num_workers: Hilos de carga de imágenes (0 para cargar en el hilo principal).
+        :param max_prefetch: Lotes preparados como máximo por delante del modelo.
+        :return: Iterador de tuplas (índice en image_paths de la primera fila, array (B, 512) float32)
+                 que cubren image_paths en orden.
+        """
+        cached = {}
+        if self.cache is not None:
+            keys = [EmbeddingCache.file_hash(path) for path in image_paths]
+            for idx, key in enumerate(keys):
+                value = self.cache.get(key)
+                if value is not None:
+                    cached[idx] = value
+        pending = [idx for idx in range(len(image_paths)) if idx not in cached]
+
+        next_out, done = 0, 0
+        if pending:
+            prefetcher = ImagePrefetcher(self.preprocess_clip, batch_size=batch_size,
+                                         num_workers=num_workers, max_prefetch=max_prefetch)
+            for batch_tensor in prefetcher.iter_batches([image_paths[idx] for idx in pending]):
+                # inference_mode sólo durante la pasada: el generador no debe dejarlo activo al ceder el control
+                with torch.inference_mode():
+                    batch_tensor = batch_tensor.to(self.device)
+                    batch_embedding = self.model.encode_image(batch_tensor)
+                    batch_embedding = batch_embedding / batch_embedding.norm(dim=-1, keepdim=True)
+                computed = batch_embedding.float().cpu().numpy()
+                batch_indices = pending[done:done + len(computed)]
+                done += len(computed)
+                if self.cache is not None:
+                    self.cache.put_many([keys[idx] for idx in batch_indices], computed)
+                cached.update(zip(batch_indices, computed))
+
+                # Se entregan todas las filas ya conocidas (calculadas o en caché) hasta el siguiente pendiente
+                end = pending[done] if done < len(pending) else len(image_paths)
+                yield next_out, np.stack([cached.pop(idx) for idx in range(next_out, end)]).astype(np.float32)
+                next_out = end
+
+        if next_out < len(image_paths):
+            yield next_out, np.stack([cached.pop(idx) for idx in range(next_out, len(image_paths))]).astype(np.float32)
+
+    def getTextEmbeddings(self, texts: List[str], batch_size: int = 256) -> np.ndarray:
+        """
+        Codifica textos con el codificador de texto de CLIP, por lotes, y devuelve sus embeddings
+        normalizados. Están en el mismo espacio que los de getImgEmbeddings, de modo que sirven
+        para buscar imágenes de la colección a partir de una descripción.
+        :param texts: Lista de textos (se truncan a la longitud de contexto de CLIP).
+        :param batch_size: Número de textos por pasada del modelo.
+        :return: Array (N, 512) float32 con un embedding normalizado por fila, en el mismo orden que texts.
+        """
+        batches = []
+        with torch.inference_mode():
+            for start in range(0, len(texts), batch_size):
+                tokens = clip.tokenize(texts[start:start + batch_size], truncate=True).to(self.device)
+                text_embedding = self.model.encode_text(tokens)
+                text_embedding = text_embedding / text_embedding.norm(dim=-1, keepdim=True)
+                batches.append(text_embedding.float().cpu().numpy())
+
+        if not batches:
+            return np.empty((0, self.model.visual.output_dim), dtype=np.float32)
+        return np.concatenate(batches, axis=0)
@@ -0,0 +1,77 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, List
+
+import torch
+from PIL import Image
+
+from common.utils import load_image
+
+
+class ImagePrefetcher:
+    """
+    Etapa de carga que decodifica y preprocesa los siguientes lotes de imágenes en un
+    pool de hilos mientras el lote actual pasa por el modelo CLIP.
+
+    Los lotes pendientes se guardan en una cola acotada (max_prefetch), de modo que
+    nunca hay más de max_prefetch lotes preparados en memoria por delante del lote que
+    está usando el modelo. La cola se rellena antes de entregar cada lote, así que incluso
+    con max_prefetch=1 el lote siguiente se carga mientras el modelo procesa el actual.
+    Los lotes se devuelven siempre en el mismo orden que las rutas de entrada.
+    """
+    def __init__(
+        self,
+        preprocess: Callable[[Image.Image], torch.Tensor],
+        batch_size: int = 32,
+        num_workers: int = 4,
+        max_prefetch: int = 2
+    ):
+        """
+        Args:
+            preprocess: Transformación de CLIP que convierte una PIL.Image en tensor.
+            batch_size: Número de imágenes por lote.
+            num_workers: Hilos dedicados a decodificar y preprocesar. Con 0 se carga
+                en el hilo principal, igual que antes.
+            max_prefetch: Número máximo de lotes cargándose por delante del lote entregado
+                (tamaño de la cola acotada).
+        """
+        self.preprocess = preprocess
+        self.batch_size = batch_size
+        self.num_workers = num_workers
+        self.max_prefetch = max(1, max_prefetch)
+
+    def _load(self, image_path: str) -> torch.Tensor:
+        """Decodifica y preprocesa una sola imagen."""
+        return self.preprocess(load_image(image_path))
+
+    def iter_batches(self, image_paths: List[str]) -> Iterator[torch.Tensor]:
+        """
+        Recorre image_paths y devuelve, lote a lote, el tensor apilado (B, 3, H, W).
+
+        :param image_paths: Lista de rutas de las imágenes.
+        :return: Iterador de tensores en el mismo orden que image_paths.
+        """
+        batches = [image_paths[i:i + self.batch_size] for i in range(0, len(image_paths), self.batch_size)]
+
+        if self.num_workers <= 0:
+            for batch_paths in batches:
+                yield torch.stack([self._load(path) for path in batch_paths])
+            return
+
+        with ThreadPoolExecutor(max_workers=self.num_workers) as executor:
+            pending = deque()
+            next_batch = 0
+
+            def refill():
+                nonlocal next_batch
+                while next_batch < len(batches) and len(pending) < self.max_prefetch:
+                    pending.append([executor.submit(self._load, path) for path in batches[next_batch]])
+                    next_batch += 1
+
+            refill()
+            while pending:
+                futures = pending.popleft()
+                # Rellenar la cola después de sacar el lote y antes de entregarlo, para que los
+                # siguientes se carguen mientras el modelo procesa éste
+                refill()
+                yield torch.stack([future.result() for future in futures])
@@ -1,15 +1,23 @@
 import torch
 import numpy as np
-import requests
+import hashlib
 import logging
+import os
 import re
+import threading
 import time
-from typing import Optional, List, Dict, Any, Union
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Dict, Any, Tuple, Union
 from openai import OpenAI
 from tqdm import tqdm
 import clip
 from PIL import Image
-from io import BytesIO
+
+from common.class_diskCache import DiskCache
+from common.class_httpClient import HttpClient, get_shared_client
+from common.class_imageFetcher import FetchedImage, ImageFetcher
+from module_embeddings.class_clipRegistry import ClipModelRegistry
 
 # Configuración de logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -31,7 +39,15 @@ class ProductIconRetriever:
         max_tokens: int = 5000,  # Valor inicial para max_completion_tokens
         validate_urls: bool = True,
         cache_results: bool = True,
-        similarity_threshold: float = 0.6  # Umbral de similitud para aceptar una imagen
+        similarity_threshold: float = 0.6,  # Umbral de similitud para aceptar una imagen
+        cache_size: int = 1024,
+        cache_path: Optional[str] = None,
+        cache_ttl: Optional[float] = None,
+        cache_max_entries: Optional[int] = 10000,
+        client: Optional[Any] = None,
+        max_workers: int = 8,
+        max_image_bytes: int = 20 * 1024 * 1024,
+        http_client: Optional[HttpClient] = None
     ):
         """
         Inicializa el recuperador de iconos de producto.
@@ -44,6 +60,16 @@ class ProductIconRetriever:
             validate_urls: Si se validan las URLs obtenidas.
             cache_results: Si se guardan los resultados en caché.
             similarity_threshold: Valor mínimo de similitud para aceptar un enlace.
+            cache_size: Número máximo de resultados en la caché en memoria (LRU).
+            cache_path: Archivo SQLite para persistir la caché entre ejecuciones (None para
+                mantenerla sólo en memoria).
+            cache_ttl: Segundos de validez de los resultados persistidos (None para que no caduquen).
+            cache_max_entries: Número máximo de resultados persistidos; al superarlo se eliminan los
+                usados hace más tiempo (None para no limitar).
+            client: Cliente compatible con OpenAI (por defecto se crea uno con api_key).
+            max_workers: Descargas simultáneas al validar los enlaces candidatos.
+            max_image_bytes: Tamaño máximo de una imagen candidata; las mayores se descartan.
+            http_client: Cliente HTTP a usar. Por defecto, el cliente compartido con pool de conexiones.
         """
         self.model = model
         self.max_tokens = max_tokens
@@ -53,10 +79,18 @@ class ProductIconRetriever:
         self.similarity_threshold = similarity_threshold
 
         # Se crea el objeto cliente de OpenAI una sola vez
-        self.client = OpenAI(api_key=api_key)
+        self.client = client or OpenAI(api_key=api_key)
+
+        # Cliente HTTP con pool de conexiones compartido por todas las descargas concurrentes
+        self.max_workers = max_workers
+        self.session = http_client or get_shared_client()
+        self.fetcher = ImageFetcher(self.session, timeout=10, max_bytes=max_image_bytes)
 
-        # Inicializar caché
-        self._cache = {}
+        # Inicializar caché: LRU en memoria y, opcionalmente, copia persistente en disco
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._disk_cache = DiskCache(cache_path, ttl=cache_ttl, max_entries=cache_max_entries) if cache_path else None
 
         # Prompt template
         self.chat_prompt_template = (
@@ -80,10 +114,10 @@ class ProductIconRetriever:
         # Mensaje de sistema (para modelos que lo soportan)
         self.system_message = "Eres un especialista en encontrar imágenes para iconos de productos de repostería."
 
-        # Cargar modelo CLIP y preprocesador
+        # Cargar modelo CLIP y preprocesador (compartidos con Embeddings a través del registro)
         try:
             self.clip_device = "cuda" if torch.cuda.is_available() else "cpu"
-            self.clip_model, self.clip_preprocess = clip.load("ViT-B/32", device=self.clip_device)
+            self.clip_model, self.clip_preprocess = ClipModelRegistry.get("ViT-B/32", self.clip_device)
             logger.info("Modelo CLIP cargado exitosamente.")
         except Exception as e:
             logger.error("Error cargando el modelo CLIP: " + str(e))
@@ -146,69 +180,100 @@ class ProductIconRetriever:
                     valid_links.append(url)
         return valid_links
 
-    def _is_valid_image_url(self, url: str) -> bool:
-        """Verifica si una URL apunta a una imagen válida y accesible."""
+    def _download_image(self, image_url: str) -> Optional[Tuple[FetchedImage, Image.Image]]:
+        """
+        Descarga la imagen con un único GET (la validación se hace con las cabeceras de esa
+        misma respuesta). Devuelve None si no es una imagen accesible o no se puede abrir.
+        """
+        fetched = self.fetcher.fetch(image_url)
+        if fetched is None:
+            return None
         try:
-            response = requests.head(url, timeout=5)
-            if response.status_code == 200:
-                content_type = response.headers.get('Content-Type', '')
-                return 'image' in content_type.lower()
-            return False
+            return fetched, fetched.to_pil()
         except Exception as e:
-            logger.debug(f"Error validando URL {url}: {e}")
-            return False
-
-    def _validate_image_urls(self, urls: List[str]) -> List[str]:
-        """Valida una lista de URLs de imágenes."""
-        if not self.validate_urls or not urls:
-            return urls
-        valid_urls = []
-        for url in urls:
-            if self._is_valid_image_url(url):
-                valid_urls.append(url)
-        return valid_urls
-
-    def _compute_similarity(self, original_embedding: torch.Tensor, image_url: str) -> float:
+            logger.error(f"Error al abrir la imagen: {image_url} - {e}")
+            return None
+
+    def _download_candidates(self, urls: List[str]) -> List[Tuple[str, FetchedImage, Image.Image]]:
+        """Descarga en paralelo los enlaces candidatos, conservando su orden."""
+        if not urls:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(urls))) as executor:
+            downloads = list(executor.map(self._download_image, urls))
+        return [(url, *download) for url, download in zip(urls, downloads) if download is not None]
+
+    @staticmethod
+    def _save_images(images: List[FetchedImage], save_dir: str) -> List[str]:
+        """Guarda las imágenes aceptadas en save_dir y devuelve sus rutas."""
+        return [
+            fetched.save(os.path.join(save_dir, f"icon_{idx}.{fetched.extension}"))
+            for idx, fetched in enumerate(images)
+        ]
+
+    def _compute_similarity(self, original_embedding: torch.Tensor, images: List[Image.Image]) -> List[float]:
         """
-        Calcula la similitud entre el embedding original y el embedding de la imagen obtenido con CLIP.
-        Se descarga la imagen, se preprocesa y se computa el embedding.
+        Calcula la similitud entre el embedding original y el embedding CLIP de cada imagen.
+        Todas las imágenes se preprocesan y se codifican en una única pasada del modelo.
         """
         if self.clip_model is None or self.clip_preprocess is None:
             logger.error("Modelo CLIP no está disponible.")
-            return 0.0
-
-        try:
-            response = requests.get(image_url, timeout=10)
-            response.raise_for_status()
-            image = Image.open(BytesIO(response.content)).convert("RGB")
-        except Exception as e:
-            logger.error(f"Error al descargar o abrir la imagen: {image_url} - {e}")
-            return 0.0
+            return [0.0] * len(images)
+        if not images:
+            return []
 
         try:
-            image_input = self.clip_preprocess(image).unsqueeze(0).to(self.clip_device)
-            with torch.no_grad():
-                image_embedding = self.clip_model.encode_image(image_input)
-            image_embedding = image_embedding / image_embedding.norm(dim=-1, keepdim=True)
+            image_input = torch.stack([self.clip_preprocess(image) for image in images]).to(self.clip_device)
+            with torch.inference_mode():
+                image_embeddings = self.clip_model.encode_image(image_input)
+            image_embeddings = image_embeddings / image_embeddings.norm(dim=-1, keepdim=True)
 
             # Normalizar el embedding original
-            if original_embedding.ndim == 1:
-                original_norm = original_embedding / original_embedding.norm()
-            else:
-                original_norm = original_embedding / original_embedding.norm(dim=-1, keepdim=True)
-            similarity = (image_embedding @ original_norm.T).item()
-            return similarity
+            original_embedding = original_embedding.to(device=image_embeddings.device, dtype=image_embeddings.dtype)
+            original_norm = original_embedding.reshape(1, -1)
+            original_norm = original_norm / original_norm.norm(dim=-1, keepdim=True)
+            return (image_embeddings @ original_norm.T).flatten().tolist()
         except Exception as e:
-            logger.error(f"Error al procesar la imagen con CLIP: {image_url} - {e}")
-            return 0.0
+            logger.error(f"Error al procesar las imágenes con CLIP: {e}")
+            return [0.0] * len(images)
 
-    def _get_cache_key(self, embedding: Union[torch.Tensor, np.ndarray], num_links: int) -> str:
-        """Genera una clave única para el caché."""
-        if isinstance(embedding, np.ndarray):
-            embedding = torch.from_numpy(embedding)
-        emb_values = embedding.flatten()[:10].tolist()
-        emb_str = "_".join([f"{x:.4f}" for x in emb_values])
-        return f"{emb_str}_{num_links}"
+    def _get_cache_key(
+        self,
+        embedding: Union[torch.Tensor, np.ndarray],
+        num_links: int,
+        product_description: Optional[str] = None
+    ) -> str:
+        """
+        Genera la clave de caché: hash del embedding completo (en float32) y de todos los
+        parámetros que influyen en el resultado.
+        """
+        if isinstance(embedding, torch.Tensor):
+            embedding = embedding.detach().float().cpu().numpy()
+        embedding_hash = hashlib.sha256(np.ascontiguousarray(embedding, dtype=np.float32).tobytes()).hexdigest()
+        return DiskCache.make_key(
+            embedding_hash, num_links, product_description, self.model,
+            self.similarity_threshold, self.validate_urls
+        )
+
+    def _cache_get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Busca un resultado en la caché en memoria y, si no está, en la de disco."""
+        with self._cache_lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        result = self._disk_cache.get(key) if self._disk_cache is not None else None
+        if result is not None:
+            self._cache_put(key, result, persist=False)
+        return result
+
+    def _cache_put(self, key: str, result: Dict[str, Any], persist: bool = True):
+        """Guarda un resultado expulsando los menos usados si se supera cache_size."""
+        with self._cache_lock:
+            self._cache[key] = result
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        if persist and self._disk_cache is not None:
+            self._disk_cache.set(key, result)
 
     def find_product_images(
         self,
@@ -216,13 +281,30 @@ class ProductIconRetriever:
         num_links: int = 5,
         product_description: Optional[str] = None,
         force_refresh: bool = False,
-        max_attempts: int = 3  # Número máximo de reintentos para ajustar tokens
+        max_attempts: int = 3,  # Número máximo de reintentos para ajustar tokens
+        save_dir: Optional[str] = None
     ) -> Dict[str, Any]:
-        if self.cache_results and not force_refresh:
-            cache_key = self._get_cache_key(embedding, num_links)
-            if cache_key in self._cache:
+        """
+        Busca enlaces de imágenes parecidas al embedding.
+
+        Si se indica save_dir, las imágenes aceptadas se guardan allí reutilizando los bytes
+        descargados para calcular la similitud, y sus rutas se devuelven en 'files'. La caché sólo
+        guarda los enlaces y sus similitudes: con un resultado en caché las imágenes se vuelven a
+        descargar en save_dir.
+        """
+        # Las filas de Embeddings.getImgEmbeddings llegan como arrays de numpy
+        if isinstance(embedding, np.ndarray):
+            embedding = torch.from_numpy(embedding)
+
+        cache_key = self._get_cache_key(embedding, num_links, product_description) if self.cache_results else None
+        if cache_key and not force_refresh:
+            cached = self._cache_get(cache_key)
+            if cached is not None:
                 logger.info("Resultado recuperado de caché")
-                return self._cache[cache_key]
+                if not save_dir:
+                    return cached
+                downloads = self._download_candidates(cached["links"])
+                return dict(cached, files=self._save_images([fetched for _, fetched, _ in downloads], save_dir))
 
         # Convertir el embedding a una representación visual detallada
         embedding_repr = self._embedding_to_visual_representation(embedding)
@@ -272,14 +354,18 @@ class ProductIconRetriever:
             image_links = self._parse_image_links(response_text)
             logger.info(f"Enlaces extraídos sin filtrar: {image_links}")
 
-            # Filtrar enlaces: validar URL y calcular similitud mediante CLIP
+            # Filtrar enlaces: descargar en paralelo y calcular la similitud CLIP en lote
+            candidates = self._download_candidates(image_links)
+            similarities = self._compute_similarity(embedding, [image for _, _, image in candidates])
             filtered_links = []
-            for link in image_links:
-                if self._is_valid_image_url(link):
-                    sim = self._compute_similarity(embedding, link)
-                    logger.info(f"Similitud para {link}: {sim}")
-                    if sim >= self.similarity_threshold:
-                        filtered_links.append(link)
+            scores = []
+            accepted = []
+            for (link, fetched, _), sim in zip(candidates, similarities):
+                logger.info(f"Similitud para {link}: {sim}")
+                if sim >= self.similarity_threshold:
+                    filtered_links.append(link)
+                    scores.append(sim)
+                    accepted.append(fetched)
             logger.info(f"Enlaces filtrados (similares y válidos): {filtered_links}")
 
             # Si se obtuvo el número de enlaces deseados, salir del bucle
@@ -292,6 +378,7 @@ class ProductIconRetriever:
 
         result = {
             "links": filtered_links,
+            "scores": scores,
             "num_requested": num_links,
             "num_found": len(filtered_links),
             "success": True,
@@ -299,15 +386,18 @@ class ProductIconRetriever:
             "timestamp": time.time()
         }
 
-        if self.cache_results:
-            cache_key = self._get_cache_key(embedding, num_links)
-            self._cache[cache_key] = result
+        # Las rutas de los archivos no se guardan en caché: dependen de save_dir y pueden dejar de existir
+        if cache_key:
+            self._cache_put(cache_key, result)
+
+        if save_dir:
+            result = dict(result, files=self._save_images(accepted, save_dir))
 
         return result
 
     def batch_find_images(
         self,
-        embeddings: List[Union[torch.Tensor, np.ndarray]],
+        embeddings: Union[List[Union[torch.Tensor, np.ndarray]], np.ndarray],
         show_progress: bool = True,
         **kwargs
     ) -> List[Dict[str, Any]]:
@@ -315,7 +405,8 @@ class ProductIconRetriever:
         Procesa múltiples embeddings para encontrar imágenes de productos.
 
         Args:
-            embeddings: Lista de embeddings.
+            embeddings: Lista de embeddings o matriz (N, 512) como la que devuelve
+                Embeddings.getImgEmbeddings (cada fila es un embedding).
             show_progress: Mostrar barra de progreso.
             **kwargs: Parámetros adicionales para find_product_images.
 
@@ -332,8 +423,11 @@ class ProductIconRetriever:
         return results
 
     def clear_cache(self):
-        """Limpia la caché de resultados."""
-        self._cache = {}
+        """Limpia la caché de resultados (en memoria y en disco)."""
+        with self._cache_lock:
+            self._cache.clear()
+        if self._disk_cache is not None:
+            self._disk_cache.clear()
         logger.info("Caché limpiada")
 
     def export_results(self, results: Union[Dict[str, Any], List[Dict[str, Any]]], filename: str):
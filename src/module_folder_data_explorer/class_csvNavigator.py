@@ -1,34 +1,65 @@
 import os
 import csv
 import json
+import numpy as np
 import pandas as pd
 
+from module_search_engine.class_localIndex import LocalImageIndex
+from common.class_embeddingStore import EmbeddingStore
+from module_folder_data_explorer.utils_columnar import read_parquet
+
 class CSVDataNavigator:
     """
     Clase para navegar y acceder a los archivos de salida generados por FolderDataExporter.
     Permite cargar, filtrar, buscar y exportar información de los archivos CSV generados.
     """
     
-    def __init__(self, csv_file_path):
+    def __init__(self, csv_file_path, embeddings_file=None, columns=None):
         """
         Inicializa el navegador con la ruta al archivo CSV generado por FolderDataExporter.
         
         Args:
-            csv_file_path (str): Ruta al archivo CSV con los metadatos de las imágenes.
+            csv_file_path (str): Ruta al archivo CSV con los metadatos de las imágenes. También puede ser
+                                 un archivo .parquet generado con FolderDataExporter.export_parquet.
+            embeddings_file (str, optional): Archivo binario de embeddings (EmbeddingStore) al que apunta
+                                             la columna 'embedding_row'. Por defecto '_img_embeddings.f32'
+                                             junto al CSV.
+            columns (list, optional): Columnas que se cargan (por defecto, todas).
         """
         self.csv_file_path = csv_file_path
+        self.embedding_store = EmbeddingStore(
+            embeddings_file or os.path.join(os.path.dirname(csv_file_path), "_img_embeddings.f32"))
         self.data = None
-        self.load_data()
+        self._image_index = None
+        self.load_data(columns)
+    
+    @property
+    def is_parquet(self):
+        return self.csv_file_path.lower().endswith('.parquet')
     
-    def load_data(self):
+    def load_data(self, columns=None):
         """
-        Carga los datos del archivo CSV en un DataFrame de pandas para facilitar
+        Carga los datos del archivo CSV (o Parquet) en un DataFrame de pandas para facilitar
         su manipulación y consulta.
+        
+        Args:
+            columns (list, optional): Columnas que se cargan. En Parquet las demás columnas no se
+                                      leen del disco, así que las consultas de resumen pueden evitar
+                                      los embeddings por completo.
         """
         if not os.path.exists(self.csv_file_path):
             raise FileNotFoundError(f"El archivo CSV no existe en la ruta: {self.csv_file_path}")
         
-        self.data = pd.read_csv(self.csv_file_path)
+        if self.is_parquet:
+            # search_links y embedding ya son columnas de listas: no hay JSON que parsear
+            self.data = read_parquet(self.csv_file_path, columns)
+            if 'search_links' in self.data.columns:
+                self.data['search_links'] = self.data['search_links'].map(lambda x: [] if x is None else list(x))
+            print(f"Datos cargados. Total de registros: {len(self.data)}")
+            return
+        
+        self.data = pd.read_csv(
+            self.csv_file_path, usecols=None if columns is None else lambda column: column.strip() in columns)
         
         # Procesar columnas especiales (como listas JSON)
         if 'search_links' in self.data.columns:
@@ -96,22 +127,20 @@ class CSVDataNavigator:
             row = result.iloc[0]
         
         # Extraer propiedades solicitadas o todas si no se especifican
+        wants_embedding = properties is None or 'embedding' in properties
         if properties is None:
             properties = row.index.tolist()
         
         result_dict = {}
         for prop in properties:
-            if prop in row.index:
-                value = row[prop]
-                
-                # Procesamiento especial para ciertos tipos de datos
-                if prop == 'embedding' and isinstance(value, str):
-                    try:
-                        value = json.loads(value)
-                    except:
-                        pass
-                
-                result_dict[prop] = value
+            if prop in row.index and prop != 'embedding':
+                result_dict[prop] = row[prop]
+        
+        # El embedding se obtiene aparte: de su fila en el EmbeddingStore o de la columna antigua
+        if wants_embedding:
+            embedding = self._row_embedding(row)
+            if embedding is not None or 'embedding' in row.index:
+                result_dict['embedding'] = embedding
         
         # Añadir propiedades derivadas útiles
         if 'directory' in result_dict and 'file_name' in result_dict:
@@ -119,6 +148,28 @@ class CSVDataNavigator:
         
         return result_dict
     
+    def _row_embedding(self, row):
+        """
+        Embedding de una fila como lista. En un CSV se lee primero de su fila en el EmbeddingStore
+        ('embedding_row'); la columna 'embedding' de los CSVs antiguos sólo se usa si la fila no
+        tiene embedding_row. En Parquet el vector está en la columna 'embedding'.
+        Devuelve None si la fila no tiene embedding.
+        """
+        if not self.is_parquet and 'embedding_row' in row.index:
+            embedding_row = EmbeddingStore.parse_row(row['embedding_row'])
+            if embedding_row is not None:
+                return self.embedding_store.get(embedding_row).tolist()
+        
+        value = row['embedding'] if 'embedding' in row.index else None
+        if isinstance(value, np.ndarray):
+            return value.tolist()
+        if isinstance(value, str) and value.strip():
+            try:
+                return json.loads(value)
+            except json.JSONDecodeError:
+                return None
+        return None
+    
     def filter_by_description(self, query, field='long_description'):
         """
         Filtra imágenes cuya descripción contenga la consulta especificada.
@@ -229,6 +280,87 @@ class CSVDataNavigator:
         # Ordenar por similitud descendente
         return similar_images.sort_values(by='similarity', ascending=False)
     
+    def get_embedding_matrix(self):
+        """
+        Devuelve los embeddings de todas las imágenes que tienen fila en el EmbeddingStore (o, si se
+        ha cargado un Parquet, vector en la columna 'embedding').
+        
+        Returns:
+            tuple: (rutas, matriz). Si las filas del CSV coinciden con las del archivo binario, la
+                   matriz es la proyección en memoria (np.memmap) sin copiar los datos.
+        """
+        if self.is_parquet and 'embedding' in self.data.columns:
+            # En Parquet los vectores ya están en la columna 'embedding'
+            with_vectors = self.data[self.data['embedding'].notna()]
+            matrix = (np.stack(with_vectors['embedding'].to_numpy()).astype(np.float32) if len(with_vectors)
+                      else np.empty((0, self.embedding_store.dim), dtype=np.float32))
+            return self.get_image_paths(with_vectors), matrix
+        if 'embedding_row' not in self.data.columns:
+            return [], self.embedding_store.open_matrix()[:0]
+        
+        parsed = self.data['embedding_row'].map(EmbeddingStore.parse_row)
+        with_rows = self.data[parsed.notna()]
+        rows = parsed[parsed.notna()].astype(int).to_numpy()
+        paths = self.get_image_paths(with_rows)
+        matrix = self.embedding_store.open_matrix()
+        if len(rows) == len(matrix) and np.array_equal(rows, np.arange(len(matrix))):
+            return paths, matrix
+        return paths, matrix[rows]
+    
+    def _get_image_index(self):
+        """
+        Construye (una sola vez) el LocalImageIndex con los embeddings de la colección.
+        """
+        if self._image_index is None and self.is_parquet:
+            paths, matrix = self.get_embedding_matrix()
+            self._image_index = LocalImageIndex(matrix, paths)
+        elif self._image_index is None:
+            self._image_index = LocalImageIndex.from_csv(self.csv_file_path, self.embedding_store.path)
+        return self._image_index
+    
+    def get_similar_images(self, target_image_name, top_k=5):
+        """
+        Encuentra las imágenes de la colección visualmente más parecidas a la imagen objetivo,
+        comparando sus embeddings con un LocalImageIndex (un único producto matricial).
+        
+        Args:
+            target_image_name (str): Nombre del archivo de imagen objetivo.
+            top_k (int): Número de imágenes similares a devolver (sin contar la propia imagen).
+            
+        Returns:
+            list: Lista de diccionarios {'id', 'index', 'score'} ordenados por similitud descendente.
+        """
+        image_index = self._get_image_index()
+        
+        target_info = self.get_row_properties(target_image_name, ['directory', 'file_name'])
+        if not target_info or target_info['full_path'] not in image_index.ids:
+            return []
+        
+        target_row = image_index.ids.index(target_info['full_path'])
+        results = image_index.search(image_index.matrix[target_row], k=top_k + 1)
+        return [result for result in results if result['index'] != target_row][:top_k]
+    
+    def search_by_text(self, embeddings, query, top_k=5):
+        """
+        Ordena las imágenes de la colección según su parecido con una consulta de texto, usando el
+        codificador de texto de CLIP (Embeddings.getTextEmbeddings). Funciona sin conexión y sin
+        consumir cuota de la API de búsqueda.
+        
+        Args:
+            embeddings (Embeddings): Instancia con el modelo CLIP cargado.
+            query (str or list): Consulta de texto o lista de consultas.
+            top_k (int): Número de imágenes a devolver por consulta.
+            
+        Returns:
+            list: Lista de diccionarios {'id', 'index', 'score'} (o una lista por consulta si
+                  query es una lista).
+        """
+        image_index = self._get_image_index()
+        
+        queries = [query] if isinstance(query, str) else list(query)
+        results = image_index.search_batch(embeddings.getTextEmbeddings(queries), k=top_k)
+        return results[0] if isinstance(query, str) else results
+    
     def get_all_output_directories(self):
         """
         Obtiene todos los directorios de salida únicos definidos en los metadatos.
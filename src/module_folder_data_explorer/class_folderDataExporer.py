@@ -7,17 +7,31 @@ from dotenv import find_dotenv, load_dotenv
 from module_embeddings.class_embedinnizer import Embeddings
 from module_embeddings.class_embeddingDescriber import EmbeddingDescriber
 from module_search_engine.class_searchEngine import GoogleSearchEngine 
+from common.class_embeddingStore import EmbeddingStore
+from module_folder_data_explorer.class_processingPipeline import ProcessingPipeline
+from module_folder_data_explorer.class_runJournal import RunJournal
+from module_folder_data_explorer.class_folderManifest import FolderManifest
+from module_folder_data_explorer.class_metadataStore import MetadataStore
+from module_folder_data_explorer.utils_columnar import write_parquet
+from common.class_diskCache import DiskCache
 
 class FolderDataExporter:
-    def __init__(self, folder_path,output_folder, output_csv_path='OutputFiles'):
+    def __init__(self, folder_path,output_folder, output_csv_path='OutputFiles', embeddings_file=None):
         """
         folder_path: ruta de la carpeta a procesar.
         output_folder: carpeta donde se almacenan los archivos de salida.
+        embeddings_file: archivo binario donde se guardan los embeddings (EmbeddingStore). El CSV sólo
+                         guarda la fila de cada embedding en la columna 'embedding_row'. Por defecto
+                         '_img_embeddings.f32' dentro de output_folder.
         """
         self.folder_path = folder_path
         self.output_folder = output_folder
         self.output_csv_path = output_csv_path
         os.makedirs(self.output_folder, exist_ok=True)
+        self.embedding_store = EmbeddingStore(embeddings_file or os.path.join(self.output_folder, "_img_embeddings.f32"))
+        # Manifiesto (ruta, tamaño, mtime, hash) para detectar imágenes nuevas, modificadas o borradas
+        self.manifest = FolderManifest(os.path.join(self.output_folder, "_manifest.sqlite"))
+        self._metadata_stores = {}
     
     def get_file_info(self, file_path=''):
         """
@@ -31,7 +45,7 @@ class FolderDataExporter:
         return {
             "file_name": file_name,
             "directory": directory,
-            "embedding": "",            # Se completará con el embedding de la imagen
+            "embedding_row": "",        # Se completará con la fila del embedding en el EmbeddingStore
             "short_description": "",    # Se completará con la descripción corta
             "long_description": "",     # Se completará con la descripción larga
             "search_links": "",         # Se completará con la lista de links de búsqueda
@@ -51,16 +65,13 @@ class FolderDataExporter:
         file_data = []
 
         # Recorre todos los archivos en el directorio
-        for root, _, files in os.walk(directory_path):
-            for file_name in files:
-                file_path = os.path.join(root, file_name)
-                file_info = self.get_file_info(file_path)
-                file_data.append(file_info)
+        for entry in FolderManifest.iter_files(directory_path, extensions=None):
+            file_data.append(self.get_file_info(entry.path))
 
         # Guarda los datos en un archivo CSV
         with open(output_csv_path, mode='w', newline='', encoding='utf-8') as csv_file:
             writer = csv.DictWriter(csv_file, fieldnames=[
-                "file_name", "directory", "embedding", "short_description",
+                "file_name", "directory", "embedding_row", "short_description",
                 "long_description", "search_links", "output_file_directory", "img_counts"
             ])
             writer.writeheader()
@@ -68,23 +79,42 @@ class FolderDataExporter:
 
         print(f"Datos guardados en {output_csv_path}")  
     def process_single_image_with_models(self, image_path, embeddings, embeddingTranslator, researcher,
-                                           extra_context='', theme='', search_engine='google_images'):
+                                           extra_context='', theme='', search_engine='google_images',
+                                           image_embedding=None, embedding_row=None):
         """
         Procesa una sola imagen aplicando los modelos:
           - Obtiene el embedding.
           - Extrae las descripciones (corta y larga).
           - Realiza la búsqueda para obtener links.
           - Crea (si no existe) un directorio de salida y cuenta las imágenes en él.
+
+        Si se proporciona image_embedding (por ejemplo, una fila de Embeddings.getImgEmbeddings)
+        se reutiliza en lugar de volver a pasar la imagen por CLIP. El embedding se guarda en el
+        EmbeddingStore (en embedding_row si la imagen ya tenía fila asignada).
         
-        Retorna un diccionario con toda la información.
+        Retorna un diccionario con toda la información. Si no se ha podido generar la descripción,
+        incluye 'description_error' con el motivo y no se realiza la búsqueda.
         """
         file_info = self.get_file_info(image_path)
         
-        # 1. Obtener el embedding
-        image_embedding = embeddings.getImgEmbedding(image_path)
-        file_info['embedding'] = image_embedding.tolist() if hasattr(image_embedding, 'tolist') else image_embedding
+        # 1. Obtener el embedding (si no se ha calculado ya por lotes)
+        if image_embedding is None:
+            image_embedding = embeddings.getImgEmbedding(image_path)
+        file_info['embedding_row'] = self.embedding_store.put(image_embedding,
+                                                                 row=EmbeddingStore.parse_row(embedding_row))
         
-        # 2. Extraer descripciones. Se asume que extractDescription retorna un diccionario con claves 'concise_description' y 'detailed_description'
+        # 2. Extraer descripciones
+        self._describe_image(file_info, image_embedding, embeddingTranslator, extra_context, theme, search_engine)
+
+        # 3. Buscar links y completar el directorio de salida
+        return self._search_image(file_info, researcher)
+
+    def _describe_image(self, file_info, image_embedding, embeddingTranslator, extra_context='', theme='',
+                        search_engine='google_images'):
+        """
+        Completa las descripciones corta y larga de file_info a partir del embedding.
+        """
+        # Se asume que extractDescription retorna un diccionario con claves 'concise_description' y 'detailed_description'
         img_metadata = embeddingTranslator.extractDescription(
             image_embedding=image_embedding,
             additional_context=extra_context,
@@ -93,6 +123,19 @@ class FolderDataExporter:
         
         file_info['short_description'] = img_metadata.get('concise_description', '')
         file_info['long_description'] = img_metadata.get('detailed_description', '')
+        # extractDescription no lanza excepciones: un error (o una respuesta vacía) se marca para
+        # no buscar con una consulta vacía ni guardar la imagen como terminada
+        if img_metadata.get('error') or not file_info['short_description']:
+            file_info['description_error'] = img_metadata.get('message', 'descripción vacía')
+        return file_info
+
+    def _search_image(self, file_info, researcher):
+        """
+        Completa los links de búsqueda, el directorio de salida y el conteo de imágenes de file_info.
+        """
+        if 'description_error' in file_info:
+            return file_info
+        image_path = os.path.join(file_info['directory'], file_info['file_name'])
 
         # 3. Realizar la búsqueda y obtener links (se espera que researcher.searchImgs retorne una lista de URLs)
         #   Esta es la linea mas importante. Aqui, se le puede decir que descripcion elegir.
@@ -127,39 +170,109 @@ class FolderDataExporter:
         if output_dir and not os.path.exists(output_dir):
             os.makedirs(output_dir, exist_ok=True)
     
+    @staticmethod
+    def _fieldnames(rows):
+        """
+        Devuelve la unión ordenada de las columnas de todos los registros.
+        """
+        keys = {}
+        for row in rows:
+            keys.update(dict.fromkeys(row.keys()))
+        return list(keys)
+    
+    def metadata_store(self, csv_file=None):
+        """
+        Devuelve el MetadataStore asociado a un CSV de metadatos (mismo nombre con extensión
+        .sqlite). El almacén es la fuente de verdad y el CSV una exportación suya. Si el CSV ha
+        cambiado desde la última sincronización (por ejemplo, se ha editado a mano o es de una
+        versión anterior) y el almacén no tiene cambios sin exportar, se vuelve a importar; si
+        ambos han cambiado, se conserva el almacén y el CSV se sobrescribirá en la próxima exportación.
+        """
+        if csv_file is None:
+            csv_file = os.path.join(self.output_folder, "_img_metadata.csv")
+        store = self._metadata_stores.get(csv_file)
+        if store is None:
+            store = MetadataStore(os.path.splitext(csv_file)[0] + ".sqlite")
+            self._metadata_stores[csv_file] = store
+        if store.csv_diverged(csv_file):
+            if len(store) == 0 or not store.dirty:
+                store.import_csv(csv_file, replace=True)
+            else:
+                print(f"Aviso: {csv_file} ha cambiado, pero el almacén tiene cambios sin exportar; "
+                      f"se conserva el almacén ({store.path})")
+        return store
+
+    def export_metadata_csv(self, csv_file=None):
+        """
+        Exporta al CSV todos los metadatos del MetadataStore (por ejemplo, al terminar una serie de
+        llamadas a update_data_range). Es O(N): conviene hacerlo una vez y no tras cada actualización.
+        """
+        if csv_file is None:
+            csv_file = os.path.join(self.output_folder, "_img_metadata.csv")
+        self.metadata_store(csv_file).export_csv(csv_file)
+        print(f"Datos actualizados en: {csv_file}")
+        return csv_file
+
     def export_csv(self, data, output_file):
         """
         Exporta los datos en formato CSV.
-        Si el archivo ya existe, se leen las filas existentes y se añade la nueva información,
-        manteniendo todas las columnas completas.
+        Las nuevas filas se añaden al MetadataStore del CSV sin leer las existentes. Si el CSV está
+        al día y ya tiene todas las columnas de las nuevas filas, éstas se añaden al final del
+        archivo; si no, se regenera el CSV desde el almacén con la unión de todas las columnas.
         """
 
         self._ensure_output_dir(output_file)
-        combined_data = []
-        
-        # Si el archivo ya existe, leer la información previa
-        if os.path.exists(output_file):
-            with open(output_file, 'r', newline='', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    row = {k.strip(): v for k, v in row.items()}  # Limpia las claves
-                    combined_data.append(row)
-        
-        # Añadir los nuevos datos
-        combined_data.extend(data)
-        
-        # Se usan las claves del primer registro (ya sea de los datos existentes o de los nuevos)
-        keys = combined_data[0].keys() if combined_data else data[0].keys()
-        
-        # Escribir todos los datos combinados en el archivo CSV
-        with open(output_file, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=keys)
-            writer.writeheader()
-            writer.writerows(combined_data)
+        store = self.metadata_store(output_file)
+        # Si el CSV ya iba por detrás del almacén, no basta con añadir las filas nuevas
+        was_dirty = store.dirty
+        store.append(data)
+        self._append_csv_rows(store, data, output_file, was_dirty)
         print(f"Datos exportados a CSV en: {output_file}")
 
+    def _append_csv_rows(self, store, rows, csv_file, was_dirty):
+        """
+        Lleva al CSV las filas recién añadidas al almacén. Si el CSV estaba al día (was_dirty es
+        False) y su cabecera ya tiene todas las columnas de las filas, éstas se añaden al final; si
+        no, se regenera el CSV desde el almacén con la unión de todas las columnas.
+        """
+        header = None
+        if os.path.exists(csv_file) and not was_dirty:
+            with open(csv_file, 'r', newline='', encoding='utf-8') as f:
+                header = [k.strip() for k in next(csv.reader(f), [])]
+        if header and set(self._fieldnames(rows)) <= set(header):
+            with open(csv_file, 'a', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=header, restval='')
+                writer.writerows(rows)
+            store.mark_synced(csv_file)
+        else:
+            # Se usan las claves de todos los registros (los CSV antiguos tienen 'embedding' en lugar de 'embedding_row')
+            store.export_csv(csv_file)
+
+    def export_parquet(self, output_file=None, csv_file=None):
+        """
+        Exporta los metadatos del MetadataStore de csv_file a Parquet, con los embeddings en una
+        columna de vectores float32 de tamaño fijo y search_links como lista de strings.
+        Necesita pyarrow.
+
+        Args:
+            output_file (str, optional): Archivo Parquet. Por defecto, csv_file con extensión .parquet.
+            csv_file (str, optional): CSV de metadatos. Por defecto, '_img_metadata.csv' en output_folder.
+
+        Returns:
+            str: Ruta del archivo Parquet escrito.
+        """
+        if csv_file is None:
+            csv_file = os.path.join(self.output_folder, "_img_metadata.csv")
+        output_file = output_file or os.path.splitext(csv_file)[0] + ".parquet"
+        self._ensure_output_dir(output_file)
+        write_parquet(self.metadata_store(csv_file).rows(), output_file, self.embedding_store)
+        print(f"Datos exportados a Parquet en: {output_file}")
+        return output_file
+
     def update_data_range(self, embeddings, embeddingTranslator, researcher, file_range=None,
-                          extra_context='', theme='', search_engine='google_images', csv_file=None):
+                          extra_context='', theme='', search_engine='google_images', csv_file=None,
+                          batch_size=32, describe_workers=4, search_workers=4, queue_size=32,
+                          resume=True, journal_file=None, incremental=False, write_csv=True):
         """
         Actualiza los metadatos de un rango específico de archivos.
         
@@ -171,111 +284,142 @@ class FolderDataExporter:
             search_engine (str): Motor de búsqueda.
             csv_file (str, optional): Ruta del archivo CSV a actualizar. Si no se especifica, se usa
                                       un archivo por defecto en self.output_folder.
+            batch_size (int): Número de imágenes por pasada de CLIP al calcular los embeddings.
+            describe_workers (int): Descripciones (llamadas al LLM) simultáneas.
+            search_workers (int): Búsquedas simultáneas.
+            queue_size (int): Tamaño máximo de las colas entre etapas del pipeline.
+            resume (bool): Si es True, las imágenes que ya constan en el diario de una ejecución
+                           interrumpida con la misma configuración no se vuelven a procesar.
+            journal_file (str, optional): Diario de la ejecución. Por defecto, csv_file + '.journal'.
+            incremental (bool): Si es True, sólo se procesan las imágenes nuevas o modificadas desde
+                                la última ejecución según el manifiesto de la carpeta.
+            write_csv (bool): Si es True (por defecto), el CSV se actualiza al terminar: las imágenes
+                              nuevas se añaden al final y sólo se reescribe entero si ha cambiado
+                              alguna fila existente. Con False los resultados sólo se guardan en el
+                              MetadataStore y el CSV se genera con export_metadata_csv(csv_file).
         
         La función realiza lo siguiente:
-          1. Obtiene la lista de archivos de imagen y aplica el rango especificado.
-          2. Procesa cada imagen del rango para obtener su metadata actualizada.
-          3. Lee el CSV existente (si existe) y fusiona los registros, actualizando únicamente las columnas
-             cuyos valores hayan cambiado.
-          4. Escribe el CSV actualizado.
+          1. Obtiene la lista de archivos de imagen comparando la carpeta con el manifiesto y aplica
+             el rango especificado (y, en modo incremental, descarta las imágenes sin cambios).
+          2. Abre el MetadataStore del CSV (importando el CSV existente la primera vez).
+          3. Procesa el rango con un ProcessingPipeline alimentado por Embeddings.iterImgEmbeddings
+             (CLIP por lotes con un único ImagePrefetcher), que guarda los embeddings en el
+             EmbeddingStore y lanza descripciones y búsquedas concurrentes, de modo que las etapas
+             se solapan. Después fusiona los registros en el almacén (upsert por ruta), actualizando
+             únicamente las columnas cuyos valores hayan cambiado.
+          4. Si write_csv es True, actualiza el CSV (añadiendo las filas nuevas si no ha cambiado
+             ninguna existente).
+
+        Cada imagen terminada se guarda en un RunJournal en disco antes de seguir, así que una
+        ejecución interrumpida no pierde el trabajo hecho: al relanzarla con la misma
+        configuración (modelo, cuantización, tema, contexto y motor) se reanuda donde se quedó. El
+        diario se borra cuando sus resultados ya están en el MetadataStore.
+
+        Si no se puede generar la descripción de una imagen (extractDescription devuelve un error o
+        una descripción vacía), la imagen no se busca, no se guarda en el almacén ni en el manifiesto
+        y no se anota como terminada, de modo que la siguiente ejecución la vuelve a procesar.
+
+        Al terminar se actualiza el manifiesto con las imágenes procesadas. Si se procesa la carpeta
+        completa (sin file_range), las imágenes borradas se marcan con deleted=1.
         """
         if csv_file is None:
             csv_file = os.path.join(self.output_folder, "_img_metadata.csv")
         
-        # 1. Recopilar y ordenar los archivos de imagen
-        files = []
-        for root, dirs, files_list in os.walk(self.folder_path):
-            for f in files_list:
-                if f.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.gif')):
-                    files.append(os.path.join(root, f))
-        files.sort()  # Asegura un orden estable
+        # 1. Recopilar y ordenar los archivos de imagen (sólo se calcula el hash de los que han
+        #    cambiado de tamaño o de fecha desde la última ejecución)
+        delta = self.manifest.scan(self.folder_path)
+        files = sorted(delta.added + delta.modified + delta.unchanged)  # Asegura un orden estable
         
         # Aplicar el rango especificado, si se define
         if file_range:
             start, end = file_range
             files = files[start:end]
+        if incremental:
+            changed = set(delta.changed)
+            files = [file_path for file_path in files if file_path in changed]
+
+        # Imágenes ya terminadas en una ejecución anterior interrumpida con la misma configuración
+        journal = RunJournal(journal_file or csv_file + ".journal")
+        signature = DiskCache.make_key(
+            getattr(embeddings, 'model_name', None), getattr(embeddingTranslator, 'model', None),
+            getattr(embeddings, 'quantize', None), extra_context, theme, search_engine
+        )
+        journaled = journal.completed(signature) if resume else {}
+        if not resume:
+            journal.clear()
+        # Filas del EmbeddingStore ya asignadas en la ejecución interrumpida
+        journaled_rows = journal.embedding_rows(signature) if resume else {}
         
-        # 2. Procesar cada imagen en el rango y almacenar la nueva metadata usando la ruta completa como clave
-        new_data = {}
-        for file_path in files:
-            new_info = self.process_single_image_with_models(
-                file_path, embeddings, embeddingTranslator, researcher,
-                extra_context=extra_context, theme=theme, search_engine=search_engine
-            )
-            new_data[file_path] = new_info
+        # 2. Abrir el almacén de metadatos (sólo se leen los registros de las imágenes procesadas)
+        store = self.metadata_store(csv_file)
         
-        # 3. Leer la data existente del CSV (si existe) y almacenarla en un diccionario
-        existing_data = {}
-        if os.path.exists(csv_file):
-            with open(csv_file, 'r', newline='', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    # Usamos la combinación de 'directory' y 'file_name' para identificar de forma única cada registro
-                    row = {k.strip(): v for k, v in row.items()}  # Limpia las claves
-                    key = os.path.join(row["directory"], row["file_name"])
-                    existing_data[key] = row
+        # 3. Procesar el rango con un pipeline por etapas y almacenar la nueva metadata usando la ruta
+        #    completa como clave. Las imágenes que ya tenían fila en el EmbeddingStore (en el almacén o
+        #    en el diario de la ejecución interrumpida) la reutilizan en lugar de añadir una nueva.
+        pending = [file_path for file_path in files if file_path not in journaled]
+
+        def embedded_images():
+            # Un único recorrido de CLIP (con su ImagePrefetcher) por todas las imágenes pendientes, así
+            # que la carga del lote siguiente se solapa con la pasada del modelo sobre el actual
+            for start, batch_embeddings in embeddings.iterImgEmbeddings(pending, batch_size=batch_size):
+                for offset in range(len(batch_embeddings)):
+                    yield pending[start + offset], batch_embeddings[offset:offset + 1]
+
+        def embed_stage(items):
+            results, rows = [], {}
+            for file_path, image_embedding in items:
+                file_info = self.get_file_info(file_path)
+                existing_row = EmbeddingStore.parse_row((store.get(file_path) or {}).get('embedding_row'))
+                if existing_row is None:
+                    existing_row = journaled_rows.get(file_path)
+                rows[file_path] = self.embedding_store.put(image_embedding, row=existing_row)
+                file_info['embedding_row'] = rows[file_path]
+                results.append((file_info, image_embedding))
+            journal.record_embedding_rows(signature, rows)
+            return results
+
+        def describe_stage(item):
+            file_info, image_embedding = item
+            return self._describe_image(file_info, image_embedding, embeddingTranslator,
+                                        extra_context, theme, search_engine)
+
+        pipeline = (ProcessingPipeline(queue_size=queue_size)
+                    .add_stage("clip", embed_stage, batch_size=batch_size)
+                    .add_stage("descripcion", describe_stage, workers=describe_workers)
+                    .add_stage("busqueda", lambda file_info: self._search_image(file_info, researcher),
+                               workers=search_workers))
+        # El hilo actual es el único escritor: anota cada imagen terminada en el diario y al final
+        # ordena los resultados como la entrada
+        # Las imágenes sin descripción no se anotan como terminadas: se reintentan en la siguiente ejecución
+        failed = {}
+        for idx, new_info in pipeline.run(embedded_images()):
+            if 'description_error' in new_info:
+                failed[pending[idx]] = new_info
+                continue
+            journal.record(pending[idx], signature, new_info)
+            journaled[pending[idx]] = new_info
+        if failed:
+            print(f"Aviso: no se ha podido describir {len(failed)} imagen(es); se reintentarán en la "
+                  f"siguiente ejecución. Primer error: {next(iter(failed.values()))['description_error']}")
+        files = [file_path for file_path in files if file_path not in failed]
+        new_data = {file_path: journaled[file_path] for file_path in files}
         
-        # 4. Fusionar la nueva data con la existente, actualizando solo las columnas modificadas
-        for file_path, new_info in new_data.items():
-            key = file_path  # La clave que usamos es la ruta completa
-            if key in existing_data:
-                for col, new_value in new_info.items():
-                    if col == 'img_counts':
-                        # Convertir el valor existente a entero (CSV lo lee como string) y sumar el nuevo conteo
-                        try:
-                            existing_count = int(existing_data[key].get(col, 0))
-                        except ValueError:
-                            existing_count = 0
-                        combined_count = existing_count + int(new_value)
-                        existing_data[key][col] = combined_count
-                    elif col == 'search_links':
-                        # Procesar search_links para concatenar nuevos links sin duplicar
-                        # Intentamos interpretar el valor existente como una lista JSON, si falla, lo separamos por comas
-                        try:
-                            existing_links = json.loads(existing_data[key].get(col, "[]"))
-                        except Exception:
-                            existing_str = existing_data[key].get(col, "")
-                            existing_links = [link.strip() for link in existing_str.split(",") if link.strip()] if existing_str else []
-                        
-                        # Aseguramos que el nuevo valor es una lista
-                        if not isinstance(new_value, list):
-                            try:
-                                new_links = json.loads(new_value)
-                            except Exception:
-                                new_links = [link.strip() for link in new_value.split(",") if link.strip()]
-                        else:
-                            new_links = new_value
-                        
-                        # Agregar nuevos links que no estén ya en la lista existente
-                        for link in new_links:
-                            if link not in existing_links:
-                                existing_links.append(link)
-                        
-                        # Guardamos la lista actualizada como string JSON
-                        existing_data[key][col] = json.dumps(existing_links)
-                    else:
-                        # Actualización normal para las demás columnas
-                        if new_value and new_value != existing_data[key].get(col, ""):
-                            existing_data[key][col] = new_value
+        # 4. Fusionar la nueva data con la existente, actualizando solo las columnas modificadas.
+        #    Las imágenes borradas de la carpeta se conservan marcadas como borradas.
+        was_dirty = store.dirty
+        inserted, updated = store.upsert(new_data)
+        if file_range:
+            delta.deleted = []  # Con un rango no se tiene la vista completa de la carpeta
+        deleted = store.mark_deleted(delta.deleted)
+
+        # 5. Actualizar el CSV: si sólo hay imágenes nuevas basta con añadirlas al final
+        if write_csv and len(store):
+            if updated or deleted:
+                self.export_metadata_csv(csv_file)
             else:
-                # Para registros nuevos, formateamos search_links como JSON si no lo es
-                if 'search_links' in new_info:
-                    if not isinstance(new_info['search_links'], list):
-                        try:
-                            links_list = json.loads(new_info['search_links'])
-                        except Exception:
-                            links_list = [link.strip() for link in new_info['search_links'].split(",") if link.strip()]
-                        new_info['search_links'] = json.dumps(links_list)
-                    else:
-                        new_info['search_links'] = json.dumps(new_info['search_links'])
-                existing_data[key] = new_info
-        # 5. Escribir la data fusionada en el CSV
-        if existing_data:
-            # Obtener el orden de columnas a partir de uno de los registros
-            keys = list(next(iter(existing_data.values())).keys())
-            with open(csv_file, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=keys)
-                writer.writeheader()
-                for entry in existing_data.values():
-                    writer.writerow(entry)
-            print(f"Datos actualizados en: {csv_file}")
\ No newline at end of file
+                self._append_csv_rows(store, [store.get(key) for key in inserted], csv_file, was_dirty)
+                print(f"Datos actualizados en: {csv_file}")
+        journal.clear()
+        # Las imágenes fallidas conservan su fila del EmbeddingStore para el reintento
+        journal.record_embedding_rows(signature, {file_path: info['embedding_row'] for file_path, info in failed.items()})
+        self.manifest.commit(delta, paths=files)
\ No newline at end of file
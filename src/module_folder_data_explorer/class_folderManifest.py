@@ -0,0 +1,144 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from module_embeddings.class_embeddingCache import EmbeddingCache
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.gif')
+
+
+class ManifestDelta:
+    """Diferencias entre el contenido actual de una carpeta y el manifiesto."""
+    def __init__(self):
+        self.added: List[str] = []
+        self.modified: List[str] = []
+        self.unchanged: List[str] = []
+        self.deleted: List[str] = []
+        # (size, mtime_ns, hash) de los archivos nuevos, modificados o sólo tocados
+        self.entries: Dict[str, Tuple[int, int, str]] = {}
+
+    @property
+    def changed(self) -> List[str]:
+        """Archivos nuevos o modificados, ordenados."""
+        return sorted(self.added + self.modified)
+
+    def summary(self) -> Dict[str, int]:
+        return {
+            "added": len(self.added),
+            "modified": len(self.modified),
+            "unchanged": len(self.unchanged),
+            "deleted": len(self.deleted),
+        }
+
+
+class FolderManifest:
+    """
+    Manifiesto (ruta, tamaño, mtime, hash del contenido) de los archivos de una carpeta,
+    guardado en SQLite.
+
+    scan() recorre la carpeta con os.scandir y sólo calcula el hash de los archivos cuyo tamaño
+    o fecha de modificación han cambiado desde la última vez, así que revisar una colección
+    grande y casi estática cuesta un stat por archivo. Un archivo con mtime distinto pero el
+    mismo hash se considera sin cambios. Los archivos que ya no existen se marcan como borrados
+    (tombstone) en lugar de eliminarse del manifiesto.
+
+    scan() no modifica el manifiesto: commit() aplica el resultado cuando el procesado de los
+    cambios ha terminado, de modo que una ejecución fallida vuelve a detectarlos.
+    """
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Ruta del archivo SQLite (por ejemplo 'output_folder/_manifest.sqlite').
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, "
+                "hash TEXT NOT NULL, deleted INTEGER NOT NULL DEFAULT 0, updated REAL NOT NULL)"
+            )
+
+    @staticmethod
+    def iter_files(root: str, extensions: Optional[Tuple[str, ...]] = IMAGE_EXTENSIONS) -> Iterator[os.DirEntry]:
+        """Recorre root recursivamente con os.scandir y devuelve las entradas de los archivos."""
+        pending = [root]
+        while pending:
+            with os.scandir(pending.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    elif entry.is_file() and (extensions is None or entry.name.lower().endswith(extensions)):
+                        yield entry
+
+    def _live_entries(self) -> Dict[str, Tuple[int, int, str]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT path, size, mtime_ns, hash FROM files WHERE deleted = 0").fetchall()
+        return {path: (size, mtime_ns, digest) for path, size, mtime_ns, digest in rows}
+
+    def scan(self, root: str, extensions: Optional[Tuple[str, ...]] = IMAGE_EXTENSIONS) -> ManifestDelta:
+        """Compara el contenido actual de root con el manifiesto."""
+        known = self._live_entries()
+        delta = ManifestDelta()
+        seen = set()
+        for entry in self.iter_files(root, extensions):
+            path = entry.path
+            seen.add(path)
+            stat = entry.stat()
+            previous = known.get(path)
+            if previous is not None and previous[:2] == (stat.st_size, stat.st_mtime_ns):
+                delta.unchanged.append(path)
+                continue
+            digest = EmbeddingCache.file_hash(path)
+            delta.entries[path] = (stat.st_size, stat.st_mtime_ns, digest)
+            if previous is None:
+                delta.added.append(path)
+            elif previous[2] != digest:
+                delta.modified.append(path)
+            else:
+                delta.unchanged.append(path)  # Sólo ha cambiado la fecha
+        # Los borrados sólo se detectan dentro de la carpeta recorrida
+        prefix = os.path.join(root, "")
+        delta.deleted = sorted(path for path in known if path not in seen and path.startswith(prefix))
+        return delta
+
+    def commit(self, delta: ManifestDelta, paths: Optional[List[str]] = None):
+        """
+        Aplica al manifiesto el resultado de scan().
+
+        Args:
+            delta: Resultado de scan().
+            paths: Si se indica, sólo se registran los archivos nuevos o modificados de esta
+                lista (por ejemplo, los que se han procesado); los borrados se aplican siempre.
+        """
+        selected = delta.entries
+        if paths is not None:
+            # Los archivos sólo tocados (mismo hash) se registran siempre para no volver a leerlos
+            changed = set(delta.added) | set(delta.modified)
+            selected = {p: e for p, e in delta.entries.items() if p not in changed}
+            selected.update({p: delta.entries[p] for p in paths if p in delta.entries})
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO files (path, size, mtime_ns, hash, deleted, updated) VALUES (?, ?, ?, ?, 0, ?)",
+                [(path, size, mtime_ns, digest, now) for path, (size, mtime_ns, digest) in selected.items()]
+            )
+            self._conn.executemany(
+                "UPDATE files SET deleted = 1, updated = ? WHERE path = ?",
+                [(now, path) for path in delta.deleted]
+            )
+
+    def deleted_paths(self) -> List[str]:
+        """Rutas marcadas como borradas."""
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT path FROM files WHERE deleted = 1 ORDER BY path")]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,264 @@
+import csv
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+def parse_links(value: Any) -> List[str]:
+    """Interpreta search_links como lista JSON o, si no lo es, como texto separado por comas."""
+    if isinstance(value, list):
+        return value
+    if not value:
+        return []
+    try:
+        return json.loads(value)
+    except Exception:
+        return [link.strip() for link in str(value).split(",") if link.strip()]
+
+
+def merge_metadata(existing: Optional[Dict[str, Any]], new_info: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Fusiona los metadatos nuevos de una imagen con los que ya tenía, actualizando solo las
+    columnas modificadas:
+      - img_counts se suma al conteo existente.
+      - search_links se concatena sin duplicar y se guarda como lista JSON.
+      - embedding_row se reemplaza (puede ser 0) y se elimina el 'embedding' JSON de CSVs antiguos.
+      - El resto de columnas se actualiza si el valor nuevo no está vacío y es distinto.
+    """
+    if existing is None:
+        # Para registros nuevos, formateamos search_links como JSON si no lo es
+        record = dict(new_info)
+        if 'search_links' in record:
+            record['search_links'] = json.dumps(parse_links(record['search_links']))
+        return record
+
+    record = dict(existing)
+    record.pop('deleted', None)  # La imagen ha vuelto a aparecer
+    for col, new_value in new_info.items():
+        if col == 'img_counts':
+            # El valor existente puede venir de un CSV como string
+            try:
+                existing_count = int(record.get(col, 0))
+            except ValueError:
+                existing_count = 0
+            record[col] = existing_count + int(new_value)
+        elif col == 'search_links':
+            links = parse_links(record.get(col, "[]"))
+            links.extend(link for link in parse_links(new_value) if link not in links)
+            record[col] = json.dumps(links)
+        elif col == 'embedding_row':
+            record[col] = new_value
+            record.pop('embedding', None)
+        elif new_value and new_value != record.get(col, ""):
+            record[col] = new_value
+    return record
+
+
+class MetadataStore:
+    """
+    Almacén de los metadatos de las imágenes en SQLite (modo WAL).
+
+    Cada registro es un diccionario guardado como JSON, con una clave opcional (la ruta completa
+    de la imagen). append() inserta registros sin leer los existentes y upsert() lee y reescribe
+    sólo los registros de las claves indicadas, así que el coste de una actualización depende
+    del número de imágenes actualizadas y no del tamaño total de la colección. Los registros
+    conservan el orden de inserción.
+
+    El almacén es la fuente de verdad y el CSV, una exportación: export_csv() lo genera bajo
+    demanda e import_csv() carga un CSV existente (por ejemplo, el de una versión anterior). El
+    almacén recuerda el tamaño y la fecha del CSV en la última sincronización y si ha cambiado
+    desde entonces (dirty), de modo que quien lo usa puede detectar un CSV editado a mano
+    (csv_diverged) y volver a importarlo.
+    """
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Ruta del archivo SQLite (por ejemplo 'output_folder/_img_metadata.sqlite').
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS records ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT UNIQUE, data TEXT NOT NULL)"
+            )
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+    @staticmethod
+    def record_key(record: Dict[str, Any]) -> Optional[str]:
+        """Clave de un registro: la ruta completa de la imagen (directory + file_name)."""
+        if record.get("directory") is None or record.get("file_name") is None:
+            return None
+        return os.path.join(record["directory"], record["file_name"])
+
+    @staticmethod
+    def _csv_state(csv_file: str) -> Optional[List[int]]:
+        if not os.path.exists(csv_file):
+            return None
+        stat = os.stat(csv_file)
+        return [stat.st_mtime_ns, stat.st_size]
+
+    def _set_meta(self, name: str, value: Any):
+        """Guarda un valor en la tabla meta (llamar con el lock y la transacción abiertos)."""
+        self._conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)", (name, json.dumps(value)))
+
+    def _get_meta(self, name: str, default: Any = None) -> Any:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return default if row is None else json.loads(row[0])
+
+    @property
+    def dirty(self) -> bool:
+        """True si hay cambios posteriores a la última exportación o importación del CSV."""
+        return bool(self._get_meta("dirty", False))
+
+    def mark_synced(self, csv_file: str):
+        """Registra que csv_file refleja exactamente el contenido actual del almacén."""
+        with self._lock, self._conn:
+            self._set_meta("csv_state", self._csv_state(csv_file))
+            self._set_meta("dirty", False)
+
+    def csv_diverged(self, csv_file: str) -> bool:
+        """True si csv_file existe y ha cambiado (tamaño o fecha) desde la última sincronización."""
+        state = self._csv_state(csv_file)
+        return state is not None and state != self._get_meta("csv_state")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Devuelve el registro de la clave indicada, o None si no existe."""
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM records WHERE key = ?", (key,)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def rows(self) -> Iterator[Dict[str, Any]]:
+        """Recorre todos los registros en orden de inserción."""
+        with self._lock:
+            rows = self._conn.execute("SELECT data FROM records ORDER BY id").fetchall()
+        for (data,) in rows:
+            yield json.loads(data)
+
+    def append(self, records: Iterable[Dict[str, Any]]):
+        """
+        Añade registros al final sin leer los existentes (como añadir filas al final del CSV).
+        Cada registro toma su ruta como clave si ésta aún no está en uso; si no, se guarda sin clave.
+        """
+        with self._lock, self._conn:
+            for record in records:
+                key = self.record_key(record)
+                if key is not None and self._conn.execute("SELECT 1 FROM records WHERE key = ?", (key,)).fetchone():
+                    key = None
+                self._conn.execute("INSERT INTO records (key, data) VALUES (?, ?)",
+                                   (key, json.dumps(record, ensure_ascii=False)))
+            self._set_meta("dirty", True)
+
+    def upsert(self, records: Dict[str, Dict[str, Any]],
+               merge: Callable[[Optional[Dict[str, Any]], Dict[str, Any]], Dict[str, Any]] = merge_metadata
+               ) -> Tuple[List[str], List[str]]:
+        """
+        Inserta o actualiza registros por clave en una sola transacción.
+
+        Args:
+            records: {clave: metadatos nuevos}.
+            merge: Función (registro existente o None, metadatos nuevos) -> registro a guardar.
+
+        Returns:
+            (claves insertadas, claves de registros existentes que han cambiado).
+        """
+        inserted, updated = [], []
+        with self._lock, self._conn:
+            for key, new_info in records.items():
+                row = self._conn.execute("SELECT data FROM records WHERE key = ?", (key,)).fetchone()
+                existing = None if row is None else json.loads(row[0])
+                record = merge(existing, new_info)
+                payload = json.dumps(record, ensure_ascii=False)
+                if row is None:
+                    self._conn.execute("INSERT INTO records (key, data) VALUES (?, ?)", (key, payload))
+                    inserted.append(key)
+                elif record != existing:
+                    self._conn.execute("UPDATE records SET data = ? WHERE key = ?", (payload, key))
+                    updated.append(key)
+            if inserted or updated:
+                self._set_meta("dirty", True)
+        return inserted, updated
+
+    def mark_deleted(self, keys: Iterable[str]) -> int:
+        """
+        Marca con deleted=1 los registros de las claves indicadas (tombstone).
+        Devuelve el número de registros que no estaban ya marcados.
+        """
+        marked = 0
+        with self._lock, self._conn:
+            for key in keys:
+                row = self._conn.execute("SELECT data FROM records WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    continue
+                record = json.loads(row[0])
+                if str(record.get("deleted", "")) in ("1", "1.0"):
+                    continue
+                record["deleted"] = 1
+                self._conn.execute("UPDATE records SET data = ? WHERE key = ?",
+                                   (json.dumps(record, ensure_ascii=False), key))
+                self._set_meta("dirty", True)
+                marked += 1
+        return marked
+
+    def import_csv(self, csv_file: str, replace: bool = False) -> int:
+        """
+        Carga las filas de un CSV en el almacén. Las filas con directory y file_name se guardan
+        con su ruta como clave.
+
+        Args:
+            csv_file: CSV de metadatos.
+            replace: Si es True, se eliminan antes todos los registros del almacén.
+
+        Returns:
+            Número de filas importadas.
+        """
+        rows, seen = [], set()
+        with open(csv_file, 'r', newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                row = {k.strip(): v for k, v in row.items()}  # Limpia las claves
+                key = self.record_key(row)
+                if key in seen:
+                    key = None  # Filas repetidas de export_csv: se conservan sin clave
+                seen.add(key)
+                rows.append((key, json.dumps(row, ensure_ascii=False)))
+        with self._lock, self._conn:
+            if replace:
+                self._conn.execute("DELETE FROM records")
+            # Se conserva el orden del CSV
+            self._conn.executemany("INSERT OR REPLACE INTO records (key, data) VALUES (?, ?)", rows)
+            self._set_meta("csv_state", self._csv_state(csv_file))
+            self._set_meta("dirty", False)
+        return len(rows)
+
+    def export_csv(self, csv_file: str):
+        """Escribe todos los registros en un CSV con la unión de sus columnas (escritura atómica)."""
+        records = list(self.rows())
+        keys = {}
+        for record in records:
+            keys.update(dict.fromkeys(record.keys()))
+        directory = os.path.dirname(csv_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_file = csv_file + ".tmp"
+        with open(tmp_file, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=list(keys), restval='')
+            writer.writeheader()
+            writer.writerows(records)
+        os.replace(tmp_file, csv_file)
+        self.mark_synced(csv_file)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
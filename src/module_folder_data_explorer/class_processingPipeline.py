@@ -0,0 +1,173 @@
+import queue
+import threading
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+
+_DONE = object()  # Marca de fin de flujo entre etapas
+
+
+class ProcessingPipeline:
+    """
+    Pipeline por etapas conectadas con colas acotadas.
+
+    Cada etapa tiene sus propios hilos: una etapa por lotes (por ejemplo CLIP) agrupa hasta
+    batch_size elementos por llamada, y las etapas concurrentes (por ejemplo las llamadas al
+    LLM o a Google) procesan varios elementos a la vez con `workers` hilos. Las colas entre
+    etapas tienen un tamaño máximo, así que una etapa rápida se frena (backpressure) en lugar
+    de acumular trabajo en memoria. Los resultados llegan al hilo que llama a run() (el único
+    escritor) en orden de finalización, junto con el índice del elemento de entrada.
+
+    Como todas las etapas trabajan a la vez, el tiempo total se acerca al de la etapa más
+    lenta en lugar de a la suma de todas. Si una etapa lanza una excepción, el pipeline se
+    detiene y run() la relanza.
+    """
+    def __init__(self, queue_size: int = 32, batch_timeout: float = 0.1):
+        """
+        Args:
+            queue_size: Elementos como máximo en cada cola entre etapas.
+            batch_timeout: Segundos que una etapa por lotes espera a completar un lote antes de
+                procesar uno incompleto.
+        """
+        self.queue_size = queue_size
+        self.batch_timeout = batch_timeout
+        self._stages: List[Tuple[str, Callable, int, Optional[int]]] = []
+        self._stop = threading.Event()
+        self._error: Optional[BaseException] = None
+
+    def add_stage(self, name: str, func: Callable, workers: int = 1, batch_size: Optional[int] = None) -> "ProcessingPipeline":
+        """
+        Añade una etapa.
+
+        Args:
+            name: Nombre de la etapa (para los hilos y los mensajes de error).
+            func: Función de la etapa. Con batch_size recibe una lista de elementos y devuelve una
+                lista de resultados del mismo tamaño; sin batch_size recibe y devuelve un elemento.
+            workers: Hilos de la etapa.
+            batch_size: Tamaño de lote (None para procesar elemento a elemento).
+        """
+        self._stages.append((name, func, workers, batch_size))
+        return self
+
+    def _put(self, q: queue.Queue, item: Any):
+        """put bloqueante que se interrumpe si el pipeline se detiene."""
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _get(self, q: queue.Queue, timeout: Optional[float] = None) -> Any:
+        """get bloqueante que devuelve _DONE si el pipeline se detiene."""
+        waited = 0.0
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                waited += 0.1
+                if timeout is not None and waited >= timeout:
+                    raise
+        return _DONE
+
+    def _fail(self, name: str, error: BaseException):
+        if self._error is None:
+            self._error = RuntimeError(f"Error en la etapa '{name}': {error}")
+            self._error.__cause__ = error
+        self._stop.set()
+
+    def _feed(self, items: Iterable[Any], out_q: queue.Queue):
+        try:
+            for index, item in enumerate(items):
+                if self._stop.is_set():
+                    return
+                self._put(out_q, (index, item))
+        except Exception as e:
+            self._fail("entrada", e)
+        finally:
+            self._put(out_q, _DONE)
+
+    def _run_stage(self, name: str, func: Callable, batch_size: Optional[int],
+                   in_q: queue.Queue, out_q: queue.Queue, finished: List[int], workers: int, lock: threading.Lock):
+        try:
+            while not self._stop.is_set():
+                first = self._get(in_q)
+                if first is _DONE:
+                    self._put(in_q, _DONE)  # Para que lo vean el resto de hilos de la etapa
+                    break
+                if batch_size is None:
+                    index, item = first
+                    self._put(out_q, (index, func(item)))
+                    continue
+
+                batch = [first]
+                done = False
+                while len(batch) < batch_size:
+                    try:
+                        item = self._get(in_q, timeout=self.batch_timeout)
+                    except queue.Empty:
+                        break
+                    if item is _DONE:
+                        self._put(in_q, _DONE)
+                        done = True
+                        break
+                    batch.append(item)
+                results = func([item for _, item in batch])
+                for (index, _), result in zip(batch, results):
+                    self._put(out_q, (index, result))
+                if done:
+                    break
+        except Exception as e:
+            self._fail(name, e)
+        finally:
+            with lock:
+                finished[0] += 1
+                last = finished[0] == workers
+            if last:
+                self._put(out_q, _DONE)
+
+    def run(self, items: Iterable[Any]) -> Iterator[Tuple[int, Any]]:
+        """
+        Procesa los elementos por todas las etapas.
+
+        Yields:
+            Tuplas (índice del elemento de entrada, resultado de la última etapa), en orden de
+            finalización.
+        """
+        self._stop.clear()
+        self._error = None
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self._stages) + 1)]
+        threads = [threading.Thread(target=self._feed, args=(items, queues[0]), name="pipeline-entrada", daemon=True)]
+        for position, (name, func, workers, batch_size) in enumerate(self._stages):
+            finished, lock = [0], threading.Lock()
+            for worker in range(workers):
+                threads.append(threading.Thread(
+                    target=self._run_stage,
+                    args=(name, func, batch_size, queues[position], queues[position + 1], finished, workers, lock),
+                    name=f"pipeline-{name}-{worker}",
+                    daemon=True
+                ))
+        for thread in threads:
+            thread.start()
+
+        completed = False
+        try:
+            while True:
+                result = self._get(queues[-1])
+                if result is _DONE:
+                    break
+                yield result
+            completed = True
+        finally:
+            if not completed:
+                self._stop.set()  # El consumidor ha dejado de leer: se detienen todas las etapas
+            for thread in threads:
+                thread.join()
+        if self._error is not None:
+            # Los resultados ya terminados que quedaban en la última cola también se entregan
+            while True:
+                try:
+                    result = queues[-1].get_nowait()
+                except queue.Empty:
+                    break
+                if result is not _DONE:
+                    yield result
+            raise self._error
@@ -0,0 +1,96 @@
+import json
+import os
+import threading
+from typing import Any, Dict, List
+
+
+class RunJournal:
+    """
+    Diario de una ejecución de update_data_range en formato JSON Lines.
+
+    Cada imagen terminada se añade como una línea {'key', 'signature', 'file_info'} y se
+    fuerza a disco (flush + fsync), así que si la ejecución se interrumpe (error de cuota,
+    falta de memoria, Ctrl-C) sólo se pierde el trabajo que estaba en curso. Al reanudar, las
+    imágenes del diario con la misma firma (modelo, tema, contexto...) no se vuelven a
+    procesar. Una última línea incompleta por un corte a mitad de escritura se descarta.
+
+    La etapa de CLIP anota además, por lotes, la fila del EmbeddingStore de cada imagen
+    ({'key', 'signature', 'embedding_row'}), de modo que al reanudar las imágenes que no llegaron
+    a terminar reutilizan su fila en lugar de añadir otra al final del archivo de embeddings.
+    """
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Ruta del diario (por ejemplo '_img_metadata.csv.journal').
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._tail_checked = False
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def completed(self, signature: str) -> Dict[str, Dict[str, Any]]:
+        """Devuelve {clave: file_info} de las imágenes terminadas con la firma indicada."""
+        entries = {}
+        if not os.path.exists(self.path):
+            return entries
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Línea a medio escribir
+                if entry.get("signature") == signature and "file_info" in entry:
+                    entries[entry["key"]] = entry["file_info"]
+        return entries
+
+    def embedding_rows(self, signature: str) -> Dict[str, int]:
+        """Devuelve {clave: fila del EmbeddingStore} de las imágenes anotadas con la firma indicada."""
+        rows = {}
+        if not os.path.exists(self.path):
+            return rows
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if entry.get("signature") != signature:
+                    continue
+                row = entry.get("embedding_row", entry.get("file_info", {}).get("embedding_row"))
+                if isinstance(row, int):
+                    rows[entry["key"]] = row
+        return rows
+
+    def record(self, key: str, signature: str, file_info: Dict[str, Any]):
+        """Añade una imagen terminada al diario y la fuerza a disco."""
+        self._append([{"key": key, "signature": signature, "file_info": file_info}])
+
+    def record_embedding_rows(self, signature: str, rows: Dict[str, int]):
+        """Anota las filas del EmbeddingStore de un lote de imágenes (una sola escritura a disco)."""
+        if rows:
+            self._append([{"key": key, "signature": signature, "embedding_row": row} for key, row in rows.items()])
+
+    def _append(self, entries: List[Dict[str, Any]]):
+        line = "\n".join(json.dumps(entry, ensure_ascii=False) for entry in entries)
+        with self._lock:
+            if not self._tail_checked:
+                # Si la última línea quedó a medias, la nueva entrada empieza en otra línea
+                if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+                    with open(self.path, "rb") as f:
+                        f.seek(-1, os.SEEK_END)
+                        if f.read(1) != b"\n":
+                            line = "\n" + line
+                self._tail_checked = True
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def clear(self):
+        """Elimina el diario (se llama cuando sus resultados ya están en el CSV)."""
+        with self._lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            self._tail_checked = False
@@ -0,0 +1,108 @@
+import json
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from common.class_embeddingStore import EmbeddingStore
+from module_folder_data_explorer.class_metadataStore import parse_links
+
+INT_COLUMNS = ('embedding_row', 'img_counts', 'deleted')
+
+
+def _require_pyarrow():
+    """Importa pyarrow (dependencia opcional) con un mensaje claro si no está instalado."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError(
+            "El formato Parquet necesita pyarrow, que no está instalado. Instálalo con: pip install pyarrow"
+        ) from e
+    return pa, pq
+
+
+def _as_int(value: Any) -> Optional[int]:
+    """Entero de una columna numérica ("2", "2.0", 2.0...), o None si está vacía o no es entera."""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return int(number) if number.is_integer() else None
+
+
+def _embedding_of(record: Dict[str, Any], matrix: Optional[np.ndarray]) -> Optional[np.ndarray]:
+    """Embedding de un registro: su fila en el EmbeddingStore o, en CSVs antiguos, la columna JSON."""
+    row = EmbeddingStore.parse_row(record.get('embedding_row'))
+    if matrix is not None and row is not None and row < len(matrix):
+        return np.asarray(matrix[row], dtype=np.float32)
+    if record.get('embedding'):
+        value = record['embedding']
+        return np.asarray(json.loads(value) if isinstance(value, str) else value, dtype=np.float32).ravel()
+    return None
+
+
+def records_to_table(records: Iterable[Dict[str, Any]], embedding_store: Optional[EmbeddingStore] = None):
+    """
+    Convierte los registros de metadatos en una tabla de Arrow con tipos columnares:
+      - embedding: fixed_size_list<float32> con los vectores (del EmbeddingStore o de la columna
+        JSON de CSVs antiguos); nulo en las filas sin embedding.
+      - search_links: list<string>.
+      - embedding_row, img_counts y deleted: int64.
+      - El resto de columnas: string.
+    """
+    pa, _ = _require_pyarrow()
+    records = list(records)
+    matrix = embedding_store.open_matrix() if embedding_store is not None else None
+
+    names = {}
+    for record in records:
+        names.update(dict.fromkeys(record.keys()))
+    names.pop('embedding', None)
+
+    columns, fields = [], []
+    for name in names:
+        values = [record.get(name) for record in records]
+        if name == 'search_links':
+            values = [None if value is None else parse_links(value) for value in values]
+            field_type = pa.list_(pa.string())
+        elif name in INT_COLUMNS:
+            values = [_as_int(value) for value in values]
+            field_type = pa.int64()
+        else:
+            values = [None if value is None or value == '' else str(value) for value in values]
+            field_type = pa.string()
+        columns.append(pa.array(values, type=field_type))
+        fields.append(pa.field(name, field_type))
+
+    embeddings = [_embedding_of(record, matrix) for record in records]
+    dims = {len(vector) for vector in embeddings if vector is not None}
+    if len(dims) > 1:
+        raise ValueError(f"Los embeddings tienen dimensiones distintas: {sorted(dims)}")
+    if dims:
+        dim = dims.pop()
+        flat = np.concatenate([vector if vector is not None else np.zeros(dim, dtype=np.float32)
+                               for vector in embeddings])
+        mask = pa.array([vector is None for vector in embeddings])
+        column = pa.FixedSizeListArray.from_arrays(pa.array(flat, type=pa.float32()), dim, mask=mask)
+        columns.append(column)
+        fields.append(pa.field('embedding', column.type))
+    return pa.Table.from_arrays(columns, schema=pa.schema(fields))
+
+
+def write_parquet(records: Iterable[Dict[str, Any]], output_file: str,
+                  embedding_store: Optional[EmbeddingStore] = None):
+    """Escribe los registros de metadatos en un archivo Parquet (ver records_to_table)."""
+    _, pq = _require_pyarrow()
+    pq.write_table(records_to_table(records, embedding_store), output_file)
+
+
+def read_parquet(input_file: str, columns: Optional[List[str]] = None):
+    """
+    Lee un archivo Parquet de metadatos como DataFrame de pandas. Con columns sólo se leen del
+    disco esas columnas (por ejemplo, sin 'embedding' para consultas de resumen).
+    """
+    _, pq = _require_pyarrow()
+    if columns is not None:
+        available = pq.read_schema(input_file).names
+        columns = [column for column in columns if column in available]
+    return pq.read_table(input_file, columns=columns).to_pandas()
@@ -1,6 +1,8 @@
 import os
 import json
-import requests
+
+from common.class_blobStore import BlobStore
+from common.class_bulkDownloader import BulkDownloader
 
 
 class MetadataExtractor:
@@ -13,6 +15,9 @@ class MetadataExtractor:
         self.description = description
         self.search_results = search_results    
         self.downloaded_files = []  # rutas locales de las imágenes descargadas
+        self.failed_downloads = []  # {'url', 'error'} de las descargas fallidas
+        self.pending_downloads = []  # trabajos (url, dest_path) aún no descargados
+        self.output_dir = None  # carpeta de la imagen donde se guardan descargas y metadata
 
     def to_dict(self):
         # Si el embedding es un array de numpy, conviértelo a lista.
@@ -23,6 +28,7 @@ class MetadataExtractor:
             "description": self.description,
             "search_results": self.search_results,
             "downloaded_files": self.downloaded_files,
+            "failed_downloads": self.failed_downloads,
         }
 
     def save_metadata(self, output_dir):
@@ -33,36 +39,49 @@ class MetadataExtractor:
         with open(metadata_path, "w") as f:
             json.dump(self.to_dict(), f, indent=4)
 
+    def register_downloads(self, results):
+        """Anota el resultado de las descargas (DownloadResult) de esta imagen."""
+        for result in results:
+            if result.success:
+                self.downloaded_files.append(result.dest_path)
+            else:
+                self.failed_downloads.append({"url": result.url, "error": result.error})
+        self.pending_downloads = []
+
 
-def download_image(url, dest_path):
+def download_image(url, dest_path, downloader=None):
     """
     Descarga una imagen desde la URL y la guarda en dest_path.
+
+    El cuerpo se escribe en disco por bloques (sin cargarlo entero en memoria) y se
+    descartan las respuestas que no son imágenes.
     """
-    try:
-        response = requests.get(url)
-        if response.status_code == 200:
-            with open(dest_path, "wb") as f:
-                f.write(response.content)
-            return dest_path
-        else:
-            print(f"Error al descargar {url}: status {response.status_code}")
-            return None
-    except Exception as e:
-        print(f"Excepción al descargar {url}: {e}")
+    result = (downloader or BulkDownloader()).download_one(url, dest_path)
+    if not result.success:
+        print(f"Error al descargar {url}: {result.error}")
         return None
+    return result.dest_path
 
 
-def process_image(image_path, embeddings, embeddingTranslator, researcher, base_output_dir):
+def process_image(image_path, embeddings, embeddingTranslator, researcher, base_output_dir, image_embedding=None,
+                  downloader=None, download=True, blob_store=None):
     """
     Procesa una imagen:
-      1. Obtiene su embedding.
+      1. Obtiene su embedding (o reutiliza image_embedding si ya se calculó por lotes).
       2. Extrae la descripción.
       3. Realiza la búsqueda y obtiene links.
-      4. Descarga las imágenes y guarda la metadata.
+      4. Descarga las imágenes en paralelo y guarda la metadata.
+
+    Las descargas se guardan en un BlobStore direccionado por contenido (por defecto en
+    base_output_dir/_blobs) y la carpeta de la imagen sólo contiene referencias a los blobs.
+
+    Con download=False las descargas no se realizan y quedan en processed_image.pending_downloads,
+    para que process_folder las agrupe con las del resto de imágenes.
     """
     print(f"Procesando {image_path}...")
     # 1. Obtener el embedding de la imagen
-    image_embedding = embeddings.getImgEmbedding(image_path)
+    if image_embedding is None:
+        image_embedding = embeddings.getImgEmbedding(image_path)
 
     # 2. Extraer la descripción de la imagen
     description = embeddingTranslator.extractDescription(
@@ -81,15 +100,19 @@ def process_image(image_path, embeddings, embeddingTranslator, researcher, base_
     os.makedirs(image_dir, exist_ok=True)
 
     # Crear el objeto ProcessedImage
-    processed_image = process_image(image_path, image_embedding, description, search_results)
+    processed_image = MetadataExtractor(image_path, image_embedding, description, search_results)
+    processed_image.output_dir = image_dir
 
     # 5. Descargar las imágenes obtenidas
-    for idx, url in enumerate(search_results):
-        filename = f"downloaded_{idx}.jpg"  # podrías ajustar la extensión si es necesario
-        dest_path = os.path.join(image_dir, filename)
-        downloaded = download_image(url, dest_path)
-        if downloaded:
-            processed_image.downloaded_files.append(downloaded)
+    for idx, result in enumerate(search_results):
+        # searchImgs devuelve diccionarios con el enlace en 'enlace'
+        url = result.get('enlace') if isinstance(result, dict) else result
+        if url:
+            filename = f"downloaded_{idx}.jpg"  # podrías ajustar la extensión si es necesario
+            processed_image.pending_downloads.append((url, os.path.join(image_dir, filename)))
+    if download:
+        blob_store = blob_store or BlobStore(os.path.join(base_output_dir, "_blobs"), downloader)
+        processed_image.register_downloads(blob_store.download(processed_image.pending_downloads))
 
     # 6. Guardar la metadata en un archivo JSON
     processed_image.save_metadata(image_dir)
@@ -1,12 +1,36 @@
-def process_folder(input_dir, base_output_dir, embeddings, embeddingTranslator, researcher):
+import os
+
+from common.class_blobStore import BlobStore
+from module_img_metadata_extractor.class_metadataExtractor import process_image
+
+
+def process_folder(input_dir, base_output_dir, embeddings, embeddingTranslator, researcher, batch_size=32,
+                   downloader=None, blob_store=None):
     """
     Procesa todas las imágenes del directorio input_dir.
+    Los embeddings de todas las imágenes se calculan primero por lotes con
+    Embeddings.getImgEmbeddings y después se procesa cada imagen. Las descargas de
+    todas las imágenes se agrupan y se lanzan juntas, y cada imagen distinta se guarda
+    una sola vez en el BlobStore (por defecto base_output_dir/_blobs).
     """
+    image_paths = [
+        os.path.join(input_dir, file) for file in os.listdir(input_dir)
+        if file.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.gif'))
+    ]
+    batch_embeddings = embeddings.getImgEmbeddings(image_paths, batch_size=batch_size)
+
     processed_images = []
-    for file in os.listdir(input_dir):
-        if file.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.gif')):
-            image_path = os.path.join(input_dir, file)
-            processed = process_image(image_path, embeddings, embeddingTranslator, researcher, base_output_dir)
-            processed_images.append(processed)
+    for idx, image_path in enumerate(image_paths):
+        processed = process_image(image_path, embeddings, embeddingTranslator, researcher, base_output_dir,
+                                  image_embedding=batch_embeddings[idx:idx + 1], download=False)
+        processed_images.append(processed)
+
+    # Descarga conjunta de los enlaces de todas las imágenes
+    jobs = [job for processed in processed_images for job in processed.pending_downloads]
+    blob_store = blob_store or BlobStore(os.path.join(base_output_dir, "_blobs"), downloader)
+    results = iter(blob_store.download(jobs, show_progress=True))
+    for processed in processed_images:
+        processed.register_downloads([next(results) for _ in processed.pending_downloads])
+        processed.save_metadata(processed.output_dir)
     return processed_images
 
@@ -0,0 +1,201 @@
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from module_search_engine.class_localIndex import LocalImageIndex
+
+
+class IVFIndex:
+    """
+    Índice aproximado de vecinos más cercanos (inverted file) para colecciones grandes.
+
+    Los embeddings normalizados se agrupan con k-means esférico en nlist listas. En cada
+    búsqueda sólo se comparan los vectores de las nprobe listas cuyos centroides son más
+    parecidos a la consulta, en lugar de toda la colección. nprobe es el ajuste entre
+    recall y latencia: con nprobe == nlist la búsqueda es exacta.
+
+    Los vectores se guardan reordenados por lista en una única matriz contigua, de modo que
+    cada lista es un rango [offsets[i], offsets[i + 1]) de filas.
+    """
+    def __init__(
+        self,
+        embeddings: np.ndarray,
+        ids: List[str],
+        nlist: Optional[int] = None,
+        nprobe: int = 8,
+        n_iter: int = 20,
+        max_train_points: int = 100000,
+        seed: int = 0
+    ):
+        """
+        Args:
+            embeddings: Matriz (N, D) con un embedding por imagen (por ejemplo, de Embeddings).
+            ids: Identificador de cada fila.
+            nlist: Número de listas. Por defecto 4 * sqrt(N).
+            nprobe: Número de listas que se exploran por consulta.
+            n_iter: Iteraciones de k-means.
+            max_train_points: Máximo de vectores usados para entrenar los centroides.
+            seed: Semilla para la inicialización de k-means.
+        """
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        if matrix.ndim != 2 or matrix.shape[0] != len(ids):
+            raise ValueError("embeddings debe ser una matriz (N, D) con una fila por id")
+        if matrix.shape[0] == 0:
+            raise ValueError("No se puede construir un IVFIndex sin embeddings")
+        matrix = LocalImageIndex._normalize(matrix)
+
+        nlist = nlist or int(4 * np.sqrt(matrix.shape[0]))
+        self.nlist = int(min(max(nlist, 1), matrix.shape[0]))
+        self.nprobe = nprobe
+
+        rng = np.random.default_rng(seed)
+        train = matrix
+        if matrix.shape[0] > max_train_points:
+            train = matrix[rng.choice(matrix.shape[0], max_train_points, replace=False)]
+        self.centroids = self._kmeans(train, self.nlist, n_iter, rng)
+
+        assignments = self._assign(matrix, self.centroids)
+        self.order = np.argsort(assignments, kind="stable")
+        self.vectors = np.ascontiguousarray(matrix[self.order])
+        self.offsets = np.concatenate(([0], np.cumsum(np.bincount(assignments, minlength=self.nlist))))
+        self.ids = list(ids)
+
+    @staticmethod
+    def _assign(matrix: np.ndarray, centroids: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+        """Asigna cada vector a su centroide más parecido, por bloques para acotar la memoria."""
+        return np.concatenate([
+            np.argmax(matrix[start:start + chunk_size] @ centroids.T, axis=1)
+            for start in range(0, matrix.shape[0], chunk_size)
+        ])
+
+    @classmethod
+    def _kmeans(cls, train: np.ndarray, nlist: int, n_iter: int, rng: np.random.Generator) -> np.ndarray:
+        """K-means esférico: los centroides se renormalizan tras cada actualización."""
+        centroids = train[rng.choice(train.shape[0], nlist, replace=False)].copy()
+        for _ in range(n_iter):
+            assignments = cls._assign(train, centroids)
+            counts = np.bincount(assignments, minlength=nlist)
+            sums = np.zeros_like(centroids)
+            non_empty = counts > 0
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[non_empty]
+            sums[non_empty] = np.add.reduceat(train[np.argsort(assignments, kind="stable")], starts, axis=0)
+            # Las listas vacías se reinician con un vector aleatorio del conjunto de entrenamiento
+            empty = counts == 0
+            sums[empty] = train[rng.choice(train.shape[0], int(empty.sum()))]
+            centroids = LocalImageIndex._normalize(sums)
+        return centroids
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def top_k(self, queries: np.ndarray, k: int, nprobe: Optional[int] = None):
+        """
+        Calcula el top-k aproximado para una matriz de consultas ya normalizadas.
+
+        Returns:
+            Tupla (indices, scores) de listas con un array por consulta; los índices se refieren
+            a las filas originales de la colección.
+        """
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        centroid_scores = queries @ self.centroids.T
+        if nprobe < self.nlist:
+            probes = np.argpartition(-centroid_scores, nprobe - 1, axis=1)[:, :nprobe]
+        else:
+            probes = np.broadcast_to(np.arange(self.nlist), centroid_scores.shape)
+
+        all_indices, all_scores = [], []
+        for query, lists in zip(queries, probes):
+            rows = np.concatenate([np.arange(self.offsets[list_id], self.offsets[list_id + 1]) for list_id in lists])
+            scores = self.vectors[rows] @ query
+            kk = min(k, rows.shape[0])
+            top = np.argpartition(-scores, kk - 1)[:kk] if 0 < kk < rows.shape[0] else np.arange(kk)
+            top = top[np.argsort(-scores[top])]
+            all_indices.append(self.order[rows[top]])
+            all_scores.append(scores[top])
+        return all_indices, all_scores
+
+    def search_batch(self, queries, k: int = 5, nprobe: Optional[int] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Busca las k imágenes más parecidas para cada consulta explorando nprobe listas.
+        Devuelve el mismo formato que LocalImageIndex.search_batch.
+        """
+        queries = LocalImageIndex._normalize(LocalImageIndex._as_matrix(queries))
+        indices, scores = self.top_k(queries, k, nprobe)
+        return [
+            [{"id": self.ids[i], "index": int(i), "score": float(s)} for i, s in zip(row_idx, row_scores)]
+            for row_idx, row_scores in zip(indices, scores)
+        ]
+
+    def search(self, query, k: int = 5, nprobe: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Busca las k imágenes más parecidas a un único embedding de consulta."""
+        return self.search_batch(LocalImageIndex._as_matrix(query)[:1], k, nprobe)[0]
+
+    def recall_report(
+        self,
+        queries,
+        k: int = 10,
+        nprobe_values: Sequence[int] = (1, 2, 4, 8, 16, 32),
+        exact_index: Optional[LocalImageIndex] = None
+    ) -> List[Dict[str, float]]:
+        """
+        Mide recall@k frente a la búsqueda exacta y la latencia media por consulta para
+        distintos valores de nprobe.
+
+        Args:
+            queries: Matriz (Q, D) de consultas.
+            k: Número de vecinos a comparar.
+            nprobe_values: Valores de nprobe a evaluar.
+            exact_index: Índice exacto de referencia. Si no se indica, se construye con los
+                mismos vectores.
+
+        Returns:
+            Lista de diccionarios {'nprobe', 'recall_at_k', 'ms_per_query', 'exact_ms_per_query'}.
+        """
+        queries = LocalImageIndex._normalize(LocalImageIndex._as_matrix(queries))
+        if exact_index is None:
+            exact_index = LocalImageIndex(self.vectors[np.argsort(self.order)], self.ids)
+
+        start = time.perf_counter()
+        exact, _ = exact_index.top_k(queries, k)
+        exact_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+        report = []
+        for nprobe in nprobe_values:
+            start = time.perf_counter()
+            approx, _ = self.top_k(queries, k, nprobe)
+            ms = (time.perf_counter() - start) * 1000 / len(queries)
+            hits = sum(len(set(a.tolist()) & set(e.tolist())) for a, e in zip(approx, exact))
+            report.append({
+                "nprobe": min(nprobe, self.nlist),
+                "recall_at_k": hits / exact.size if exact.size else 1.0,
+                "ms_per_query": ms,
+                "exact_ms_per_query": exact_ms
+            })
+        return report
+
+    def save(self, path: str):
+        """Guarda el índice en un archivo .npz."""
+        np.savez(
+            path,
+            centroids=self.centroids,
+            vectors=self.vectors,
+            order=self.order,
+            offsets=self.offsets,
+            ids=np.asarray(self.ids, dtype=str),
+            nprobe=self.nprobe
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "IVFIndex":
+        """Carga un índice guardado con save()."""
+        data = np.load(path, allow_pickle=False)
+        index = cls.__new__(cls)
+        index.centroids = data["centroids"]
+        index.vectors = data["vectors"]
+        index.order = data["order"]
+        index.offsets = data["offsets"]
+        index.ids = data["ids"].tolist()
+        index.nprobe = int(data["nprobe"])
+        index.nlist = index.centroids.shape[0]
+        return index
@@ -0,0 +1,129 @@
+import os
+import csv
+import json
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from common.class_embeddingStore import EmbeddingStore
+
+
+class LocalImageIndex:
+    """
+    Índice local para buscar, dentro de la colección propia, las imágenes más parecidas
+    a una o varias imágenes de consulta.
+
+    Todos los embeddings de la colección se guardan en una única matriz contigua float32
+    con las filas normalizadas, de modo que la similitud coseno de una consulta contra toda
+    la colección es un solo producto matricial. El top-k se obtiene con np.argpartition
+    (O(N)) y sólo se ordenan los k candidatos.
+    """
+    def __init__(self, embeddings: np.ndarray, ids: List[str]):
+        """
+        Args:
+            embeddings: Matriz (N, D) con un embedding por imagen.
+            ids: Identificador de cada fila (normalmente la ruta completa de la imagen).
+        """
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        if matrix.ndim != 2 or matrix.shape[0] != len(ids):
+            raise ValueError("embeddings debe ser una matriz (N, D) con una fila por id")
+        self.ids = list(ids)
+        self.matrix = np.ascontiguousarray(self._normalize(matrix))
+
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        """Normaliza las filas a norma 1 (las filas nulas se dejan a cero)."""
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-12)
+
+    @staticmethod
+    def _as_matrix(queries) -> np.ndarray:
+        """Convierte tensores de torch, listas o arrays en una matriz (Q, D) float32."""
+        if hasattr(queries, "detach"):
+            queries = queries.detach().float().cpu().numpy()
+        queries = np.asarray(queries, dtype=np.float32)
+        return queries.reshape(1, -1) if queries.ndim == 1 else queries
+
+    @classmethod
+    def from_csv(cls, csv_file: str, embeddings_file: Optional[str] = None) -> "LocalImageIndex":
+        """
+        Construye el índice a partir del CSV generado por FolderDataExporter. Las filas con
+        'embedding_row' se leen del archivo binario de embeddings (por defecto
+        '_img_embeddings.f32' junto al CSV); las de CSVs antiguos, de la columna 'embedding'.
+        Se ignoran las filas sin embedding.
+        """
+        if not os.path.exists(csv_file):
+            raise FileNotFoundError(f"El archivo CSV no existe en la ruta: {csv_file}")
+
+        embeddings_file = embeddings_file or os.path.join(os.path.dirname(csv_file), "_img_embeddings.f32")
+        stored = EmbeddingStore(embeddings_file).open_matrix()
+
+        ids, rows = [], []
+        with open(csv_file, 'r', newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                row = {k.strip(): v for k, v in row.items()}
+                embedding_row = EmbeddingStore.parse_row(row.get("embedding_row"))
+                if embedding_row is not None:
+                    rows.append(np.asarray(stored[embedding_row], dtype=np.float32))
+                elif row.get("embedding"):
+                    rows.append(np.asarray(json.loads(row["embedding"]), dtype=np.float32).ravel())
+                else:
+                    continue
+                ids.append(os.path.join(row["directory"], row["file_name"]))
+
+        embeddings = np.stack(rows) if rows else np.empty((0, 512), dtype=np.float32)
+        return cls(embeddings, ids)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def search_batch(self, queries, k: int = 5) -> List[List[Dict[str, Any]]]:
+        """
+        Busca las k imágenes más parecidas para cada consulta.
+
+        Args:
+            queries: Matriz (Q, D) de embeddings de consulta (por ejemplo, la salida de
+                Embeddings.getImgEmbeddings).
+            k: Número de resultados por consulta.
+
+        Returns:
+            Lista (una por consulta) de listas de diccionarios {'id', 'index', 'score'}
+            ordenados por similitud descendente.
+        """
+        queries = self._normalize(self._as_matrix(queries))
+        indices, scores = self.top_k(queries, k)
+        return [
+            [{"id": self.ids[i], "index": int(i), "score": float(s)} for i, s in zip(row_idx, row_scores)]
+            for row_idx, row_scores in zip(indices, scores)
+        ]
+
+    def search(self, query, k: int = 5) -> List[Dict[str, Any]]:
+        """Busca las k imágenes más parecidas a un único embedding de consulta."""
+        return self.search_batch(self._as_matrix(query)[:1], k)[0]
+
+    def top_k(self, queries: np.ndarray, k: int):
+        """
+        Calcula el top-k por similitud coseno para una matriz de consultas ya normalizadas.
+
+        Args:
+            queries: Matriz (Q, D) normalizada.
+            k: Número de resultados por consulta.
+
+        Returns:
+            Tupla (indices, scores) con matrices (Q, k') siendo k' = min(k, N).
+        """
+        matrix = self.matrix
+        k = min(k, matrix.shape[0])
+        if k == 0:
+            return np.empty((len(queries), 0), dtype=np.int64), np.empty((len(queries), 0), dtype=np.float32)
+
+        scores = queries @ matrix.T
+        if k < matrix.shape[0]:
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(matrix.shape[0]), scores.shape)
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+        return top, top_scores
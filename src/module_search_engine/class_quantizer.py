@@ -0,0 +1,307 @@
+"""
+Códecs de compresión de embeddings para despliegues con poca memoria.
+
+- ScalarQuantizer: cuantización escalar a 8 bits por dimensión (4x menos memoria que float32).
+- ProductQuantizer: cuantización de producto; cada vector se parte en m subvectores y cada
+  subvector se sustituye por el índice (1 byte) de su centroide más cercano (m bytes por vector).
+
+QuantizedIndex busca sobre los códigos con distancia asimétrica: la consulta se mantiene en
+float32 y sólo la colección está comprimida. El índice (códec entrenado, ids y códigos) se
+guarda con save() y se carga con QuantizedIndex.load(), de modo que una máquina pequeña puede
+usarlo sin tener nunca en memoria la matriz float32 completa.
+
+Uso del benchmark (desde src/):
+    python -m module_search_engine.class_quantizer [--csv _img_metadata.csv] [--queries 100] [--k 10]
+"""
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from module_search_engine.class_localIndex import LocalImageIndex
+
+
+def _kmeans(data: np.ndarray, n_clusters: int, n_iter: int, rng: np.random.Generator) -> np.ndarray:
+    """K-means euclídeo sencillo usado para entrenar los subcuantizadores."""
+    n_clusters = min(n_clusters, data.shape[0])
+    centroids = data[rng.choice(data.shape[0], n_clusters, replace=False)].copy()
+    for _ in range(n_iter):
+        distances = (data ** 2).sum(1, keepdims=True) - 2 * data @ centroids.T + (centroids ** 2).sum(1)
+        assignments = np.argmin(distances, axis=1)
+        counts = np.bincount(assignments, minlength=n_clusters)
+        sums = np.stack([np.bincount(assignments, weights=data[:, d], minlength=n_clusters)
+                         for d in range(data.shape[1])], axis=1)
+        non_empty = counts > 0
+        centroids[non_empty] = sums[non_empty] / counts[non_empty, None]
+    return centroids
+
+
+class ScalarQuantizer:
+    """Cuantización escalar uint8 con mínimo y escala por dimensión."""
+    name = "int8"
+
+    def train(self, embeddings: np.ndarray) -> "ScalarQuantizer":
+        self.minimum = embeddings.min(axis=0)
+        self.scale = np.maximum(embeddings.max(axis=0) - self.minimum, 1e-12) / 255.0
+        return self
+
+    def bytes_per_vector(self, dim: int) -> int:
+        return dim
+
+    def encode(self, embeddings: np.ndarray) -> np.ndarray:
+        return np.clip(np.rint((embeddings - self.minimum) / self.scale), 0, 255).astype(np.uint8)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return codes.astype(np.float32) * self.scale + self.minimum
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {"minimum": self.minimum, "scale": self.scale}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, np.ndarray]) -> "ScalarQuantizer":
+        codec = cls()
+        codec.minimum, codec.scale = state["minimum"], state["scale"]
+        return codec
+
+    def scores(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """
+        q · x' = (q * scale) · codes + q · minimum. Los códigos del bloque recibido se convierten
+        a float32 para el producto matricial (top_k los pasa por bloques), pero no se reconstruyen
+        los vectores (sin aplicar escala ni mínimo a cada uno).
+        """
+        return (queries * self.scale) @ codes.T.astype(np.float32) + (queries @ self.minimum)[:, None]
+
+
+class ProductQuantizer:
+    """Cuantización de producto con m subespacios de 2^nbits centroides cada uno."""
+    name = "pq"
+
+    def __init__(self, m: int = 64, nbits: int = 8, n_iter: int = 15, max_train_points: int = 20000, seed: int = 0):
+        """
+        Args:
+            m: Número de subvectores (bytes por vector). Debe dividir la dimensión.
+            nbits: Bits por código (como máximo 8 para guardarlos en uint8).
+            n_iter: Iteraciones de k-means por subespacio.
+            max_train_points: Máximo de vectores usados para entrenar.
+            seed: Semilla para la inicialización.
+        """
+        if nbits > 8:
+            raise ValueError("nbits debe ser como máximo 8")
+        self.m = m
+        self.ksub = 2 ** nbits
+        self.n_iter = n_iter
+        self.max_train_points = max_train_points
+        self.seed = seed
+        self.name = f"pq{m}x{nbits}"
+
+    def train(self, embeddings: np.ndarray) -> "ProductQuantizer":
+        dim = embeddings.shape[1]
+        if dim % self.m:
+            raise ValueError(f"La dimensión {dim} no es divisible entre m={self.m}")
+        self.dsub = dim // self.m
+        rng = np.random.default_rng(self.seed)
+        train = embeddings
+        if embeddings.shape[0] > self.max_train_points:
+            train = embeddings[rng.choice(embeddings.shape[0], self.max_train_points, replace=False)]
+        self.codebooks = np.stack([
+            _kmeans(train[:, j * self.dsub:(j + 1) * self.dsub], self.ksub, self.n_iter, rng)
+            for j in range(self.m)
+        ])  # (m, ksub, dsub)
+        return self
+
+    def bytes_per_vector(self, dim: int) -> int:
+        return self.m
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {"codebooks": self.codebooks,
+                "params": np.array([self.m, self.ksub, self.n_iter, self.max_train_points, self.seed])}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, np.ndarray]) -> "ProductQuantizer":
+        m, ksub, n_iter, max_train_points, seed = (int(value) for value in state["params"])
+        codec = cls(m=m, nbits=int(np.log2(ksub)), n_iter=n_iter, max_train_points=max_train_points, seed=seed)
+        codec.codebooks = state["codebooks"]
+        codec.dsub = codec.codebooks.shape[2]
+        return codec
+
+    def encode(self, embeddings: np.ndarray) -> np.ndarray:
+        codes = np.empty((embeddings.shape[0], self.m), dtype=np.uint8)
+        for j, codebook in enumerate(self.codebooks):
+            sub = embeddings[:, j * self.dsub:(j + 1) * self.dsub]
+            distances = -2 * sub @ codebook.T + (codebook ** 2).sum(1)
+            codes[:, j] = np.argmin(distances, axis=1)
+        return codes
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return np.concatenate([self.codebooks[j][codes[:, j]] for j in range(self.m)], axis=1)
+
+    def scores(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """
+        Distancia asimétrica: para cada consulta se precalcula una tabla (m, ksub) con el
+        producto escalar de cada subvector de la consulta contra cada centroide, y la
+        puntuación de un código es la suma de m entradas de esa tabla.
+        """
+        scores = np.zeros((queries.shape[0], codes.shape[0]), dtype=np.float32)
+        for j, codebook in enumerate(self.codebooks):
+            table = queries[:, j * self.dsub:(j + 1) * self.dsub] @ codebook.T  # (Q, ksub)
+            scores += table[:, codes[:, j]]
+        return scores
+
+
+class QuantizedIndex:
+    """
+    Índice de búsqueda sobre embeddings comprimidos con un códec (ScalarQuantizer o
+    ProductQuantizer). Devuelve el mismo formato que LocalImageIndex.
+
+    Al construirlo, el códec se entrena con una muestra de como mucho train_size filas y la
+    colección se codifica por bloques, así que embeddings puede ser la proyección en memoria
+    de un EmbeddingStore sin cargar la matriz float32 entera. save() y load() guardan y
+    recuperan el índice ya codificado.
+    """
+    CODECS = {"ScalarQuantizer": ScalarQuantizer, "ProductQuantizer": ProductQuantizer}
+
+    def __init__(self, embeddings: np.ndarray, ids: List[str], codec=None, train_size: int = 100000,
+                 chunk_size: int = 65536, seed: int = 0):
+        """
+        Args:
+            embeddings: Matriz (N, D) con un embedding por imagen (puede ser un np.memmap).
+            ids: Identificador de cada fila.
+            codec: Códec a usar. Por defecto ProductQuantizer(m=64).
+            train_size: Filas como máximo usadas para entrenar el códec.
+            chunk_size: Filas que se normalizan y codifican a la vez.
+            seed: Semilla para elegir la muestra de entrenamiento.
+        """
+        num_rows = len(embeddings)
+        sample = np.arange(num_rows)
+        if num_rows > train_size:
+            sample = np.sort(np.random.default_rng(seed).choice(num_rows, train_size, replace=False))
+        train = LocalImageIndex._normalize(np.asarray(embeddings[sample], dtype=np.float32))
+        self.ids = list(ids)
+        self.dim = train.shape[1]
+        self.codec = (codec or ProductQuantizer()).train(train)
+        self.codes = np.concatenate([
+            self.codec.encode(LocalImageIndex._normalize(np.asarray(embeddings[start:start + chunk_size], dtype=np.float32)))
+            for start in range(0, num_rows, chunk_size)
+        ]) if num_rows else self.codec.encode(train)
+
+    @classmethod
+    def from_codes(cls, codes: np.ndarray, ids: List[str], codec) -> "QuantizedIndex":
+        """Crea el índice a partir de códigos ya calculados con un códec entrenado."""
+        index = cls.__new__(cls)
+        index.ids = list(ids)
+        index.codec = codec
+        index.codes = codes
+        index.dim = codec.scale.shape[0] if isinstance(codec, ScalarQuantizer) else codec.m * codec.dsub
+        return index
+
+    def save(self, path: str):
+        """Guarda el códec entrenado, los ids y los códigos en un archivo .npz."""
+        state = {f"codec_{name}": value for name, value in self.codec.state().items()}
+        np.savez(path, codec=np.array(type(self.codec).__name__), ids=np.array(self.ids, dtype=str),
+                 codes=self.codes, **state)
+
+    @classmethod
+    def load(cls, path: str) -> "QuantizedIndex":
+        """Carga un índice guardado con save()."""
+        with np.load(path, allow_pickle=False) as data:
+            state = {name[len("codec_"):]: data[name] for name in data.files if name.startswith("codec_")}
+            codec = cls.CODECS[str(data["codec"])].from_state(state)
+            return cls.from_codes(data["codes"], data["ids"].tolist(), codec)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def memory_per_vector(self) -> int:
+        """Bytes ocupados por cada vector comprimido."""
+        return self.codec.bytes_per_vector(self.dim)
+
+    def top_k(self, queries: np.ndarray, k: int, chunk_size: int = 65536):
+        """Top-k por distancia asimétrica, procesando la colección por bloques."""
+        k = min(k, len(self.ids))
+        best_scores = np.full((queries.shape[0], 0), -np.inf, dtype=np.float32)
+        best_indices = np.empty((queries.shape[0], 0), dtype=np.int64)
+        for start in range(0, len(self.ids), chunk_size):
+            scores = self.codec.scores(queries, self.codes[start:start + chunk_size])
+            indices = np.broadcast_to(np.arange(start, start + scores.shape[1]), scores.shape)
+            scores = np.concatenate([best_scores, scores], axis=1)
+            indices = np.concatenate([best_indices, indices], axis=1)
+            if scores.shape[1] > k:
+                keep = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                scores = np.take_along_axis(scores, keep, axis=1)
+                indices = np.take_along_axis(indices, keep, axis=1)
+            best_scores, best_indices = scores, indices
+        order = np.argsort(-best_scores, axis=1)
+        return np.take_along_axis(best_indices, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+    def search_batch(self, queries, k: int = 5) -> List[List[Dict[str, Any]]]:
+        """Busca las k imágenes más parecidas para cada consulta."""
+        queries = LocalImageIndex._normalize(LocalImageIndex._as_matrix(queries))
+        indices, scores = self.top_k(queries, k)
+        return [
+            [{"id": self.ids[i], "index": int(i), "score": float(s)} for i, s in zip(row_idx, row_scores)]
+            for row_idx, row_scores in zip(indices, scores)
+        ]
+
+    def search(self, query, k: int = 5) -> List[Dict[str, Any]]:
+        """Busca las k imágenes más parecidas a un único embedding de consulta."""
+        return self.search_batch(LocalImageIndex._as_matrix(query)[:1], k)[0]
+
+
+def benchmark_quantization(embeddings: np.ndarray, queries: np.ndarray, k: int = 10,
+                           codecs: Optional[list] = None) -> List[Dict[str, Any]]:
+    """
+    Compara cada códec con la búsqueda exacta en float32.
+
+    Returns:
+        Lista de diccionarios {'codec', 'bytes_per_vector', 'recall_at_k', 'ms_per_query'}.
+        La primera fila corresponde a float32 sin comprimir.
+    """
+    ids = [str(i) for i in range(len(embeddings))]
+    queries = LocalImageIndex._normalize(np.asarray(queries, dtype=np.float32))
+    exact_index = LocalImageIndex(embeddings, ids)
+
+    start = time.perf_counter()
+    exact, _ = exact_index.top_k(queries, k)
+    report = [{
+        "codec": "float32",
+        "bytes_per_vector": embeddings.shape[1] * 4,
+        "recall_at_k": 1.0,
+        "ms_per_query": (time.perf_counter() - start) * 1000 / len(queries)
+    }]
+
+    for codec in codecs or [ScalarQuantizer(), ProductQuantizer(m=64), ProductQuantizer(m=32)]:
+        index = QuantizedIndex(embeddings, ids, codec)
+        start = time.perf_counter()
+        approx, _ = index.top_k(queries, k)
+        ms = (time.perf_counter() - start) * 1000 / len(queries)
+        hits = sum(len(set(a.tolist()) & set(e.tolist())) for a, e in zip(approx, exact))
+        report.append({
+            "codec": codec.name,
+            "bytes_per_vector": index.memory_per_vector(),
+            "recall_at_k": hits / exact.size,
+            "ms_per_query": ms
+        })
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark de memoria y recall de los códecs de embeddings.")
+    parser.add_argument("--csv", help="CSV de FolderDataExporter (por defecto, datos sintéticos)", default=None)
+    parser.add_argument("--queries", type=int, default=100, help="Número de consultas")
+    parser.add_argument("--k", type=int, default=10, help="Vecinos a comparar")
+    args = parser.parse_args()
+
+    if args.csv:
+        data = LocalImageIndex.from_csv(args.csv).matrix
+    else:
+        rng = np.random.default_rng(0)
+        centers = rng.normal(size=(100, 512))
+        data = (centers[rng.integers(0, 100, 20000)] + 0.5 * rng.normal(size=(20000, 512))).astype(np.float32)
+
+    rng = np.random.default_rng(1)
+    query_rows = data[rng.choice(len(data), min(args.queries, len(data)), replace=False)]
+    for row in benchmark_quantization(data, query_rows + 0.05 * rng.normal(size=query_rows.shape), k=args.k):
+        print(f"{row['codec']:>10} | {row['bytes_per_vector']:>5} B/vector | "
+              f"recall@{args.k} = {row['recall_at_k']:.3f} | {row['ms_per_query']:.2f} ms/consulta")
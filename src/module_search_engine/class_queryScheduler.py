@@ -0,0 +1,144 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+from common.class_diskCache import DiskCache
+
+
+class QuotaExceededError(RuntimeError):
+    """Se ha agotado la cuota de la ventana y el planificador no puede esperar."""
+
+
+class QueryScheduler:
+    """
+    Planificador de consultas a GoogleSearchEngine consciente de la cuota de la API.
+
+    Las consultas se encolan con submit() y se resuelven con run(). Las que ya están en la
+    caché del motor se sirven sin consumir cuota; el resto se reparten a lo largo de la
+    ventana de cuota (por defecto 100 consultas por día): se permite una ráfaga inicial de
+    `burst` llamadas y después se espera window_seconds / quota entre llamadas, sin superar
+    nunca `quota` llamadas en la ventana deslizante.
+
+    El planificador se asocia al motor (engine.scheduler), de modo que cualquier llamada real
+    a la API del motor, también las de búsquedas paginadas, pasa por acquire().
+    """
+    def __init__(
+        self,
+        engine,
+        quota: int = 100,
+        window_seconds: float = 24 * 3600,
+        burst: int = 10,
+        block: bool = True,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        """
+        Args:
+            engine: GoogleSearchEngine cuyas llamadas se planifican.
+            quota: Llamadas permitidas por ventana.
+            window_seconds: Duración de la ventana de cuota en segundos.
+            burst: Llamadas que pueden hacerse seguidas antes de empezar a espaciarlas.
+            block: Si es False, acquire() lanza QuotaExceededError en lugar de esperar a que
+                se libere cuota.
+            clock: Reloj monotónico (inyectable en pruebas).
+            sleep: Función de espera (inyectable en pruebas).
+        """
+        self.engine = engine
+        self.quota = quota
+        self.window_seconds = window_seconds
+        self.burst = max(1, min(burst, quota))
+        self.block = block
+        self._clock = clock
+        self._sleep = sleep
+        self._interval = window_seconds / quota
+        self._tokens = float(self.burst)
+        self._last_refill = clock()
+        self._calls = deque()  # Instantes de las llamadas dentro de la ventana
+        self._lock = threading.Lock()
+        self._queue: List[Dict[str, Any]] = []
+        self.cache_hits = 0
+        self.api_calls = 0
+        engine.scheduler = self
+
+    def acquire(self):
+        """Bloquea hasta que se pueda hacer una llamada a la API sin salirse de la cuota."""
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.burst, self._tokens + (now - self._last_refill) / self._interval)
+                self._last_refill = now
+                while self._calls and now - self._calls[0] >= self.window_seconds:
+                    self._calls.popleft()
+
+                wait = 0.0
+                if len(self._calls) >= self.quota:
+                    wait = self._calls[0] + self.window_seconds - now
+                if self._tokens < 1:
+                    wait = max(wait, (1 - self._tokens) * self._interval)
+                if wait <= 0:
+                    self._tokens -= 1
+                    self._calls.append(now)
+                    self.api_calls += 1
+                    return
+            if not self.block:
+                raise QuotaExceededError(f"Cuota agotada: hay que esperar {wait:.0f} s")
+            self._sleep(wait)
+
+    def remaining_quota(self) -> int:
+        """Llamadas que quedan en la ventana actual."""
+        with self._lock:
+            now = self._clock()
+            return self.quota - sum(1 for t in self._calls if now - t < self.window_seconds)
+
+    def submit(self, query: str, num_imagenes: int = 10, **kwargs) -> int:
+        """
+        Encola una búsqueda (mismos parámetros que GoogleSearchEngine.searchImgs).
+
+        Returns:
+            Posición de la consulta en la lista que devuelve run().
+        """
+        self._queue.append(dict(query=query, num_imagenes=num_imagenes, **kwargs))
+        return len(self._queue) - 1
+
+    def run(self) -> List[Optional[List[Dict[str, Any]]]]:
+        """
+        Resuelve las consultas encoladas en orden. Primero se sirven las que están en caché y
+        después se lanzan las demás respetando la cuota; si block es False y la cuota se agota,
+        las consultas pendientes devuelven None y siguen encoladas.
+        """
+        queue, self._queue = self._queue, []
+        results: List[Optional[List[Dict[str, Any]]]] = [None] * len(queue)
+        params = [self.engine.build_params(**item) for item in queue]
+
+        pending = []
+        for idx, item_params in enumerate(params):
+            if self.engine.is_cached(item_params):
+                results[idx] = self.engine._parse_items(self.engine.execute(item_params))
+                self.cache_hits += 1
+            else:
+                pending.append(idx)
+
+        resolved = {}  # Una consulta repetida dentro de la cola sólo se lanza una vez
+        for position, idx in enumerate(pending):
+            key = DiskCache.make_key(params[idx])
+            if key in resolved:
+                results[idx] = resolved[key]
+                self.cache_hits += 1
+                continue
+            try:
+                results[idx] = resolved[key] = self.engine._parse_items(self.engine.execute(params[idx]))
+            except QuotaExceededError:
+                self._queue = [queue[i] for i in pending[position:]] + self._queue
+                break
+        return results
+
+    def report(self) -> Dict[str, int]:
+        """Resumen de uso: llamadas a la API, aciertos de caché (cuota ahorrada) y cuota restante."""
+        return {
+            "api_calls": self.api_calls,
+            "cache_hits": self.cache_hits,
+            "quota_saved": self.cache_hits,
+            "quota_remaining": self.remaining_quota(),
+            "queued": len(self._queue),
+        }
@@ -1,5 +1,9 @@
 from googleapiclient.discovery import build
 from datetime import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from common.class_diskCache import DiskCache
 
 
 
@@ -16,32 +20,35 @@ github_token = os.getenv("GITHUB_TOKEN")
 google_api_key = os.getenv("GOOGLE_API_KEY")
 
 class GoogleSearchEngine:
-    def __init__(self, api_key, search_engine_id):
+    def __init__(self, api_key, search_engine_id, service=None, cache_path=None, cache_ttl=24 * 3600,
+                 cache_max_entries=100000):
+        """
+        Parámetros:
+        - api_key: API Key de Google Custom Search
+        - search_engine_id: ID del motor de búsqueda (cx)
+        - service: Servicio de Custom Search ya construido (por ejemplo, un sustituto local de
+          cse().list en pruebas). Por defecto se construye con build().
+        - cache_path: Archivo SQLite donde se guardan las respuestas de la API (None para no usar caché)
+        - cache_ttl: Segundos de validez de cada respuesta guardada
+        - cache_max_entries: Número máximo de respuestas guardadas
+        """
         self.api_key = api_key
         self.search_engine_id = search_engine_id
-        self.service = build('customsearch', 'v1', developerKey=api_key)
+        self.service = service or build('customsearch', 'v1', developerKey=api_key)
+        # El cliente de googleapiclient no es seguro entre hilos: si no se inyecta un servicio,
+        # cada hilo de las búsquedas paginadas construye el suyo
+        self._build_service = None if service else (lambda: build('customsearch', 'v1', developerKey=api_key))
+        self._local = threading.local()
         self.search_engine_id = search_engine_id
+        self.cache = DiskCache(cache_path, ttl=cache_ttl, max_entries=cache_max_entries) if cache_path else None
+        self.scheduler = None  # QueryScheduler que reparte las llamadas a la API dentro de la cuota
+        self.api_calls = 0
+        self.cache_hits = 0
+        self._stats_lock = threading.Lock()
 
-    def searchImgs(self, query, num_imagenes=10, imgSize="LARGE", tipo="photo", 
-                        derechos=None, filetype='png', imgColorType='color'):
-        """
-        Busca imágenes en Google y devuelve información detallada sobre ellas.
-        
-        Parámetros:
-        - query: Términos de búsqueda
-        - num_imagenes: Número de imágenes a buscar (máximo 10 por solicitud)
-        - tamaño: Tamaño de imagen ['HUGE', 'ICON', 'LARGE', 'MEDIUM', 'SMALL', 'XLARGE', 'XXLARGE']
-            - filtro_tamaño: Filtro de tamaño de imagen en formato 'imagesize:>800x600' mirar doc
-        - tipo: Tipo de imagen ('clipart', 'face', 'lineart', 'photo', 'animated')
-        - derechos: Filtro de derechos ('cc_publicdomain', 'cc_attribute', 'cc_sharealike', 'cc_noncommercial', 'cc_nonderived')
-        - formato: Formato de imagen ('jpg', 'png', 'gif', 'bmp', 'svg', 'webp', 'ico', 'raw')
-        
-        
-        Retorna:
-        - Lista de diccionarios con información de las imágenes
-        """
-        
-        # Prepara los parámetros de búsqueda
+    def build_params(self, query, num_imagenes=10, imgSize="LARGE", tipo="photo",
+                     derechos=None, filetype='png', imgColorType='color', start=None):
+        """Construye los parámetros de cse().list para una búsqueda de imágenes."""
         params = {
             'q': query,
             'cx': self.search_engine_id,
@@ -60,10 +67,50 @@ class GoogleSearchEngine:
             params['imgColorType'] = imgColorType
         if filetype:
             params['fileType'] = filetype
-        # Realiza la búsqueda
-        res = self.service.cse().list(**params).execute()
-        
-        # Procesa los resultados y extrae información relevante
+        if start:
+            params['start'] = start
+        return params
+
+    def _cache_key(self, params):
+        return DiskCache.make_key(params)
+
+    def is_cached(self, params):
+        """Indica si la respuesta para estos parámetros está en la caché (no consume cuota)."""
+        return self.cache is not None and self._cache_key(params) in self.cache
+
+    def execute(self, params):
+        """
+        Ejecuta cse().list con los parámetros indicados. La respuesta se busca antes en la caché
+        (clave: conjunto completo de parámetros) y, si hay un QueryScheduler asociado, las
+        llamadas reales a la API esperan a que haya cuota disponible.
+        """
+        key = self._cache_key(params) if self.cache is not None else None
+        if key:
+            cached = self.cache.get(key)
+            if cached is not None:
+                with self._stats_lock:
+                    self.cache_hits += 1
+                return cached
+
+        if self.scheduler is not None:
+            self.scheduler.acquire()
+        res = self._get_service().cse().list(**params).execute()
+        with self._stats_lock:
+            self.api_calls += 1
+        if key:
+            self.cache.set(key, res)
+        return res
+
+    def _get_service(self):
+        if self._build_service is None or threading.current_thread() is threading.main_thread():
+            return self.service
+        if not hasattr(self._local, 'service'):
+            self._local.service = self._build_service()
+        return self._local.service
+
+    @staticmethod
+    def _parse_items(res):
+        """Extrae la información relevante de cada imagen de una respuesta de la API."""
         imagenes = []
         for item in res.get('items', []):
             imagen_info = {
@@ -78,9 +125,86 @@ class GoogleSearchEngine:
                 'fecha_busqueda': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             }
             imagenes.append(imagen_info)
-        
         return imagenes
 
+    def searchImgs(self, query, num_imagenes=10, imgSize="LARGE", tipo="photo", 
+                        derechos=None, filetype='png', imgColorType='color'):
+        """
+        Busca imágenes en Google y devuelve información detallada sobre ellas.
+        
+        Parámetros:
+        - query: Términos de búsqueda
+        - num_imagenes: Número de imágenes a buscar (máximo 10 por solicitud)
+        - tamaño: Tamaño de imagen ['HUGE', 'ICON', 'LARGE', 'MEDIUM', 'SMALL', 'XLARGE', 'XXLARGE']
+            - filtro_tamaño: Filtro de tamaño de imagen en formato 'imagesize:>800x600' mirar doc
+        - tipo: Tipo de imagen ('clipart', 'face', 'lineart', 'photo', 'animated')
+        - derechos: Filtro de derechos ('cc_publicdomain', 'cc_attribute', 'cc_sharealike', 'cc_noncommercial', 'cc_nonderived')
+        - formato: Formato de imagen ('jpg', 'png', 'gif', 'bmp', 'svg', 'webp', 'ico', 'raw')
+        
+        
+        Retorna:
+        - Lista de diccionarios con información de las imágenes
+        """
+        
+        # Prepara los parámetros de búsqueda
+        params = self.build_params(query, num_imagenes, imgSize, tipo, derechos, filetype, imgColorType)
+        # Realiza la búsqueda (o la recupera de la caché)
+        res = self.execute(params)
+        
+        # Procesa los resultados y extrae información relevante
+        return self._parse_items(res)
+
+    def searchImgsPaged(self, query, total=30, imgSize="LARGE", tipo="photo", derechos=None,
+                        filetype='png', imgColorType='color', max_workers=5, is_usable=None):
+        """
+        Busca más de 10 imágenes pidiendo varias páginas de resultados (parámetro start) en paralelo.
+
+        Las páginas se piden por tandas de hasta max_workers peticiones simultáneas; los
+        resultados se combinan en el orden de las páginas, se eliminan los enlaces repetidos y
+        se deja de pedir páginas en cuanto hay `total` resultados útiles o la API no devuelve más.
+        La API sólo permite acceder a los 100 primeros resultados de una consulta.
+
+        Parámetros:
+        - query, imgSize, tipo, derechos, filetype, imgColorType: como en searchImgs
+        - total: Número de imágenes deseado (máximo 100)
+        - max_workers: Páginas que se piden a la vez
+        - is_usable: Función opcional que recibe el diccionario de una imagen y devuelve si sirve
+
+        Retorna:
+        - Lista de como mucho `total` diccionarios de imágenes, sin enlaces repetidos
+        """
+        page_size = 10
+        total = min(total, 100)
+        starts = list(range(1, total + 1, page_size))
+        # Si hay que descartar resultados, puede hacer falta pedir páginas adicionales
+        extra_starts = [start for start in range(starts[-1] + page_size, 92, page_size)] if starts else []
+
+        def fetch_page(start):
+            params = self.build_params(query, page_size, imgSize, tipo, derechos, filetype, imgColorType,
+                                       start=start)
+            return self._parse_items(self.execute(params))
+
+        imagenes, seen = [], set()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while starts:
+                wave, starts = starts[:max_workers], starts[max_workers:]
+                exhausted = False
+                for page in executor.map(fetch_page, wave):
+                    for imagen in page:
+                        enlace = imagen.get('enlace')
+                        if not enlace or enlace in seen or (is_usable and not is_usable(imagen)):
+                            continue
+                        seen.add(enlace)
+                        imagenes.append(imagen)
+                    exhausted = exhausted or len(page) < page_size
+                if len(imagenes) >= total or exhausted:
+                    break
+                if not starts:
+                    # Faltan resultados útiles: se piden tantas páginas extra como sean necesarias
+                    missing_pages = -(-(total - len(imagenes)) // page_size)
+                    starts, extra_starts = extra_starts[:missing_pages], extra_starts[missing_pages:]
+        return imagenes[:total]
+
     def extract_links(self, query, num_imagenes=10, imgSize="LARGE", tipo="photo", 
                       derechos=None, filetype='png', imgColorType='color'):
         """
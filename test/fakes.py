@@ -0,0 +1,101 @@
+"""
+Sustitutos de prueba compartidos por los tests: respuestas HTTP, cliente de chat y los modelos y
+servicios que recibe FolderDataExporter.update_data_range / process_folder.
+"""
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+
+class FakeResponse:
+    """Respuesta HTTP en streaming (requests.Response) con Content-Type y Content-Length."""
+    def __init__(self, status_code, content_type, body):
+        self.status_code = status_code
+        self.headers = {"Content-Type": content_type, "Content-Length": str(len(body))}
+        self.body = body
+        self.chunks_read = 0
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.body), chunk_size):
+            self.chunks_read += 1
+            yield self.body[start:start + chunk_size]
+
+    def close(self):
+        pass
+
+
+def completion(content, finish_reason="stop"):
+    """Respuesta de client.chat.completions.create con el texto indicado."""
+    message = SimpleNamespace(content=content)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason=finish_reason)])
+
+
+class FakeCompletions:
+    """Sustituto de client.chat.completions que devuelve siempre el mismo texto."""
+    def __init__(self, content="Sin resultados"):
+        self.content = content
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def create(self, **kwargs):
+        with self._lock:
+            self.calls += 1
+        return completion(self.content)
+
+
+class FakeEmbeddings:
+    """Embeddings de prueba: todas las componentes valen la longitud del nombre del archivo."""
+    def __init__(self):
+        self.calls = []  # Rutas de cada llamada a getImgEmbeddings
+        self.runs = []  # Rutas de cada llamada a iterImgEmbeddings
+
+    def getImgEmbeddings(self, image_paths, batch_size=32):
+        self.calls.append(list(image_paths))
+        return np.stack([np.full(512, float(len(os.path.basename(p))), dtype=np.float32) for p in image_paths])
+
+    def iterImgEmbeddings(self, image_paths, batch_size=32):
+        self.runs.append(list(image_paths))
+        for start in range(0, len(image_paths), batch_size):
+            yield start, self.getImgEmbeddings(image_paths[start:start + batch_size])
+
+    def getImgEmbedding(self, image_path):
+        raise AssertionError("Se esperaba el cálculo de embeddings por lotes")
+
+
+class FakeTranslator:
+    """Describe cada imagen como 'pan <valor del embedding>'."""
+    def extractDescription(self, image_embedding, **kwargs):
+        time.sleep(0.01)
+        return {"concise_description": f"pan {int(image_embedding[0, 0])}", "detailed_description": "detalle"}
+
+
+class CountingTranslator(FakeTranslator):
+    def __init__(self):
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def extractDescription(self, image_embedding, **kwargs):
+        with self._lock:
+            self.calls += 1
+        return super().extractDescription(image_embedding, **kwargs)
+
+
+class FakeResearcher:
+    """Buscador de prueba: devuelve un enlace derivado de la consulta y guarda las consultas."""
+    def __init__(self):
+        self.queries = []
+        self._lock = threading.Lock()
+
+    def extract_links(self, query, *args):
+        time.sleep(0.01)
+        with self._lock:
+            self.queries.append(query)
+        return [f"https://img.example.com/{query.replace(' ', '_')}.png"]
+
+    def searchImgs(self, query, num_imagenes, *args):
+        if isinstance(query, dict):  # process_image busca con el resultado de extractDescription
+            query = query["concise_description"]
+        return [{"enlace": link} for link in self.extract_links(query, num_imagenes, *args)]
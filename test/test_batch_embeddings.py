@@ -0,0 +1,137 @@
+import sys
+import os
+import json
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from types import SimpleNamespace
+import numpy as np
+import torch
+from PIL import Image
+from common.class_bulkDownloader import DownloadResult
+from module_embeddings.class_clipRegistry import ClipModelRegistry
+from module_embeddings.class_embedinnizer import Embeddings
+from module_img_metadata_extractor.class_metadataExtractor import MetadataExtractor, process_image
+from module_img_metadata_extractor.utils_metadataExtractor import process_folder
+from fakes import FakeEmbeddings, FakeTranslator, FakeResearcher
+
+
+class FakeClip:
+    """Modelo CLIP de prueba: proyección lineal fija de los píxeles preprocesados."""
+    def __init__(self):
+        self.visual = SimpleNamespace(output_dim=512)
+        self.projection = torch.from_numpy(np.random.default_rng(0).normal(size=(48, 512)).astype(np.float32))
+        self.batches = []
+
+    def encode_image(self, images):
+        self.batches.append(images.shape[0])
+        return images.flatten(1) @ self.projection
+
+
+def preprocess(image):
+    pixels = np.asarray(image.convert("RGB").resize((4, 4)), dtype=np.float32) / 255.0
+    return torch.from_numpy(pixels).permute(2, 0, 1).contiguous()
+
+
+def test_batched_embeddings_match_single_images(monkeypatch, tmp_path):
+    model = FakeClip()
+    monkeypatch.setattr(ClipModelRegistry, "get", classmethod(lambda cls, *args, **kw: (model, preprocess)))
+    embeddings = Embeddings(device="cpu")
+    paths = []
+    for i, color in enumerate(["red", "green", "blue", "yellow", "purple"]):
+        paths.append(str(tmp_path / f"{i}.png"))
+        Image.new("RGB", (8, 8), color).save(paths[-1])
+
+    batched = embeddings.getImgEmbeddings(paths, batch_size=2, num_workers=2)
+    assert model.batches == [2, 2, 1]  # El último lote está incompleto
+
+    single = np.concatenate([embeddings.getImgEmbedding(path).numpy() for path in paths])
+    np.testing.assert_allclose(batched, single, rtol=1e-5, atol=1e-6)
+    assert len({tuple(np.round(row, 4)) for row in batched}) == 5
+
+
+class LinklessResultResearcher(FakeResearcher):
+    """Añade a cada búsqueda un resultado sin 'enlace'."""
+    def searchImgs(self, query, num_imagenes, *args):
+        return super().searchImgs(query, num_imagenes, *args) + [{"titulo": "sin enlace"}]
+
+
+class FakeBlobStore:
+    def __init__(self):
+        self.jobs = []
+
+    def download(self, jobs, show_progress=False):
+        self.jobs.append(list(jobs))
+        return [DownloadResult(url, dest_path, True) for url, dest_path in jobs]
+
+
+def test_process_image_builds_metadata_extractor(tmp_path):
+    processed = process_image("fotos/pan.png", FakeEmbeddings(), FakeTranslator(), LinklessResultResearcher(),
+                              str(tmp_path), image_embedding=np.full((1, 4), 3.0), download=False)
+
+    assert isinstance(processed, MetadataExtractor)
+    assert processed.description["concise_description"] == "pan 3"
+    assert processed.pending_downloads == [("https://img.example.com/pan_3.png",
+                                            os.path.join(str(tmp_path), "pan", "downloaded_0.jpg"))]
+    assert os.path.exists(os.path.join(str(tmp_path), "pan", "metadata.json"))
+
+
+def test_process_folder_embeds_in_one_batch_and_downloads_together(tmp_path):
+    input_dir = tmp_path / "imagenes"
+    input_dir.mkdir()
+    for name in ("a.png", "bb.jpg", "ccc.png", "notas.txt"):
+        (input_dir / name).write_bytes(b"")
+    embeddings, blob_store = FakeEmbeddings(), FakeBlobStore()
+
+    processed = process_folder(str(input_dir), str(tmp_path / "out"), embeddings, FakeTranslator(),
+                               LinklessResultResearcher(), batch_size=2, blob_store=blob_store)
+
+    assert len(embeddings.calls) == 1 and len(embeddings.calls[0]) == 3
+    assert [p.image_path for p in processed] == embeddings.calls[0]
+    # Cada imagen recibe la fila de su propio embedding (la longitud de su nombre)
+    assert all(p.description["concise_description"] == f"pan {len(os.path.basename(p.image_path))}"
+               for p in processed)
+    assert len(blob_store.jobs) == 1 and len(blob_store.jobs[0]) == 3
+    for p in processed:
+        assert p.pending_downloads == [] and len(p.downloaded_files) == 1
+        with open(os.path.join(p.output_dir, "metadata.json")) as f:
+            assert json.load(f)["downloaded_files"] == p.downloaded_files
+
+
+def test_iter_embeddings_yields_contiguous_chunks_with_cache_hits(monkeypatch, tmp_path):
+    model = FakeClip()
+    monkeypatch.setattr(ClipModelRegistry, "get", classmethod(lambda cls, *args, **kw: (model, preprocess)))
+    embeddings = Embeddings(device="cpu", cache_dir=str(tmp_path / "cache"))
+    paths = []
+    for i, color in enumerate(["red", "green", "blue", "yellow", "purple", "orange"]):
+        paths.append(str(tmp_path / f"{i}.png"))
+        Image.new("RGB", (8, 8), color).save(paths[-1])
+    expected = embeddings.getImgEmbeddings([paths[0], paths[3]])  # Quedan en caché
+    model.batches.clear()
+
+    chunks = list(embeddings.iterImgEmbeddings(paths, batch_size=2, num_workers=2))
+
+    assert model.batches == [2, 2]  # Sólo pasan por el modelo las 4 imágenes sin caché
+    # Cada trozo llega hasta la siguiente imagen pendiente (las de caché van con el lote anterior)
+    assert [(start, len(batch)) for start, batch in chunks] == [(0, 4), (4, 2)]
+    result = np.concatenate([batch for _, batch in chunks])
+    assert result.shape == (6, 512)
+    # La caché guarda los vectores en float16
+    np.testing.assert_allclose(result[[0, 3]], expected, atol=1e-3)
+    np.testing.assert_allclose(result, embeddings.getImgEmbeddings(paths), atol=1e-3)
+
+
+class HalfClip(FakeClip):
+    """Como CLIP en CUDA: encode_image devuelve float16."""
+    def encode_image(self, images):
+        return super().encode_image(images).half()
+
+
+def test_single_embedding_dtype_does_not_depend_on_the_cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(ClipModelRegistry, "get", classmethod(lambda cls, *args, **kw: (HalfClip(), preprocess)))
+    embeddings = Embeddings(device="cpu", cache_dir=str(tmp_path / "cache"))
+    path = str(tmp_path / "rojo.png")
+    Image.new("RGB", (8, 8), "red").save(path)
+
+    miss = embeddings.getImgEmbedding(path)
+    hit = embeddings.getImgEmbedding(path)
+    assert miss.dtype == hit.dtype == torch.float32 and miss.shape == hit.shape == (1, 512)
+    torch.testing.assert_close(hit, miss, atol=1e-3, rtol=0)
@@ -0,0 +1,185 @@
+import sys
+import os
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from common.class_blobStore import BlobStore
+from common.class_bulkDownloader import BulkDownloader
+from common.utils import descargar_imagenes
+from module_img_metadata_extractor.utils_metadataExtractor import process_folder
+from fakes import FakeResponse, FakeEmbeddings, FakeTranslator, FakeResearcher
+
+
+class FakeClient:
+    """Cliente HTTP con latencia que mide la concurrencia total y por host."""
+    def __init__(self):
+        self.active = defaultdict(int)
+        self.max_active = defaultdict(int)
+        self.max_total = 0
+        self._lock = threading.Lock()
+
+    def get(self, url, stream=False):
+        host = urlsplit(url).netloc
+        with self._lock:
+            self.active[host] += 1
+            self.max_active[host] = max(self.max_active[host], self.active[host])
+            self.max_total = max(self.max_total, sum(self.active.values()))
+        time.sleep(0.02)
+        with self._lock:
+            self.active[host] -= 1
+        name = url.rsplit("/", 1)[-1]
+        if name.startswith("page"):
+            return FakeResponse(200, "text/html", b"<html></html>")
+        if name.startswith("huge"):
+            return FakeResponse(200, "image/jpeg", b"x" * 500)
+        if name.startswith("missing"):
+            return FakeResponse(404, "image/jpeg", b"")
+        return FakeResponse(200, "image/png", name.encode() * 20)
+
+
+def test_bulk_download_caps_concurrency_and_reports_each_job(tmp_path):
+    client = FakeClient()
+    downloader = BulkDownloader(client, max_concurrency=6, per_host_concurrency=2, chunk_size=16, max_bytes=300)
+    jobs = [(f"https://cdn{i % 3}.example.com/img{i}.png", str(tmp_path / f"img{i}.png")) for i in range(12)]
+    jobs += [("https://cdn0.example.com/page", str(tmp_path / "page.png")),
+             ("https://cdn1.example.com/huge.jpg", str(tmp_path / "huge.jpg")),
+             ("https://cdn2.example.com/missing.jpg", str(tmp_path / "missing.jpg"))]
+
+    results = downloader.download(jobs)
+
+    assert [(r.url, r.dest_path) for r in results] == jobs
+    assert [r.success for r in results] == [True] * 12 + [False] * 3
+    assert open(tmp_path / "img5.png", "rb").read() == b"img5.png" * 20
+    assert results[5].bytes_written == len(b"img5.png" * 20)
+    assert max(client.max_active.values()) <= 2 and client.max_total > 2
+    # Los fallos no dejan archivos parciales
+    assert sorted(os.listdir(tmp_path)) == sorted(f"img{i}.png" for i in range(12))
+
+
+class SlowHostClient(FakeClient):
+    """El host 'lento' tarda mucho más que el resto y registra el orden de finalización."""
+    def __init__(self):
+        super().__init__()
+        self.finished = []
+
+    def get(self, url, stream=False):
+        if "lento" in url:
+            time.sleep(0.05)
+        response = super().get(url, stream)
+        with self._lock:
+            self.finished.append(urlsplit(url).netloc)
+        return response
+
+
+def test_saturated_host_does_not_starve_other_hosts(tmp_path):
+    client = SlowHostClient()
+    downloader = BulkDownloader(client, max_concurrency=4, per_host_concurrency=2)
+    jobs = [(f"https://lento.example.com/img{i}.png", str(tmp_path / f"lento{i}.png")) for i in range(12)]
+    jobs += [(f"https://rapido.example.com/img{i}.png", str(tmp_path / f"rapido{i}.png")) for i in range(6)]
+
+    results = downloader.download(jobs)
+
+    assert all(result.success for result in results)
+    assert client.max_active["lento.example.com"] <= 2
+    # Las descargas del host rápido terminan mientras el lento sigue teniendo trabajo en cola
+    last_fast = max(i for i, host in enumerate(client.finished) if host == "rapido.example.com")
+    assert client.finished[last_fast + 1:].count("lento.example.com") >= 4
+
+
+def test_content_length_over_limit_is_rejected_before_streaming(tmp_path):
+    class Response(FakeResponse):
+        def iter_content(self, chunk_size):
+            raise AssertionError("no se debe leer el cuerpo")
+
+    class Client:
+        def get(self, url, stream=False):
+            response = Response(200, "image/png", b"")
+            response.headers["Content-Length"] = "1000"
+            return response
+
+    result = BulkDownloader(Client(), max_bytes=100).download_one("https://x.example.com/a.png",
+                                                                 str(tmp_path / "a.png"))
+    assert not result.success and "Content-Length" in result.error
+    assert not os.listdir(tmp_path)
+
+
+class PopularLinkResearcher(FakeResearcher):
+    """Devuelve enlaces propios de cada búsqueda, uno compartido por todas y una página HTML."""
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def searchImgs(self, query, num_imagenes, *args):
+        self.calls += 1
+        links = [f"https://cdn.example.com/result{self.calls}_{i}.png" for i in range(num_imagenes - 2)]
+        links += ["https://cdn.example.com/popular.png", "https://cdn.example.com/page"]
+        return [{"enlace": link} for link in links]
+
+
+def test_process_folder_downloads_all_links_in_one_batch_and_deduplicates(tmp_path):
+    input_dir = tmp_path / "input"
+    input_dir.mkdir()
+    for name in ("a.png", "b.png"):
+        (input_dir / name).write_bytes(b"")
+    client = FakeClient()
+    output_dir = tmp_path / "out"
+
+    processed = process_folder(str(input_dir), str(output_dir), FakeEmbeddings(), FakeTranslator(),
+                               PopularLinkResearcher(), downloader=BulkDownloader(client, per_host_concurrency=8))
+
+    assert client.max_total > 4  # Las descargas de ambas imágenes se solapan
+    for item in processed:
+        assert len(item.downloaded_files) == 4 and len(item.failed_downloads) == 1
+        assert os.path.exists(os.path.join(item.output_dir, "metadata.json"))
+
+    # La imagen compartida se guarda una sola vez y las carpetas la referencian
+    blobs = [name for _, _, files in os.walk(output_dir / "_blobs") for name in files if name.endswith(".png")]
+    assert len(blobs) == 7
+    popular = [path for item in processed for path in item.downloaded_files if path.endswith("downloaded_3.jpg")]
+    assert os.path.samefile(popular[0], popular[1])
+
+
+def test_blob_store_deduplicates_by_url_and_content(tmp_path):
+    client = FakeClient()
+    store = BlobStore(str(tmp_path / "blobs"), BulkDownloader(client))
+    # Dos URLs distintas con el mismo contenido (el cuerpo depende sólo del nombre del archivo)
+    jobs = [("https://a.example.com/img1.png", str(tmp_path / "x" / "0.png")),
+            ("https://b.example.com/img1.png", str(tmp_path / "y" / "0.png"))]
+    assert all(result.success for result in store.download(jobs))
+    blobs = [name for _, _, files in os.walk(tmp_path / "blobs") for name in files if name.endswith(".png")]
+    assert len(blobs) == 1
+    assert store.lookup("https://a.example.com/img1.png")["path"] == store.lookup("https://b.example.com/img1.png")["path"]
+
+    # Una segunda ejecución no vuelve a descargar nada
+    reopened = BlobStore(str(tmp_path / "blobs"), BulkDownloader(client))
+    reopened.downloader.http_client = None
+    assert all(result.success for result in reopened.download(jobs))
+
+
+def test_descargar_imagenes_skips_entries_without_link_and_html_pages(tmp_path, monkeypatch):
+    monkeypatch.setattr("common.utils.BLOB_STORE_DIR", str(tmp_path / "_blobs"))
+    imagenes = [{"enlace": "https://cdn.example.com/a.png", "tipo_contenido": "image/png"},
+                {"titulo": "sin enlace"},
+                {"enlace": "https://cdn.example.com/page", "tipo_contenido": "image/jpeg"}]
+
+    resultados = descargar_imagenes(imagenes, str(tmp_path / "descargas"), http_client=FakeClient())
+
+    assert [r.success for r in resultados] == [True, False, False]
+    assert "enlace" in resultados[1].error and "Content-Type" in resultados[2].error
+    assert os.listdir(tmp_path / "descargas") == ["imagen_1.png"]
+
+
+def test_descargar_imagenes_shares_blobs_across_folders(tmp_path, monkeypatch):
+    monkeypatch.setattr("common.utils.BLOB_STORE_DIR", str(tmp_path / "_blobs"))
+    client = FakeClient()
+    imagenes = [{"enlace": "https://cdn.example.com/a.png", "tipo_contenido": "image/png"}]
+
+    descargar_imagenes(imagenes, str(tmp_path / "consulta_1"), http_client=client)
+    descargar_imagenes(imagenes, str(tmp_path / "consulta_2"), http_client=client)
+
+    blobs = [name for _, _, names in os.walk(tmp_path / "_blobs") for name in names if name.endswith(".png")]
+    assert len(blobs) == 1
+    first, second = (tmp_path / folder / "imagen_1.png" for folder in ("consulta_1", "consulta_2"))
+    assert first.read_bytes() == second.read_bytes()
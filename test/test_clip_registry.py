@@ -0,0 +1,121 @@
+import sys
+import os
+import threading
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+import clip
+import logging
+import numpy as np
+import pytest
+import torch
+from module_embeddings import class_embedinnizer
+from module_embeddings.class_clipRegistry import ClipModelRegistry
+from module_embeddings.class_embedinnizer import Embeddings
+from module_embeddings.utils_embeddings import benchmark_cpu_encoding
+
+
+class TinyClip(torch.nn.Module):
+    """Sustituto mínimo de un modelo CLIP con una capa lineal."""
+    def __init__(self):
+        super().__init__()
+        self.proj = torch.nn.Linear(8, 4)
+
+    def forward(self, x):
+        return self.proj(x)
+
+
+def test_each_variant_is_loaded_once(monkeypatch):
+    loads = []
+
+    def fake_load(name, device="cpu"):
+        loads.append((name, device))
+        time.sleep(0.05)  # Da tiempo a que los hilos compitan por la carga
+        return object(), object()
+
+    monkeypatch.setattr(clip, "load", fake_load)
+    ClipModelRegistry.clear()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(ClipModelRegistry.get("ViT-B/32", "cpu")))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert loads == [("ViT-B/32", "cpu")]
+    assert all(result is results[0] for result in results)
+    assert ClipModelRegistry.get("RN50", "cpu") is not results[0]
+    assert len(loads) == 2
+    ClipModelRegistry.clear()
+
+
+def test_quantized_variant_is_cached_apart_from_fp32(monkeypatch):
+    loads = []
+
+    def fake_load(name, device="cpu"):
+        loads.append((name, device))
+        return TinyClip(), object()
+
+    monkeypatch.setattr(clip, "load", fake_load)
+    ClipModelRegistry.clear()
+
+    model, preprocess = ClipModelRegistry.get("ViT-B/32", "cpu")
+    quantized, quantized_preprocess = ClipModelRegistry.get("ViT-B/32", "cpu", quantized=True)
+
+    assert loads == [("ViT-B/32", "cpu")]  # La copia int8 se obtiene del modelo ya cargado
+    assert quantized is not model and quantized_preprocess is preprocess
+    assert isinstance(quantized.proj, torch.ao.nn.quantized.dynamic.Linear)
+    assert type(model.proj) is torch.nn.Linear  # El modelo float32 compartido no se altera
+    assert ClipModelRegistry.get("ViT-B/32", "cpu", quantized=True)[0] is quantized
+    assert ClipModelRegistry.get("ViT-B/32", "cpu")[0] is model
+
+    x = torch.randn(16, 8)
+    cosine = torch.nn.functional.cosine_similarity(model(x), quantized(x))
+    assert cosine.min() > 0.95
+    with pytest.raises(ValueError):
+        ClipModelRegistry.get("ViT-B/32", "cuda", quantized=True)
+    ClipModelRegistry.clear()
+
+
+def test_embeddings_quantize_forces_cpu_and_logs_num_threads(monkeypatch, caplog):
+    requests = []
+
+    def fake_get(cls, model_name, device, quantized=False):
+        requests.append((device, quantized))
+        return torch.nn.Module(), None
+
+    monkeypatch.setattr(torch.cuda, "is_available", lambda: True)
+    monkeypatch.setattr(ClipModelRegistry, "get", classmethod(fake_get))
+    threads = torch.get_num_threads()
+    try:
+        with caplog.at_level(logging.INFO, logger=class_embedinnizer.__name__):
+            embeddings = Embeddings(quantize=True, num_threads=threads + 1)
+    finally:
+        torch.set_num_threads(threads)
+
+    assert embeddings.device == "cpu" and requests == [("cpu", True)]
+    assert "set_num_threads" in caplog.text
+
+
+def test_benchmark_cpu_encoding_reports_both_modes(monkeypatch):
+    created = []
+
+    class FakeEmbeddings:
+        def __init__(self, model_name, num_threads=None, quantize=False, device=None):
+            created.append((quantize, device))
+            self.offset = 0.1 if quantize else 0.0
+
+        def getImgEmbeddings(self, image_paths, batch_size=32):
+            vectors = np.eye(len(image_paths), 4, dtype=np.float32) + self.offset
+            return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    monkeypatch.setattr(class_embedinnizer, "Embeddings", FakeEmbeddings)
+
+    report = benchmark_cpu_encoding([f"img_{i}.png" for i in range(3)], batch_size=2)
+
+    assert created == [(False, "cpu"), (True, "cpu")]
+    assert [entry["mode"] for entry in report] == ["fp32", "int8"]
+    assert report[0]["mean_cosine_vs_fp32"] == pytest.approx(1.0)
+    assert report[1]["min_cosine_vs_fp32"] < 1.0
+    assert all(entry["images_per_sec"] > 0 for entry in report)
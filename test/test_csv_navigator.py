@@ -0,0 +1,30 @@
+import sys
+import os
+import csv
+import json
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+import numpy as np
+from common.class_embeddingStore import EmbeddingStore
+from module_folder_data_explorer.class_csvNavigator import CSVDataNavigator
+
+
+def test_row_embedding_with_legacy_and_new_rows(tmp_path):
+    store = EmbeddingStore(str(tmp_path / "_img_embeddings.f32"), dim=512)
+    store.append(np.full(512, 0.5, dtype=np.float32))
+    csv_file = tmp_path / "_img_metadata.csv"
+    with open(csv_file, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["file_name", "directory", "embedding", "embedding_row"])
+        writer.writeheader()
+        writer.writerow({"file_name": "viejo.png", "directory": "fotos", "embedding": json.dumps([1.0, 2.0])})
+        writer.writerow({"file_name": "nuevo.png", "directory": "fotos", "embedding_row": "0"})
+        writer.writerow({"file_name": "sin.png", "directory": "fotos"})
+    navigator = CSVDataNavigator(str(csv_file))
+
+    # pandas lee embedding_row como float (0.0) y embedding como NaN en las filas nuevas
+    assert navigator.get_row_properties("viejo.png")["embedding"] == [1.0, 2.0]
+    assert navigator.get_row_properties("nuevo.png")["embedding"] == [0.5] * 512
+    assert navigator.get_row_properties("nuevo.png", ["embedding"]) == {"embedding": [0.5] * 512}
+    assert navigator.get_row_properties("sin.png")["embedding"] is None
+
+    paths, matrix = navigator.get_embedding_matrix()
+    assert paths == [os.path.join("fotos", "nuevo.png")] and matrix.shape == (1, 512)
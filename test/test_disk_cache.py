@@ -0,0 +1,34 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from common.class_diskCache import DiskCache
+
+
+def test_values_persist_between_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = DiskCache(path)
+    key = DiskCache.make_key("gpt-4o", [{"role": "user", "content": "hola"}])
+    cache.set(key, {"links": ["a", "b"]})
+    cache.close()
+
+    reopened = DiskCache(path)
+    assert reopened.get(key) == {"links": ["a", "b"]}
+    assert key in reopened
+    assert DiskCache.make_key("gpt-4o", [{"role": "user", "content": "adiós"}]) not in reopened
+
+
+def test_ttl_and_lru_eviction(tmp_path):
+    now = [0.0]
+    cache = DiskCache(str(tmp_path / "cache.sqlite"), ttl=10, max_entries=2, clock=lambda: now[0])
+    cache.set("a", 1)
+    now[0] = 1
+    cache.set("b", 2)
+    now[0] = 2
+    assert cache.get("a") == 1  # 'a' pasa a ser la más reciente
+    now[0] = 3
+    cache.set("c", 3)
+    assert "b" not in cache and cache.get("a") == 1 and len(cache) == 2
+
+    now[0] = 12  # 'a' se creó en t=0 y ha caducado
+    assert cache.get("a") is None
+    assert cache.get("c") == 3
@@ -0,0 +1,57 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+import numpy as np
+from module_embeddings.class_embeddingCache import EmbeddingCache
+
+
+def test_cache_persists_between_instances(tmp_path):
+    vectors = np.random.default_rng(0).normal(size=(3, 512)).astype(np.float32)
+    cache = EmbeddingCache(str(tmp_path), "ViT-B/32")
+    cache.put_many(["a", "b", "c"], vectors)
+    cache.put("a", vectors[2])  # Las claves existentes no se duplican
+
+    reopened = EmbeddingCache(str(tmp_path), "ViT-B/32")
+    assert len(reopened) == 3
+    np.testing.assert_allclose(reopened.get("b"), vectors[1], atol=1e-2)
+    assert reopened.get("zzz") is None
+    # Cada modelo tiene su propio espacio de claves
+    assert "a" not in EmbeddingCache(str(tmp_path), "ViT-L/14")
+
+
+def test_cache_recovers_from_partial_write(tmp_path):
+    vectors = np.ones((2, 512), dtype=np.float32)
+    cache = EmbeddingCache(str(tmp_path), dtype=np.float32)
+    cache.put_many(["a", "b"], vectors)
+    # Simula una escritura interrumpida: media fila de vectores sin su clave
+    with open(cache.vectors_path, "ab") as f:
+        f.write(b"\x00" * 100)
+
+    reopened = EmbeddingCache(str(tmp_path), dtype=np.float32)
+    assert len(reopened) == 2
+    reopened.put("c", np.zeros(512, dtype=np.float32))
+    np.testing.assert_array_equal(EmbeddingCache(str(tmp_path), dtype=np.float32).get("c"), np.zeros(512))
+
+
+def test_new_rows_are_flushed_to_the_memmap(tmp_path):
+    vectors = np.random.default_rng(0).normal(size=(5, 512)).astype(np.float32)
+    cache = EmbeddingCache(str(tmp_path), flush_every=2)
+    cache.put_many(["a", "b", "c"], vectors[:3])
+    assert not cache._new_vectors and cache._vectors.shape == (3, 512)
+    cache.put("d", vectors[3])
+    assert len(cache._new_vectors) == 1  # Por debajo del umbral sigue en memoria
+
+    cache.flush()
+    assert not cache._new_vectors and cache._vectors.shape == (4, 512)
+    for key, vector in zip("abcd", vectors):
+        np.testing.assert_allclose(cache.get(key), vector, atol=1e-2)
+        assert cache.get(key).dtype == np.float32
+
+
+def test_file_hash_depends_on_content(tmp_path):
+    first, second = tmp_path / "a.bin", tmp_path / "b.bin"
+    first.write_bytes(b"imagen")
+    second.write_bytes(b"imagen")
+    assert EmbeddingCache.file_hash(str(first)) == EmbeddingCache.file_hash(str(second))
+    second.write_bytes(b"otra imagen")
+    assert EmbeddingCache.file_hash(str(first)) != EmbeddingCache.file_hash(str(second))
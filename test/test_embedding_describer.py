@@ -0,0 +1,134 @@
+import sys
+import os
+import random
+import threading
+import time
+from types import SimpleNamespace
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+import torch
+import common.utils as utils
+from common.class_rateLimiter import RateLimiter
+from module_embeddings.class_embeddingDescriber import EmbeddingDescriber
+from fakes import FakeCompletions, completion
+
+
+class FlakyCompletions(FakeCompletions):
+    """Sustituto de client.chat.completions con latencia y fallos transitorios."""
+    def __init__(self, failures_per_prompt=1):
+        super().__init__()
+        self.failures_per_prompt = failures_per_prompt
+        self.attempts = {}
+        self.active = 0
+        self.max_active = 0
+
+    def create(self, model, messages, **kwargs):
+        prompt = messages[-1]["content"]
+        with self._lock:
+            self.calls += 1
+            self.attempts[prompt] = self.attempts.get(prompt, 0) + 1
+            attempt = self.attempts[prompt]
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(0.005 + 0.015 * random.random())
+            if attempt <= self.failures_per_prompt:
+                raise TimeoutError("fallo transitorio")
+            # El primer valor del embedding identifica la petición
+            label = chr(ord("a") + int(float(prompt.split("[")[1].split(",")[0])))
+            content = f"1:\nproducto {label}\n\n2:\ndescripción {label}"
+            return completion(content)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def _describer(completions, **kwargs):
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return EmbeddingDescriber(client=client, retry_on=(TimeoutError,), **kwargs)
+
+
+def test_batch_process_keeps_order_and_retries(monkeypatch):
+    monkeypatch.setattr(utils.random, "uniform", lambda a, b: 0.0)  # Reintentos sin espera
+    completions = FlakyCompletions(failures_per_prompt=1)
+    describer = _describer(completions, max_concurrency=4)
+
+    embeddings = [torch.full((1, 512), float(i)) for i in range(12)]
+    results = describer.batch_process(embeddings)
+
+    assert [r["concise_description"] for r in results] == [f"producto {chr(ord('a') + i)}" for i in range(12)]
+    assert all(count == 2 for count in completions.attempts.values())
+    assert 1 < completions.max_active <= 4
+
+
+def test_batch_process_reports_persistent_errors(monkeypatch):
+    monkeypatch.setattr(utils.random, "uniform", lambda a, b: 0.0)
+    completions = FlakyCompletions(failures_per_prompt=10)
+    describer = _describer(completions, max_concurrency=2, max_retries=1)
+    results = describer.batch_process([torch.zeros(1, 512), torch.ones(1, 512)])
+
+    assert all("error" in r for r in results)
+    assert all(count == 2 for count in completions.attempts.values())
+
+
+def test_rate_limiter_waits_for_request_and_token_budget():
+    now = [0.0]
+    waits = []
+
+    def fake_sleep(seconds):
+        waits.append(seconds)
+        now[0] += seconds
+
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=600,
+                          clock=lambda: now[0], sleep=fake_sleep)
+    limiter.acquire(100)
+    for _ in range(59):
+        limiter.acquire(0)
+    assert waits == []
+
+    limiter.acquire(0)  # Sin peticiones disponibles: 1 s para recuperar una
+    assert abs(sum(waits) - 1.0) < 1e-9
+
+    limiter.acquire(560)  # Quedan 500 + 10 recuperados de tokens: faltan 50 (5 s)
+    assert abs(sum(waits) - 6.0) < 1e-9
+
+
+def test_repeated_runs_are_served_from_disk_cache(tmp_path):
+    completions = FlakyCompletions(failures_per_prompt=0)
+    cache_path = str(tmp_path / "llm_cache.sqlite")
+    embeddings = [torch.full((1, 512), float(i)) for i in range(3)]
+
+    first = _describer(completions, cache_path=cache_path).batch_process(embeddings, theme="navidad")
+    calls = sum(completions.attempts.values())
+    second = _describer(completions, cache_path=cache_path).batch_process(embeddings, theme="navidad")
+
+    assert calls == 3
+    assert sum(completions.attempts.values()) == calls
+    assert first == second
+
+    _describer(completions, cache_path=cache_path).extractDescription(embeddings[0], theme="verano")
+    assert sum(completions.attempts.values()) == calls + 1
+
+
+class CountingLimiter:
+    def __init__(self):
+        self.acquired = []
+
+    def acquire(self, tokens=0):
+        self.acquired.append(tokens)
+
+
+def test_each_retry_goes_through_the_rate_limiter(monkeypatch):
+    monkeypatch.setattr(utils.random, "uniform", lambda a, b: 0.0)
+    completions = FlakyCompletions(failures_per_prompt=1)
+    calls = []
+    create = completions.create
+    completions.create = lambda model, messages, **kwargs: calls.append(kwargs) or create(model, messages, **kwargs)
+    describer = _describer(completions, max_tokens=50)
+    describer.rate_limiter = CountingLimiter()
+
+    result = describer.extractDescription(torch.zeros(1, 512))
+
+    assert result["concise_description"] == "producto a"
+    assert len(describer.rate_limiter.acquired) == 2  # Intento fallido + reintento
+    assert describer.rate_limiter.acquired[0] > 50
+    assert all("max_completion_tokens" not in kwargs for kwargs in calls)  # max_tokens no limita la respuesta
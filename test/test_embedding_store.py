@@ -0,0 +1,34 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+import numpy as np
+from common.class_embeddingStore import EmbeddingStore
+
+
+def test_append_write_and_memmap(tmp_path):
+    store = EmbeddingStore(str(tmp_path / "_img_embeddings.f32"), dim=4)
+    assert store.append([1, 2, 3, 4]) == 0
+    assert store.append(np.zeros((1, 4))) == 1
+    assert store.put([5, 5, 5, 5], row=0) == 0
+    assert store.put([7, 7, 7, 7], row=None) == 2
+
+    matrix = EmbeddingStore(store.path, dim=4).open_matrix()
+    assert isinstance(matrix, np.memmap)
+    np.testing.assert_array_equal(matrix, [[5, 5, 5, 5], [0, 0, 0, 0], [7, 7, 7, 7]])
+
+
+def test_append_discards_partial_row(tmp_path):
+    store = EmbeddingStore(str(tmp_path / "emb.f32"), dim=4)
+    store.append([1, 1, 1, 1])
+    with open(store.path, "ab") as f:
+        f.write(b"\x00\x00")  # Escritura interrumpida
+    assert store.append([2, 2, 2, 2]) == 1
+    np.testing.assert_array_equal(store.get(1), [2, 2, 2, 2])
+
+
+def test_parse_row_accepts_float_strings():
+    assert EmbeddingStore.parse_row("3") == 3
+    assert EmbeddingStore.parse_row("3.0") == 3
+    assert EmbeddingStore.parse_row(0.0) == 0
+    for value in (None, "", float("nan"), "abc", "2.5", "-1"):
+        assert EmbeddingStore.parse_row(value) is None
@@ -0,0 +1,93 @@
+import sys
+import os
+import csv
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from module_folder_data_explorer.class_folderManifest import FolderManifest
+from module_folder_data_explorer.class_folderDataExporer import FolderDataExporter
+from fakes import FakeEmbeddings, CountingTranslator, FakeResearcher
+
+
+def test_scan_detects_added_modified_touched_and_deleted(tmp_path):
+    folder = tmp_path / "imagenes"
+    (folder / "sub").mkdir(parents=True)
+    for name in ("a.png", "b.jpg", "sub/c.gif"):
+        (folder / name).write_bytes(name.encode())
+    (folder / "notas.txt").write_text("no es una imagen")
+    manifest = FolderManifest(str(tmp_path / "_manifest.sqlite"))
+
+    delta = manifest.scan(str(folder))
+    assert [os.path.basename(p) for p in delta.changed] == ["a.png", "b.jpg", "c.gif"]
+    manifest.commit(delta)
+    assert manifest.scan(str(folder)).summary() == {"added": 0, "modified": 0, "unchanged": 3, "deleted": 0}
+
+    (folder / "a.png").write_bytes(b"otra imagen")
+    os.utime(folder / "b.jpg", ns=(0, 10 ** 9))  # Sólo cambia la fecha
+    (folder / "sub" / "c.gif").unlink()
+    (folder / "d.bmp").write_bytes(b"d")
+    delta = manifest.scan(str(folder))
+    assert [os.path.basename(p) for p in delta.added] == ["d.bmp"]
+    assert [os.path.basename(p) for p in delta.modified] == ["a.png"]
+    assert [os.path.basename(p) for p in delta.deleted] == ["c.gif"]
+    assert str(folder / "b.jpg") in delta.unchanged
+
+    # Sólo se registra lo procesado; lo pendiente se vuelve a detectar en la siguiente pasada
+    manifest.commit(delta, paths=[str(folder / "a.png")])
+    delta = manifest.scan(str(folder))
+    assert [os.path.basename(p) for p in delta.changed] == ["d.bmp"]
+    assert delta.deleted == [] and not delta.entries.keys() - {str(folder / "d.bmp")}
+    assert [os.path.basename(p) for p in manifest.deleted_paths()] == ["c.gif"]
+
+
+def test_incremental_update_only_processes_changes_and_tombstones_deleted(tmp_path):
+    folder = tmp_path / "imagenes"
+    folder.mkdir()
+    for i in range(1, 6):
+        (folder / f"{'x' * i}.png").write_bytes(bytes([i]))
+    exporter = FolderDataExporter(str(folder), str(tmp_path / "out"))
+    csv_file = str(tmp_path / "out" / "_img_metadata.csv")
+
+    translator = CountingTranslator()
+    exporter.update_data_range(FakeEmbeddings(), translator, FakeResearcher(), csv_file=csv_file, incremental=True)
+    assert translator.calls == 5
+
+    translator = CountingTranslator()
+    exporter.update_data_range(FakeEmbeddings(), translator, FakeResearcher(), csv_file=csv_file, incremental=True)
+    assert translator.calls == 0
+
+    (folder / "xx.png").write_bytes(b"modificada")
+    (folder / "xxx.png").unlink()
+    (folder / "xxxxxx.png").write_bytes(b"nueva")
+    translator = CountingTranslator()
+    exporter.update_data_range(FakeEmbeddings(), translator, FakeResearcher(), csv_file=csv_file, incremental=True)
+    assert translator.calls == 2
+
+    with open(csv_file, newline='', encoding='utf-8') as f:
+        rows = {row["file_name"]: row for row in csv.DictReader(f)}
+    assert len(rows) == 6
+    assert rows["xxx.png"]["deleted"] == "1"
+    assert rows["xx.png"]["img_counts"] == "2" and rows["xx.png"]["deleted"] == ""
+    assert rows["xxxxxx.png"]["img_counts"] == "1"
+
+
+def test_new_images_are_appended_to_the_csv_without_rewriting(tmp_path):
+    folder = tmp_path / "imagenes"
+    folder.mkdir()
+    for i in range(1, 4):
+        (folder / f"{'x' * i}.png").write_bytes(bytes([i]))
+    exporter = FolderDataExporter(str(folder), str(tmp_path / "out"))
+    csv_file = str(tmp_path / "out" / "_img_metadata.csv")
+
+    exporter.update_data_range(FakeEmbeddings(), CountingTranslator(), FakeResearcher(), csv_file=csv_file,
+                               incremental=True)
+    with open(csv_file, "rb") as f:
+        before = f.read()
+
+    (folder / "xxxx.png").write_bytes(b"nueva")
+    exporter.update_data_range(FakeEmbeddings(), CountingTranslator(), FakeResearcher(), csv_file=csv_file,
+                               incremental=True)
+    with open(csv_file, "rb") as f:
+        after = f.read()
+    store = exporter.metadata_store(csv_file)
+
+    assert after.startswith(before) and after.count(b"\n") == before.count(b"\n") + 1
+    assert not store.dirty and not store.csv_diverged(csv_file)
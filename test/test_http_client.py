@@ -0,0 +1,52 @@
+import sys
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from common.class_httpClient import HttpClient, get_shared_client
+from common.class_imageFetcher import ImageFetcher
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Servidor local: /flaky responde 503 la primera vez; el resto devuelve un PNG ficticio."""
+    protocol_version = "HTTP/1.1"  # Keep-alive
+    ports = set()
+    hits = {}
+
+    def do_GET(self):
+        Handler.ports.add(self.client_address[1])
+        Handler.hits[self.path] = Handler.hits.get(self.path, 0) + 1
+        status = 503 if self.path == "/flaky" and Handler.hits[self.path] == 1 else 200
+        body = b"png" if status == 200 else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_connections_are_reused_and_5xx_retried():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    client = HttpClient(backoff_factor=0)
+    try:
+        fetcher = ImageFetcher(client)
+        results = [fetcher.fetch(f"{base}/img_{i}.png") for i in range(5)]
+        assert all(result.content == b"png" for result in results)
+        assert len(Handler.ports) == 1  # Las cinco descargas usan la misma conexión
+
+        assert fetcher.fetch(f"{base}/flaky").content == b"png"
+        assert Handler.hits["/flaky"] == 2
+    finally:
+        client.close()
+        server.shutdown()
+        server.server_close()
+
+
+def test_shared_client_is_a_singleton():
+    assert get_shared_client() is get_shared_client()
+    assert ImageFetcher().session is get_shared_client()
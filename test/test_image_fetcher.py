@@ -0,0 +1,38 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from common.class_imageFetcher import ImageFetcher
+from fakes import FakeResponse
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = responses
+
+    def get(self, url, stream=False, timeout=None):
+        assert stream
+        return self.responses[url]
+
+
+def test_fetch_checks_headers_and_size_before_reading_everything(tmp_path):
+    big = FakeResponse(200, "image/jpeg", b"x" * 1000)
+    big.headers.pop("Content-Length")  # Sin Content-Length: se corta al superar max_bytes
+    html = FakeResponse(200, "text/html; charset=utf-8", b"<html></html>")
+    responses = {
+        "https://a/ok.png": FakeResponse(200, "image/png", b"png-bytes"),
+        "https://a/page": html,
+        "https://a/missing": FakeResponse(404, "image/png", b""),
+        "https://a/declared-big.jpg": FakeResponse(200, "image/jpeg", b"x" * 1000),
+        "https://a/big.jpg": big,
+    }
+    fetcher = ImageFetcher(FakeSession(responses), max_bytes=100, chunk_size=10)
+
+    fetched = fetcher.fetch("https://a/ok.png")
+    assert fetched.content == b"png-bytes" and fetched.extension == "png"
+    assert open(fetched.save(str(tmp_path / "sub" / "ok.png")), "rb").read() == b"png-bytes"
+
+    assert fetcher.fetch("https://a/page") is None and html.chunks_read == 0
+    assert fetcher.fetch("https://a/missing") is None
+    assert fetcher.fetch("https://a/declared-big.jpg") is None
+    assert responses["https://a/declared-big.jpg"].chunks_read == 0
+    assert fetcher.fetch("https://a/big.jpg") is None and big.chunks_read == 11
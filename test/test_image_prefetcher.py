@@ -0,0 +1,52 @@
+import sys
+import os
+import threading
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+import numpy as np
+import torchvision.transforms as transforms
+from PIL import Image
+from module_embeddings.class_imagePrefetcher import ImagePrefetcher
+
+
+def _make_images(folder, n):
+    paths = []
+    for i in range(n):
+        path = os.path.join(folder, f"img_{i}.png")
+        Image.fromarray(np.full((16, 16, 3), i, dtype=np.uint8)).save(path)
+        paths.append(path)
+    return paths
+
+
+def test_batches_keep_input_order(tmp_path):
+    paths = _make_images(str(tmp_path), 11)
+    preprocess = transforms.Compose([lambda im: im.convert("RGB"), transforms.PILToTensor()])
+
+    for num_workers in (0, 3):
+        prefetcher = ImagePrefetcher(preprocess, batch_size=4, num_workers=num_workers, max_prefetch=2)
+        batches = list(prefetcher.iter_batches(paths))
+        assert [len(b) for b in batches] == [4, 4, 3]
+        values = [int(img[0, 0, 0]) for batch in batches for img in batch]
+        assert values == list(range(11))
+
+
+def test_next_batch_loads_while_current_is_consumed_with_max_prefetch_1(tmp_path):
+    paths = _make_images(str(tmp_path), 6)
+    started = []
+    lock = threading.Lock()
+
+    def preprocess(image):
+        tensor = transforms.PILToTensor()(image.convert("RGB"))
+        with lock:
+            started.append(int(tensor[0, 0, 0]))
+        return tensor
+
+    prefetcher = ImagePrefetcher(preprocess, batch_size=2, num_workers=2, max_prefetch=1)
+    for idx, batch in enumerate(prefetcher.iter_batches(paths)):
+        if idx == 2:
+            break
+        # Mientras el "modelo" procesa el lote idx, el lote idx + 1 ya se está cargando
+        deadline = time.monotonic() + 2
+        while time.monotonic() < deadline and not {2 * idx + 2, 2 * idx + 3} <= set(started):
+            time.sleep(0.01)
+        assert {2 * idx + 2, 2 * idx + 3} <= set(started)
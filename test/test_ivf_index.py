@@ -0,0 +1,46 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+import numpy as np
+import pytest
+from module_search_engine.class_ivfIndex import IVFIndex
+from module_search_engine.class_localIndex import LocalImageIndex
+
+
+def _clustered_embeddings(n=2000, dim=64, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(20, dim))
+    return (centers[rng.integers(0, 20, n)] + 0.3 * rng.normal(size=(n, dim))).astype(np.float32)
+
+
+def test_full_probe_matches_exact_search():
+    embeddings = _clustered_embeddings()
+    ids = [f"img_{i}.png" for i in range(len(embeddings))]
+    index = IVFIndex(embeddings, ids, nlist=16, n_iter=5)
+    exact = LocalImageIndex(embeddings, ids)
+
+    queries = embeddings[:10]
+    approx = index.search_batch(queries, k=5, nprobe=16)
+    assert [[r["id"] for r in res] for res in approx] == [[r["id"] for r in res] for res in exact.search_batch(queries, k=5)]
+
+    report = index.recall_report(queries, k=5, nprobe_values=(1, 16), exact_index=exact)
+    assert report[-1]["recall_at_k"] == 1.0
+    assert report[0]["recall_at_k"] <= report[-1]["recall_at_k"]
+
+
+def test_save_and_load_roundtrip(tmp_path):
+    embeddings = _clustered_embeddings(n=300)
+    index = IVFIndex(embeddings, [str(i) for i in range(300)], nlist=8, nprobe=2, n_iter=3)
+    path = str(tmp_path / "ivf.npz")
+    index.save(path)
+
+    loaded = IVFIndex.load(path)
+    assert loaded.nprobe == 2 and len(loaded) == 300
+    assert loaded.search(embeddings[3], k=3) == index.search(embeddings[3], k=3)
+
+
+def test_rejects_embeddings_that_are_not_a_matrix():
+    with pytest.raises(ValueError, match="matriz"):
+        IVFIndex(np.ones(64, dtype=np.float32), ["a.png"])
+    with pytest.raises(ValueError, match="matriz"):
+        IVFIndex(np.ones((3, 64), dtype=np.float32), ["a.png"])
@@ -0,0 +1,56 @@
+import sys
+import os
+import csv
+import json
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+import numpy as np
+from module_search_engine.class_localIndex import LocalImageIndex
+
+
+def test_top_k_matches_full_sort():
+    rng = np.random.default_rng(0)
+    collection = rng.normal(size=(200, 512)).astype(np.float32)
+    queries = rng.normal(size=(4, 512)).astype(np.float32)
+    index = LocalImageIndex(collection, [f"img_{i}.png" for i in range(200)])
+
+    results = index.search_batch(queries, k=5)
+
+    normalized = collection / np.linalg.norm(collection, axis=1, keepdims=True)
+    expected = np.argsort(-(queries @ normalized.T), axis=1)[:, :5]
+    assert [[r["index"] for r in res] for res in results] == expected.tolist()
+    assert results[0][0]["id"] == f"img_{expected[0, 0]}.png"
+    # Una imagen de la colección es su propio vecino más cercano
+    assert index.search(collection[7], k=1)[0]["index"] == 7
+    assert len(index.search(queries[0], k=500)) == 200
+
+
+def test_from_csv_reads_exporter_embeddings(tmp_path):
+    csv_file = tmp_path / "_img_metadata.csv"
+    with open(csv_file, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["file_name", "directory", "embedding"])
+        writer.writeheader()
+        writer.writerow({"file_name": "a.png", "directory": "fotos", "embedding": json.dumps([[1.0] + [0.0] * 511])})
+        writer.writerow({"file_name": "b.png", "directory": "fotos", "embedding": ""})
+        writer.writerow({"file_name": "c.png", "directory": "fotos", "embedding": json.dumps([[0.0, 1.0] + [0.0] * 510])})
+
+    index = LocalImageIndex.from_csv(str(csv_file))
+    assert len(index) == 2
+    assert index.search([0.0, 2.0] + [0.0] * 510, k=1)[0]["id"] == os.path.join("fotos", "c.png")
+
+
+def test_from_csv_accepts_float_embedding_rows(tmp_path):
+    # pandas reescribe la columna como float ("1.0") si alguna fila no tiene embedding
+    from common.class_embeddingStore import EmbeddingStore
+    store = EmbeddingStore(str(tmp_path / "_img_embeddings.f32"))
+    store.append([1.0] + [0.0] * 511)
+    store.append([0.0, 1.0] + [0.0] * 510)
+    csv_file = tmp_path / "_img_metadata.csv"
+    with open(csv_file, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["file_name", "directory", "embedding_row"])
+        writer.writeheader()
+        writer.writerow({"file_name": "a.png", "directory": "fotos", "embedding_row": "1.0"})
+        writer.writerow({"file_name": "b.png", "directory": "fotos", "embedding_row": ""})
+
+    index = LocalImageIndex.from_csv(str(csv_file))
+    assert len(index) == 1
+    assert index.search([0.0, 1.0] + [0.0] * 510, k=1)[0]["id"] == os.path.join("fotos", "a.png")
@@ -0,0 +1,79 @@
+import sys
+import os
+import csv
+import json
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from module_folder_data_explorer.class_metadataStore import MetadataStore, merge_metadata
+from module_folder_data_explorer.class_folderDataExporer import FolderDataExporter
+
+
+def read_csv(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def test_merge_metadata_keeps_the_csv_merge_rules():
+    existing = {"file_name": "a.png", "img_counts": "2", "search_links": '["u1"]', "embedding": "[0.1]",
+                "short_description": "pan", "deleted": 1}
+    merged = merge_metadata(existing, {"img_counts": 3, "search_links": ["u1", "u2"], "embedding_row": 0,
+                                       "short_description": ""})
+    assert merged["img_counts"] == 5
+    assert json.loads(merged["search_links"]) == ["u1", "u2"]
+    assert merged["embedding_row"] == 0 and "embedding" not in merged and "deleted" not in merged
+    assert merged["short_description"] == "pan"
+    assert merge_metadata(None, {"search_links": ["u1"]}) == {"search_links": '["u1"]'}
+
+
+def test_store_upserts_by_key_imports_and_exports_csv(tmp_path):
+    legacy = tmp_path / "legacy.csv"
+    legacy.write_text("file_name,directory,img_counts\nb.png,/img,1\na.png,/img,4\n", encoding="utf-8")
+    store = MetadataStore(str(tmp_path / "_img_metadata.sqlite"))
+    assert store.import_csv(str(legacy)) == 2
+
+    store.upsert({os.path.join("/img", "a.png"): {"img_counts": 1},
+                  os.path.join("/img", "c.png"): {"file_name": "c.png", "directory": "/img", "img_counts": 2}})
+    store.mark_deleted([os.path.join("/img", "b.png"), os.path.join("/img", "no_existe.png")])
+    assert len(store) == 3 and store.get(os.path.join("/img", "a.png"))["img_counts"] == 5
+
+    out = str(tmp_path / "salida.csv")
+    store.export_csv(out)
+    rows = read_csv(out)
+    assert [row["file_name"] for row in rows] == ["b.png", "a.png", "c.png"]  # Orden de inserción
+    assert [row["deleted"] for row in rows] == ["1", "", ""]
+
+
+def test_export_csv_appends_without_rewriting(tmp_path):
+    exporter = FolderDataExporter(str(tmp_path), str(tmp_path / "out"))
+    output_file = str(tmp_path / "out" / "datos.csv")
+    row = {"file_name": "a.png", "directory": "/img", "img_counts": 1}
+
+    exporter.export_csv([row], output_file)
+    exporter.export_csv([dict(row, file_name="b.png")], output_file)
+    assert [r["file_name"] for r in read_csv(output_file)] == ["a.png", "b.png"]
+
+    # Una columna nueva obliga a regenerar el CSV con la unión de columnas
+    exporter.export_csv([dict(row, file_name="c.png", short_description="pan")], output_file)
+    rows = read_csv(output_file)
+    assert [r["short_description"] for r in rows] == ["", "", "pan"]
+    assert len(exporter.metadata_store(output_file)) == 3
+
+
+def test_edited_csv_is_reimported_unless_the_store_has_pending_changes(tmp_path):
+    exporter = FolderDataExporter(str(tmp_path), str(tmp_path / "out"))
+    output_file = str(tmp_path / "out" / "datos.csv")
+    exporter.export_csv([{"file_name": "a.png", "directory": "/img", "img_counts": 1}], output_file)
+
+    # Edición a mano del CSV: se vuelve a importar
+    with open(output_file, "a", newline='', encoding='utf-8') as f:
+        f.write("b.png,/img,7\n")
+    store = exporter.metadata_store(output_file)
+    assert store.get(os.path.join("/img", "b.png"))["img_counts"] == "7"
+    assert not store.dirty
+
+    # Con cambios sin exportar en el almacén, éste prevalece
+    store.upsert({os.path.join("/img", "a.png"): {"img_counts": 2}})
+    with open(output_file, "a", newline='', encoding='utf-8') as f:
+        f.write("c.png,/img,1\n")
+    assert exporter.metadata_store(output_file).get(os.path.join("/img", "c.png")) is None
+    exporter.export_metadata_csv(output_file)
+    assert [r["img_counts"] for r in read_csv(output_file)] == ["3", "7"]
@@ -0,0 +1,51 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+import numpy as np
+import pytest
+pa = pytest.importorskip("pyarrow")
+import pyarrow.parquet as pq
+from module_folder_data_explorer.class_folderDataExporer import FolderDataExporter
+from module_folder_data_explorer.class_csvNavigator import CSVDataNavigator
+from fakes import FakeEmbeddings, FakeTranslator, FakeResearcher
+
+
+@pytest.fixture
+def parquet_file(tmp_path):
+    folder = tmp_path / "imagenes"
+    folder.mkdir()
+    for i in range(1, 5):
+        (folder / f"{'x' * i}.png").write_bytes(bytes([i]))
+    exporter = FolderDataExporter(str(folder), str(tmp_path / "out"))
+    exporter.update_data_range(FakeEmbeddings(), FakeTranslator(), FakeResearcher())
+    # Un registro antiguo sin embedding ni enlaces
+    exporter.export_csv([{"file_name": "viejo.png", "directory": str(folder), "img_counts": 0}],
+                        os.path.join(str(tmp_path / "out"), "_img_metadata.csv"))
+    return exporter.export_parquet()
+
+
+def test_parquet_uses_columnar_types(parquet_file):
+    schema = pq.read_schema(parquet_file)
+    assert schema.field("embedding").type == pa.list_(pa.float32(), 512)
+    assert schema.field("search_links").type == pa.list_(pa.string())
+    assert schema.field("img_counts").type == pa.int64()
+
+    table = pq.read_table(parquet_file)
+    assert table.column("embedding").null_count == 1
+    assert table.column("search_links").to_pylist()[0] == ["https://img.example.com/pan_5.png"]
+
+
+def test_navigator_loads_parquet_with_column_selection(parquet_file):
+    navigator = CSVDataNavigator(parquet_file, columns=["file_name", "directory", "img_counts", "short_description"])
+    assert "embedding" not in navigator.data.columns
+    assert navigator.summary_stats()["total_images"] == 5
+
+    navigator = CSVDataNavigator(parquet_file)
+    paths, matrix = navigator.get_embedding_matrix()
+    assert matrix.shape == (4, 512) and len(paths) == 4
+    assert np.allclose(matrix[:, 0], [5, 6, 7, 8])  # FakeEmbeddings usa la longitud del nombre
+    info = navigator.get_row_properties("xx.png")
+    assert info["embedding"][:2] == [6.0, 6.0]
+    assert navigator.get_search_links("xx.png") == ["https://img.example.com/pan_6.png"]
+    assert navigator.get_search_links("viejo.png") == []
+    assert navigator.get_similar_images("xx.png", top_k=2)
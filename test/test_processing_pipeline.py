@@ -0,0 +1,160 @@
+import sys
+import os
+import csv
+import json
+import threading
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+import pytest
+from module_folder_data_explorer.class_processingPipeline import ProcessingPipeline
+from module_folder_data_explorer.class_folderDataExporer import FolderDataExporter
+from fakes import FakeEmbeddings, FakeTranslator, CountingTranslator, FakeResearcher
+
+
+def test_stages_overlap_and_every_item_is_returned_once():
+    batches = []
+
+    def embed(items):
+        batches.append(len(items))
+        time.sleep(0.02)
+        return [item * 10 for item in items]
+
+    def slow_network(item):
+        time.sleep(0.05)
+        return item + 1
+
+    pipeline = (ProcessingPipeline(queue_size=4)
+                .add_stage("clip", embed, batch_size=8)
+                .add_stage("descripcion", slow_network, workers=8)
+                .add_stage("busqueda", slow_network, workers=8))
+    start = time.perf_counter()
+    results = dict(pipeline.run(range(40)))
+    elapsed = time.perf_counter() - start
+
+    assert results == {i: i * 10 + 2 for i in range(40)}
+    assert max(batches) <= 8 and sum(batches) == 40
+    # En secuencia serían 40 * 0.1 s en las etapas de red; con 8 hilos por etapa y solapamiento, mucho menos
+    assert elapsed < 1.5
+
+
+def test_stage_errors_stop_the_pipeline_and_are_raised():
+    def fail_on_seven(item):
+        if item == 7:
+            raise ValueError("fallo")
+        return item
+
+    pipeline = ProcessingPipeline(queue_size=2).add_stage("descripcion", fail_on_seven, workers=3)
+    with pytest.raises(RuntimeError, match="descripcion"):
+        list(pipeline.run(range(1000)))
+    assert not [t for t in threading.enumerate() if t.name.startswith("pipeline-")]
+
+
+def test_update_data_range_runs_through_the_pipeline(tmp_path):
+    folder = tmp_path / "imagenes"
+    folder.mkdir()
+    names = [f"{'x' * i}.png" for i in range(1, 8)]
+    for name in names:
+        (folder / name).write_bytes(b"")
+    exporter = FolderDataExporter(str(folder), str(tmp_path / "out"))
+    csv_file = str(tmp_path / "out" / "_img_metadata.csv")
+    embeddings = FakeEmbeddings()
+
+    exporter.update_data_range(embeddings, FakeTranslator(), FakeResearcher(), csv_file=csv_file, batch_size=3)
+    exporter.update_data_range(embeddings, FakeTranslator(), FakeResearcher(), file_range=(0, 2),
+                               csv_file=csv_file, batch_size=3)
+
+    with open(csv_file, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    assert [row["file_name"] for row in rows] == sorted(names)
+    assert max(len(paths) for paths in embeddings.calls) <= 3
+    # Un único recorrido de CLIP por ejecución sobre todas las imágenes pendientes
+    assert [len(paths) for paths in embeddings.runs] == [7, 2]
+    assert [row["img_counts"] for row in rows] == ["2", "2"] + ["1"] * 5
+    assert json.loads(rows[0]["search_links"]) == [f"https://img.example.com/pan_{len(rows[0]['file_name'])}.png"]
+    # La segunda pasada reutiliza las filas del EmbeddingStore
+    assert len(exporter.embedding_store) == 7
+
+
+class CrashingResearcher(FakeResearcher):
+    """Falla a partir de la búsqueda número `fail_after` (por ejemplo, por cuota agotada)."""
+    def __init__(self, fail_after):
+        super().__init__()
+        self.fail_after = fail_after
+        self.calls = 0
+
+    def extract_links(self, query, *args):
+        with self._lock:
+            self.calls += 1
+            if self.calls > self.fail_after:
+                raise RuntimeError("cuota agotada")
+        return super().extract_links(query, *args)
+
+
+def test_interrupted_run_resumes_from_journal(tmp_path):
+    folder = tmp_path / "imagenes"
+    folder.mkdir()
+    for i in range(1, 11):
+        (folder / f"{'x' * i}.png").write_bytes(b"")
+    exporter = FolderDataExporter(str(folder), str(tmp_path / "out"))
+    csv_file = str(tmp_path / "out" / "_img_metadata.csv")
+
+    with pytest.raises(RuntimeError):
+        exporter.update_data_range(FakeEmbeddings(), FakeTranslator(), CrashingResearcher(fail_after=6),
+                                   csv_file=csv_file, search_workers=1, theme="pan")
+    assert not os.path.exists(csv_file)
+    with open(csv_file + ".journal", encoding="utf-8") as f:
+        assert sum('"file_info"' in line for line in f) == 6
+    # Las imágenes embebidas que no llegaron a terminar ya tienen su fila anotada en el diario
+    assert len(exporter.embedding_store) == 10
+    with open(csv_file + ".journal", "a", encoding="utf-8") as f:
+        f.write('{"key": "a medio escribir')  # Corte a mitad de una línea
+
+    translator = CountingTranslator()
+    exporter.update_data_range(FakeEmbeddings(), translator, FakeResearcher(), csv_file=csv_file, theme="pan")
+
+    assert translator.calls == 4
+    assert len(exporter.embedding_store) == 10  # No se añaden filas nuevas al reanudar
+    assert not os.path.exists(csv_file + ".journal")
+    with open(csv_file, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 10 and all(row["img_counts"] == "1" for row in rows)
+
+    # Con otra configuración no se reutiliza nada
+    translator = CountingTranslator()
+    exporter.update_data_range(FakeEmbeddings(), translator, FakeResearcher(), csv_file=csv_file, theme="tartas")
+    assert translator.calls == 10
+
+
+class FailingTranslator(CountingTranslator):
+    """Como EmbeddingDescriber ante un error de la API: devuelve {'error': True, ...} sin lanzar."""
+    def __init__(self, failing):
+        super().__init__()
+        self.failing = failing
+
+    def extractDescription(self, image_embedding, **kwargs):
+        if int(image_embedding[0, 0]) in self.failing:
+            return {"error": True, "message": "Error al generar la descripción: cuota agotada"}
+        return super().extractDescription(image_embedding, **kwargs)
+
+
+def test_failed_descriptions_are_not_saved_and_are_retried(tmp_path):
+    folder = tmp_path / "imagenes"
+    folder.mkdir()
+    for i in range(1, 5):
+        (folder / f"{'x' * i}.png").write_bytes(bytes([i]))
+    exporter = FolderDataExporter(str(folder), str(tmp_path / "out"))
+    csv_file = str(tmp_path / "out" / "_img_metadata.csv")
+
+    researcher = FakeResearcher()
+    exporter.update_data_range(FakeEmbeddings(), FailingTranslator(failing={6}), researcher,
+                               csv_file=csv_file, incremental=True)
+    assert "" not in researcher.queries and len(researcher.queries) == 3
+    assert exporter.metadata_store(csv_file).get(str(folder / "xx.png")) is None
+
+    translator = CountingTranslator()
+    exporter.update_data_range(FakeEmbeddings(), translator, FakeResearcher(), csv_file=csv_file, incremental=True)
+    assert translator.calls == 1  # Sólo se reintenta la imagen fallida
+    assert len(exporter.embedding_store) == 4  # y reutiliza su fila del EmbeddingStore
+    with open(csv_file, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    assert sorted(row["short_description"] for row in rows) == ["pan 5", "pan 6", "pan 7", "pan 8"]
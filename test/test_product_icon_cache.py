@@ -0,0 +1,64 @@
+import sys
+import os
+import time
+from types import SimpleNamespace
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+import numpy as np
+import torch
+from module_embeddings.class_clipRegistry import ClipModelRegistry
+from module_embeddings.class_productIconRetriever import ProductIconRetriever
+from fakes import FakeCompletions
+
+
+def _retriever(monkeypatch, completions, **kwargs):
+    monkeypatch.setattr(ClipModelRegistry, "get", classmethod(lambda cls, *args, **kw: (None, None)))
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return ProductIconRetriever(client=client, **kwargs)
+
+
+def test_cache_key_uses_full_embedding_and_parameters(monkeypatch):
+    retriever = _retriever(monkeypatch, FakeCompletions())
+    base = np.zeros(512, dtype=np.float32)
+    other = base.copy()
+    other[300] = 1.0  # Sólo difiere más allá de las 10 primeras dimensiones
+
+    assert retriever._get_cache_key(base, 5) != retriever._get_cache_key(other, 5)
+    assert retriever._get_cache_key(base, 5) != retriever._get_cache_key(base, 5, "pan")
+    assert retriever._get_cache_key(base, 5) == retriever._get_cache_key(torch.from_numpy(base), 5)
+
+
+def test_lru_bound_and_disk_persistence(monkeypatch, tmp_path):
+    completions = FakeCompletions()
+    cache_path = str(tmp_path / "icons.sqlite")
+    retriever = _retriever(monkeypatch, completions, cache_size=2, cache_path=cache_path)
+    embeddings = [torch.full((512,), float(i)) for i in range(3)]
+
+    for embedding in embeddings:
+        retriever.find_product_images(embedding, max_attempts=1)
+    assert completions.calls == 3
+    assert len(retriever._cache) == 2
+
+    # Un proceso nuevo recupera los resultados desde disco sin llamar al modelo
+    restarted = _retriever(monkeypatch, completions, cache_size=2, cache_path=cache_path)
+    results = [restarted.find_product_images(embedding, max_attempts=1) for embedding in embeddings]
+    assert completions.calls == 3
+    assert all(result["num_requested"] == 5 for result in results)
+
+
+def test_disk_cache_evicts_least_recently_used(monkeypatch, tmp_path):
+    completions = FakeCompletions()
+    cache_path = str(tmp_path / "icons.sqlite")
+    retriever = _retriever(monkeypatch, completions, cache_path=cache_path, cache_max_entries=2)
+    embeddings = [torch.full((512,), float(i)) for i in range(3)]
+
+    for embedding in embeddings:
+        retriever.find_product_images(embedding, max_attempts=1)
+        time.sleep(0.01)  # Fechas de acceso distintas
+    assert len(retriever._disk_cache) == 2
+
+    # Sólo el resultado más antiguo se ha eliminado del disco
+    restarted = _retriever(monkeypatch, completions, cache_path=cache_path, cache_max_entries=2)
+    restarted.find_product_images(embeddings[2], max_attempts=1)
+    assert completions.calls == 3
+    restarted.find_product_images(embeddings[0], max_attempts=1)
+    assert completions.calls == 4
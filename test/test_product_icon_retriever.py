@@ -0,0 +1,90 @@
+import sys
+import os
+import threading
+import time
+from io import BytesIO
+from types import SimpleNamespace
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+import torch
+from PIL import Image
+from module_embeddings.class_clipRegistry import ClipModelRegistry
+from module_embeddings.class_productIconRetriever import ProductIconRetriever
+from fakes import FakeCompletions, FakeResponse
+
+
+class FakeSession:
+    """Sesión HTTP con latencia que sirve un PNG para las URLs que contienen 'ok'."""
+    def __init__(self):
+        buffer = BytesIO()
+        Image.new("RGB", (8, 8), "red").save(buffer, format="PNG")
+        self.png = buffer.getvalue()
+        self.requests = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def get(self, url, **kwargs):
+        with self._lock:
+            self.requests.append(("GET", url))
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(0.02)
+        with self._lock:
+            self.active -= 1
+        if "ok" in url:
+            return FakeResponse(200, "image/png", self.png)
+        return FakeResponse(200, "text/html", b"<html></html>")
+
+    def head(self, url, **kwargs):
+        self.requests.append(("HEAD", url))
+        return FakeResponse(200, "image/png", b"")
+
+
+class FakeClip:
+    """Modelo CLIP de prueba: el embedding de cada imagen es un vector de unos."""
+    def __init__(self):
+        self.batches = []
+
+    def encode_image(self, images):
+        self.batches.append(images.shape[0])
+        return torch.ones(images.shape[0], 512)
+
+
+def _retriever(monkeypatch, completions, clip_model=None, **kwargs):
+    preprocess = (lambda image: torch.zeros(3, 4, 4)) if clip_model else None
+    monkeypatch.setattr(ClipModelRegistry, "get", classmethod(lambda cls, *args, **kw: (clip_model, preprocess)))
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return ProductIconRetriever(client=client, **kwargs)
+
+
+def test_candidates_are_downloaded_once_concurrently_and_scored_in_one_batch(monkeypatch, tmp_path):
+    urls = [f"https://cdn.example.com/{name}.png" for name in ("ok1", "fail1", "ok2", "ok3", "fail2", "ok4")]
+    clip_model = FakeClip()
+    retriever = _retriever(monkeypatch, FakeCompletions("\n".join(urls)), clip_model=clip_model,
+                           cache_results=False, max_workers=4)
+    session = FakeSession()
+    retriever.fetcher.session = session
+
+    result = retriever.find_product_images(torch.ones(512), num_links=4, max_attempts=1, save_dir=str(tmp_path))
+
+    assert result["links"] == [url for url in urls if "ok" in url]
+    assert clip_model.batches == [4]
+    assert session.max_active > 1
+    # Una única petición GET por candidato, sin HEAD previo, y los mismos bytes se guardan en disco
+    assert sorted(session.requests) == sorted(("GET", url) for url in urls)
+    assert [open(path, "rb").read() for path in result["files"]] == [session.png] * 4
+
+
+def test_cached_result_is_saved_again_in_each_save_dir(monkeypatch, tmp_path):
+    urls = [f"https://cdn.example.com/{name}.png" for name in ("ok1", "fail1", "ok2")]
+    completions = FakeCompletions("\n".join(urls))
+    retriever = _retriever(monkeypatch, completions, clip_model=FakeClip(), cache_path=str(tmp_path / "icons.sqlite"))
+    retriever.fetcher.session = FakeSession()
+
+    first = retriever.find_product_images(torch.ones(512), num_links=2, max_attempts=1, save_dir=str(tmp_path / "a"))
+    second = retriever.find_product_images(torch.ones(512), num_links=2, max_attempts=1, save_dir=str(tmp_path / "b"))
+
+    assert completions.calls == 1
+    assert second["links"] == first["links"] and len(second["scores"]) == 2
+    assert all(path.startswith(str(tmp_path / "b")) and os.path.exists(path) for path in second["files"])
+    assert "files" not in retriever._disk_cache.get(retriever._get_cache_key(torch.ones(512), 2))
@@ -0,0 +1,54 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+import numpy as np
+from module_search_engine.class_quantizer import (
+    ProductQuantizer, QuantizedIndex, ScalarQuantizer, benchmark_quantization
+)
+
+
+def _embeddings(n=500, dim=32, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(10, dim))
+    return (centers[rng.integers(0, 10, n)] + 0.2 * rng.normal(size=(n, dim))).astype(np.float32)
+
+
+def test_scalar_quantizer_scores_match_decoded_vectors():
+    data = _embeddings()
+    codec = ScalarQuantizer().train(data)
+    codes = codec.encode(data)
+    assert codes.dtype == np.uint8 and codes.shape == data.shape
+    np.testing.assert_allclose(codec.scores(data[:3], codes), data[:3] @ codec.decode(codes).T, rtol=1e-4, atol=1e-4)
+
+
+def test_product_quantizer_memory_and_search():
+    data = _embeddings()
+    index = QuantizedIndex(data, [str(i) for i in range(len(data))], ProductQuantizer(m=8, nbits=4, n_iter=5))
+    assert index.codes.shape == (500, 8)
+    assert index.memory_per_vector() == 8
+    # Los resultados deben pertenecer al mismo grupo que la consulta
+    normalized = data / np.linalg.norm(data, axis=1, keepdims=True)
+    results = index.search(data[5], k=5)
+    assert all(normalized[r["index"]] @ normalized[5] > 0.8 for r in results)
+
+
+def test_benchmark_reports_recall_against_float32():
+    data = _embeddings()
+    report = benchmark_quantization(data, data[:20], k=5, codecs=[ScalarQuantizer(), ProductQuantizer(m=8, nbits=4, n_iter=5)])
+    assert [row["codec"] for row in report] == ["float32", "int8", "pq8x4"]
+    assert report[1]["bytes_per_vector"] == 32 and report[1]["recall_at_k"] > 0.8
+
+
+def test_saved_index_round_trip(tmp_path):
+    data = _embeddings()
+    ids = [str(i) for i in range(len(data))]
+    for codec in (ScalarQuantizer(), ProductQuantizer(m=8, nbits=4, n_iter=5)):
+        index = QuantizedIndex(data, ids, codec, train_size=200, chunk_size=64)
+        path = str(tmp_path / f"{codec.name}.npz")
+        index.save(path)
+
+        loaded = QuantizedIndex.load(path)
+        assert loaded.ids == ids and loaded.dim == 32
+        np.testing.assert_array_equal(loaded.codes, index.codes)
+        assert loaded.memory_per_vector() == index.memory_per_vector()
+        assert loaded.search(data[7], k=5) == index.search(data[7], k=5)
@@ -0,0 +1,75 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+import pytest
+from module_search_engine.class_searchEngine import GoogleSearchEngine
+from module_search_engine.class_queryScheduler import QueryScheduler, QuotaExceededError
+
+
+class FakeCse:
+    """Sustituto local de service.cse(): list(**params).execute() devuelve items sintéticos."""
+    def __init__(self):
+        self.calls = []
+
+    def cse(self):
+        return self
+
+    def list(self, **params):
+        self.calls.append(params)
+        start = params.get("start", 1)
+        items = [{"title": f"{params['q']} {i}", "link": f"https://img.example.com/{params['q']}/{i}.png",
+                  "mime": "image/png", "image": {"width": 100, "height": 100}}
+                 for i in range(start, start + params["num"])]
+        return type("Request", (), {"execute": lambda self: {"items": items}})()
+
+
+def test_cache_is_keyed_by_full_parameter_set(tmp_path):
+    service = FakeCse()
+    engine = GoogleSearchEngine("key", "cx", service=service, cache_path=str(tmp_path / "search.sqlite"))
+
+    first = engine.searchImgs("pan", 5, "LARGE", "photo")
+    again = GoogleSearchEngine("key", "cx", service=service, cache_path=str(tmp_path / "search.sqlite"))
+    assert [i["enlace"] for i in again.searchImgs("pan", 5, "LARGE", "photo")] == [i["enlace"] for i in first]
+    assert len(service.calls) == 1 and again.cache_hits == 1
+
+    engine.searchImgs("pan", 5, "LARGE", "clipart")
+    engine.searchImgs("pan", 6, "LARGE", "photo")
+    assert len(service.calls) == 3
+
+
+def test_scheduler_spreads_calls_and_reports_saved_quota(tmp_path):
+    now = [0.0]
+    waits = []
+
+    def fake_sleep(seconds):
+        waits.append(seconds)
+        now[0] += seconds
+
+    service = FakeCse()
+    engine = GoogleSearchEngine("key", "cx", service=service, cache_path=str(tmp_path / "search.sqlite"))
+    engine.searchImgs("croissant", 5)  # Ya en caché antes de planificar
+    scheduler = QueryScheduler(engine, quota=10, window_seconds=100, burst=2,
+                               clock=lambda: now[0], sleep=fake_sleep)
+
+    for query in ["croissant", "pan", "tarta", "pan", "donut"]:
+        scheduler.submit(query, 5)
+    results = scheduler.run()
+
+    assert [r[0]["titulo"] for r in results] == ["croissant 1", "pan 1", "tarta 1", "pan 1", "donut 1"]
+    assert len(service.calls) == 4  # croissant (antes) + pan, tarta, donut
+    assert waits == [10.0]  # Ráfaga de 2 y después una llamada cada 100 / 10 segundos
+    report = scheduler.report()
+    assert report["api_calls"] == 3 and report["quota_saved"] == 2 and report["quota_remaining"] == 7
+
+
+def test_non_blocking_scheduler_keeps_pending_queries_queued(tmp_path):
+    engine = GoogleSearchEngine("key", "cx", service=FakeCse())
+    scheduler = QueryScheduler(engine, quota=2, window_seconds=100, burst=2, block=False, clock=lambda: 0.0)
+    for query in ["a", "b", "c"]:
+        scheduler.submit(query, 3)
+
+    results = scheduler.run()
+    assert results[2] is None and results[0] and results[1]
+    assert scheduler.report()["queued"] == 1
+    with pytest.raises(QuotaExceededError):
+        scheduler.acquire()
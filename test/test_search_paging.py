@@ -0,0 +1,65 @@
+import sys
+import os
+import threading
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from module_search_engine.class_searchEngine import GoogleSearchEngine
+
+
+class PagedCse:
+    """
+    Sustituto de service.cse() con `available` resultados en total. Cada página repite el
+    último enlace de la anterior para comprobar la deduplicación.
+    """
+    def __init__(self, available=100):
+        self.available = available
+        self.starts = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def cse(self):
+        return self
+
+    def list(self, **params):
+        start = params.get("start", 1)
+        with self._lock:
+            self.starts.append(start)
+
+        def execute(_):
+            with self._lock:
+                self.active += 1
+                self.max_active = max(self.max_active, self.active)
+            time.sleep(0.02)
+            with self._lock:
+                self.active -= 1
+            first = max(start - 1, 1)
+            last = min(start + params["num"] - 1, self.available)
+            links = [first] + list(range(start, last + 1)) if start > 1 else list(range(start, last + 1))
+            return {"items": [{"title": str(i), "link": f"https://img.example.com/{i}.png"} for i in links][:params["num"]]}
+
+        return type("Request", (), {"execute": execute})()
+
+
+def test_paged_search_fetches_pages_concurrently_and_deduplicates():
+    service = PagedCse()
+    engine = GoogleSearchEngine("key", "cx", service=service)
+
+    results = engine.searchImgsPaged("pan", total=30, max_workers=3)
+
+    links = [r["enlace"] for r in results]
+    assert len(links) == 30 and len(set(links)) == 30
+    assert service.max_active > 1
+    # Las páginas solapadas dejan 28 enlaces únicos en 3 páginas: se pide una cuarta
+    assert sorted(service.starts) == [1, 11, 21, 31]
+
+
+def test_paged_search_stops_when_results_run_out_and_filters_unusable():
+    service = PagedCse(available=15)
+    engine = GoogleSearchEngine("key", "cx", service=service)
+
+    results = engine.searchImgsPaged("pan", total=50, max_workers=2,
+                                     is_usable=lambda imagen: imagen["titulo"] != "3")
+
+    assert [r["titulo"] for r in results] == [str(i) for i in range(1, 16) if i != 3]
+    assert sorted(service.starts) == [1, 11]
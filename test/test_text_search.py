@@ -0,0 +1,74 @@
+import sys
+import os
+import csv
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from types import SimpleNamespace
+import clip
+import numpy as np
+import torch
+from common.class_embeddingStore import EmbeddingStore
+from module_embeddings.class_clipRegistry import ClipModelRegistry
+from module_embeddings.class_embedinnizer import Embeddings
+from module_folder_data_explorer.class_csvNavigator import CSVDataNavigator
+
+WORDS = ["pan", "tarta", "galleta"]
+
+
+class FakeTextClip:
+    """Modelo CLIP de prueba: cada palabra conocida tiene un vector fijo (sin normalizar)."""
+    def __init__(self):
+        self.visual = SimpleNamespace(output_dim=512)
+        self.batches = []
+        self._vectors = {}
+        for i, word in enumerate(WORDS):
+            vector = torch.zeros(512)
+            vector[i] = 3.0
+            vector[i + 1] = 1.0
+            self._vectors[tuple(clip.tokenize([word])[0].tolist())] = vector
+
+    def encode_text(self, tokens):
+        self.batches.append(tokens.shape[0])
+        return torch.stack([self._vectors[tuple(row.tolist())] for row in tokens])
+
+
+def _embeddings(monkeypatch):
+    model = FakeTextClip()
+    monkeypatch.setattr(ClipModelRegistry, "get", classmethod(lambda cls, *args, **kw: (model, None)))
+    return Embeddings(device="cpu"), model
+
+
+def test_text_embeddings_are_normalized_batched_and_ordered(monkeypatch):
+    embeddings, model = _embeddings(monkeypatch)
+
+    result = embeddings.getTextEmbeddings(["galleta", "pan", "tarta"], batch_size=2)
+
+    assert model.batches == [2, 1]
+    assert result.shape == (3, 512) and result.dtype == np.float32
+    np.testing.assert_allclose(np.linalg.norm(result, axis=1), 1.0, rtol=1e-6)
+    assert result[:, :4].argmax(axis=1).tolist() == [2, 0, 1]
+    assert embeddings.getTextEmbeddings([]).shape == (0, 512)
+
+
+def test_search_by_text_ranks_collection(monkeypatch, tmp_path):
+    embeddings, _ = _embeddings(monkeypatch)
+    store = EmbeddingStore(str(tmp_path / "_img_embeddings.f32"))
+    csv_file = tmp_path / "_img_metadata.csv"
+    with open(csv_file, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["file_name", "directory", "embedding_row"])
+        writer.writeheader()
+        for i, word in enumerate(WORDS):
+            vector = np.zeros(512, dtype=np.float32)
+            vector[i] = 1.0
+            writer.writerow({"file_name": f"{word}.png", "directory": "fotos", "embedding_row": store.append(vector)})
+    navigator = CSVDataNavigator(str(csv_file))
+
+    results = navigator.search_by_text(embeddings, "tarta", top_k=2)
+    assert [result["id"] for result in results] == [os.path.join("fotos", "tarta.png"),
+                                                    os.path.join("fotos", "galleta.png")]
+    assert results[0]["score"] > results[1]["score"]
+
+    # Con una lista se devuelve una lista de resultados por consulta
+    batch = navigator.search_by_text(embeddings, ["pan", "galleta"], top_k=1)
+    assert [[result["id"] for result in results] for results in batch] == [
+        [os.path.join("fotos", "pan.png")], [os.path.join("fotos", "galleta.png")]]
+    assert navigator.search_by_text(embeddings, [], top_k=1) == []